@@ -0,0 +1,165 @@
+"""Throughput and tail latency of the queue stores, per backend and queue shape.
+
+Run from the repository root:
+
+    python -m benchmarks.queue_bench
+    python -m benchmarks.queue_bench --backends json,sqlite --guilds 1,100 --lengths 10,1000 --json out.json
+
+Every (backend, guild count, queue length) cell starts from a freshly written
+store in a temp directory. Each operation runs ``--ops`` times (or until
+``--seconds`` is used up) against random guilds and reports ops/sec and p99
+latency. ``playback`` simulates handle_track_end / skip_to_next: read the
+current track, step to the next index in play order and store it, the way
+music.py does on every transition. Cells with more than ``--max-tracks`` tracks
+in total are skipped (the plain JSON backend rewrites all of them per write).
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from music.persistent_queue import PersistentQueue, open_queue_store
+from music.track import Track
+
+BACKENDS = ("json", "journal", "cached", "sqlite")
+OPS = ("append", "extend_tracks", "set_index", "remove_at", "set_queue", "current_track", "next_index", "playback")
+
+
+def _track(i: int, requester: int = 1) -> Track:
+    ident = f"v{i:010d}"
+    return Track(f"Song {i}", f"https://www.youtube.com/watch?v={ident}", 200_000, ident, f"Artist {i % 97}", requester)
+
+
+def _populate(path: str, guilds: int, length: int) -> None:
+    """Write the starting queue file directly (much faster than ``guilds * length`` appends)."""
+    queue = [_track(i).encode() for i in range(length)]
+    data = {
+        str(g): {"queue": queue, "index": 0, "loop": 2 if g % 3 == 0 else 0, "shuffle": False, "volume": 70}
+        for g in range(guilds)
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, separators=(",", ":"))
+
+
+def _playback_step(store: PersistentQueue, guild_id: int, skip: bool) -> None:
+    # Mirrors PlaybackEngine.track_ended (or _advance for a skip): one transaction that moves the
+    # index and reads the track to play (index, current track, queue length).
+    def step(g) -> Optional[Tuple[int, Optional[Track], int]]:
+        loop_mode = g.get_guild_prop("loop", 0)
+        if loop_mode == 1 and not skip:
+            return g.get_index(), g.current_track(), len(g)
+        next_index = g.step_index(1, wrap=loop_mode == 2)
+        if next_index is None:
+            if not skip:
+                g.set_index(-1)
+            return None
+        g.set_index(next_index)
+        return g.get_index(), g.current_track(), len(g)
+
+    with store.transaction(guild_id) as g:
+        position = step(g)
+    if position is None:
+        store.set_index(guild_id, 0)  # queue finished: a new /play starts it again
+
+
+def _operations(store: PersistentQueue, guilds: int, length: int, rng: random.Random) -> Dict[str, Callable[[], Any]]:
+    counter = [10 ** 9]
+
+    def gid() -> int:
+        return rng.randrange(guilds)
+
+    def fresh() -> Track:
+        counter[0] += 1
+        return _track(counter[0])
+
+    replacement = [_track(i) for i in range(length)]
+    return {
+        "append": lambda: store.append_track(gid(), fresh()),
+        "extend_tracks": lambda: store.extend_tracks(gid(), [fresh() for _ in range(10)]),
+        "set_index": lambda: store.set_index(gid(), rng.randrange(length)),
+        "remove_at": lambda: store.remove_at(gid(), rng.randrange(max(1, length // 2))),
+        "set_queue": lambda: store.set_queue(gid(), replacement),
+        "current_track": lambda: store.current_track(gid()),
+        "next_index": lambda: store.next_index(gid()),
+        "playback": lambda: _playback_step(store, gid(), skip=rng.random() < 0.2),
+    }
+
+
+def _time_op(fn: Callable[[], Any], ops: int, seconds: float) -> Dict[str, float]:
+    samples: List[int] = []
+    deadline = time.perf_counter() + seconds
+    while len(samples) < ops and (not samples or time.perf_counter() < deadline):
+        t0 = time.perf_counter_ns()
+        fn()
+        samples.append(time.perf_counter_ns() - t0)
+    samples.sort()
+    total = sum(samples) / 1e9
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))] / 1e6
+    return {"n": len(samples), "ops_per_sec": len(samples) / total if total else float("inf"), "p99_ms": p99}
+
+
+def run_cell(backend: str, guilds: int, length: int, ops: int, seconds: float, seed: int = 0) -> Dict[str, Any]:
+    tmp = tempfile.mkdtemp(prefix="queue-bench-")
+    store: Optional[PersistentQueue] = None
+    try:
+        path = os.path.join(tmp, "queue_data.json")
+        _populate(path, guilds, length)
+        if backend == "sqlite":
+            from music.sqlite_queue import SQLiteQueue
+            store = SQLiteQueue(os.path.join(tmp, "queue_data.sqlite3"), import_from=path)
+        else:
+            store = open_queue_store(backend, path)
+        rng = random.Random(seed)
+        results = {}
+        for name, fn in _operations(store, guilds, length, rng).items():
+            results[name] = _time_op(fn, ops, seconds)
+        return {"backend": backend, "guilds": guilds, "length": length, "ops": results}
+    finally:
+        if store is not None:
+            store.close()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _ints(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backends", default=",".join(BACKENDS))
+    parser.add_argument("--guilds", type=_ints, default=[1, 100, 1000])
+    parser.add_argument("--lengths", type=_ints, default=[10, 1000, 10000])
+    parser.add_argument("--ops", type=int, default=200, help="iterations per operation")
+    parser.add_argument("--seconds", type=float, default=2.0, help="time budget per operation")
+    parser.add_argument("--max-tracks", type=int, default=1_000_000, help="skip cells with more tracks in total")
+    parser.add_argument("--json", dest="json_path", help="also write the results to this file")
+    args = parser.parse_args()
+
+    cells = []
+    print(f"{'backend':<8} {'guilds':>6} {'length':>6}  " + "  ".join(f"{op:>22}" for op in OPS))
+    print(f"{'':<22}  " + "  ".join(f"{'ops/s':>10} {'p99 ms':>11}" for _ in OPS))
+    for backend in [b.strip() for b in args.backends.split(",") if b.strip()]:
+        for guilds in args.guilds:
+            for length in args.lengths:
+                if guilds * length > args.max_tracks:
+                    print(f"{backend:<8} {guilds:>6} {length:>6}  skipped (> --max-tracks)")
+                    continue
+                cell = run_cell(backend, guilds, length, args.ops, args.seconds)
+                cells.append(cell)
+                row = "  ".join(
+                    f"{cell['ops'][op]['ops_per_sec']:>10.0f} {cell['ops'][op]['p99_ms']:>11.3f}" for op in OPS
+                )
+                print(f"{backend:<8} {guilds:>6} {length:>6}  {row}", flush=True)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(cells, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
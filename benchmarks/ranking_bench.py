@@ -0,0 +1,66 @@
+"""Throughput of the search result ranker on 25-result sets.
+
+Run from the repository root:
+
+    python -m benchmarks.ranking_bench [--queries 10000] [--results 25]
+
+Each query ranks a fresh set of synthetic YouTube results (a mix of official
+uploads, lyric videos, remixes, covers and re-uploads) with the shared
+``music.ranking.ranker``. Reports queries/sec and p99 latency.
+"""
+
+import argparse
+import random
+import time
+from typing import List, NamedTuple
+
+from music.ranking import ranker
+
+ARTISTS = ["Daft Punk", "Adele", "Linkin Park", "Dua Lipa", "Coldplay", "The Weeknd", "Billie Eilish", "Queen"]
+SONGS = ["Get Lucky", "Hello", "Numb", "Levitating", "Yellow", "Blinding Lights", "bad guy", "Bohemian Rhapsody"]
+DECORATIONS = [
+    "(Official Music Video)", "(Official Audio)", "(Lyrics)", "[HD]", "Remix", "(Cover)", "nightcore",
+    "slowed + reverb", "(Live Version)", "Karaoke", "8D Audio", "", "(Acoustic Version)", "sped up",
+]
+UPLOADERS = ["VEVO", "Official", "Records", "Lyrics Channel", "random user", "DJ Mixes", "Topic", "cover band"]
+
+
+class Result(NamedTuple):
+    title: str
+    author: str
+    duration: int
+
+
+def _results(rng: random.Random, n: int) -> List[Result]:
+    out = []
+    for _ in range(n):
+        artist, song = rng.choice(ARTISTS), rng.choice(SONGS)
+        title = f"{artist} - {song} {rng.choice(DECORATIONS)}".strip()
+        author = f"{artist}{rng.choice(UPLOADERS)}" if rng.random() < 0.5 else rng.choice(UPLOADERS)
+        out.append(Result(title, author, rng.randint(60_000, 900_000)))
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=10000)
+    parser.add_argument("--results", type=int, default=25, help="results per query")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    sets = [(_results(rng, args.results), f"{rng.choice(ARTISTS)} {rng.choice(SONGS)}") for _ in range(args.queries)]
+
+    samples: List[int] = []
+    for tracks, query in sets:
+        t0 = time.perf_counter_ns()
+        ranker.rank(tracks, query)
+        samples.append(time.perf_counter_ns() - t0)
+    samples.sort()
+    total = sum(samples) / 1e9
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))] / 1e3
+    print(f"{args.queries} queries x {args.results} results: {args.queries / total:,.0f} queries/sec, p99 {p99:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
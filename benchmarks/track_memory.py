@@ -0,0 +1,73 @@
+"""Per-track memory and on-disk size of a 10k-track queue: legacy dicts vs Track records.
+
+Run from the repository root:
+
+    python -m benchmarks.track_memory [--tracks 10000] [--authors 200]
+
+Both sides are loaded from JSON, as the queue stores do on startup, so
+strings are not shared by accident (json.loads allocates each occurrence).
+"""
+
+import argparse
+import gc
+import json
+import random
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+from music.track import Track
+
+
+def _legacy_tracks(n: int, authors: int, rng: random.Random) -> List[Dict[str, Any]]:
+    names = [f"Artist {i} - Official" for i in range(authors)]
+    out = []
+    for i in range(n):
+        ident = "".join(rng.choice("abcdefghijklmnopqrstuvwxyzABCDEFGHIJ0123456789_-") for _ in range(11))
+        out.append({
+            "title": f"Song number {i} (Official Music Video)",
+            "uri": f"https://www.youtube.com/watch?v={ident}",
+            "duration": rng.randint(90_000, 420_000),
+            "identifier": ident,
+            "author": rng.choice(names),
+            "requester": rng.choice((603003195911831573, 391104581226627072, 208269112935497728)),
+        })
+    return out
+
+
+def _measure(build: Callable[[], Any]) -> Tuple[Any, int]:
+    gc.collect()
+    tracemalloc.start()
+    obj = build()
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tracks", type=int, default=10_000)
+    parser.add_argument("--authors", type=int, default=200)
+    args = parser.parse_args()
+
+    legacy = _legacy_tracks(args.tracks, args.authors, random.Random(0))
+    dict_json = json.dumps(legacy, ensure_ascii=False, indent=2)  # what queue_data.json used to hold
+    compact_json = json.dumps([Track.decode(t).encode() for t in legacy], ensure_ascii=False, separators=(",", ":"))
+    del legacy
+
+    dicts, dict_bytes = _measure(lambda: json.loads(dict_json))
+    del dicts
+    tracks, track_bytes = _measure(lambda: [Track.decode(t) for t in json.loads(compact_json)])
+    del tracks
+
+    n = args.tracks
+    print(f"{n} tracks, {args.authors} distinct authors")
+    print(f"{'':<18}{'memory/track':>14}{'disk/track':>12}")
+    print(f"{'dict (before)':<18}{dict_bytes / n:>12.0f} B{len(dict_json.encode()) / n:>10.0f} B")
+    print(f"{'Track (after)':<18}{track_bytes / n:>12.0f} B{len(compact_json.encode()) / n:>10.0f} B")
+    print(f"memory saved: {100 * (1 - track_bytes / dict_bytes):.0f}%, "
+          f"disk saved: {100 * (1 - len(compact_json) / len(dict_json)):.0f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+import asyncio
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .cache import LRUCache
+from .track import Track, TrackData
+
+DEFAULT_SPILL_PATH = os.path.join(os.path.dirname(__file__), "alternatives.sqlite3")
+SPILL_BATCH = 32  # evicted entries written to the spill file per transaction
+
+
+class AlternativesCache:
+    """
+    Other search results for a queued track, keyed by the chosen track's
+    identifier and kept out of the queue file.
+
+    ``/play`` stores the runner-up results here and the 🔎 picker reads them
+    back. The in-memory part is a bounded LRU; with ``spill_path`` set,
+    evicted entries are written to a small SQLite file (itself capped at
+    ``spill_max`` rows, oldest first) and promoted back on the next lookup.
+
+    Eviction happens inside ``put`` (on the event loop), so it only parks the
+    entry; once ``SPILL_BATCH`` are parked they are written in one transaction
+    on the cache's own writer thread. Parked and in-flight entries are still
+    found by ``get``, which reads the spill file on a reader thread through
+    its own read-only connection, so a lookup neither blocks the event loop
+    nor waits for a batch being written.
+    """
+
+    def __init__(self, maxsize: int = 512, spill_path: Optional[str] = None, spill_max: int = 20000):
+        self._spill: Optional[sqlite3.Connection] = None
+        self._spill_lock = threading.Lock()
+        self.spill_max = max(1, int(spill_max))
+        self._spill_writes = 0
+        # Evicted entries waiting for the next batch, and the batch being written: identifier -> (evicted at, alternatives)
+        self._parked: Dict[str, Tuple[float, List[Track]]] = {}
+        self._writing: Dict[str, Tuple[float, List[Track]]] = {}
+        self._parked_lock = threading.Lock()
+        self._write_queued = False
+        self._writer: Optional[ThreadPoolExecutor] = None
+        self._reader: Optional[ThreadPoolExecutor] = None
+        self._spill_read: Optional[sqlite3.Connection] = None  # only used on the reader thread
+        if spill_path:
+            os.makedirs(os.path.dirname(spill_path), exist_ok=True)
+            self._spill = sqlite3.connect(spill_path, isolation_level=None, check_same_thread=False)
+            self._spill.execute("PRAGMA journal_mode=WAL")
+            self._spill.execute(
+                "CREATE TABLE IF NOT EXISTS alternatives ("
+                "identifier TEXT PRIMARY KEY, data TEXT NOT NULL, used REAL NOT NULL)"
+            )
+            self._spill_read = sqlite3.connect(f"file:{spill_path}?mode=ro", uri=True, check_same_thread=False)
+            self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="alternatives-spill")
+            self._reader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="alternatives-read")
+        self._memory: LRUCache[str, List[Track]] = LRUCache(
+            maxsize, on_evict=self._park if self._spill else None
+        )
+        if self._spill is not None:
+            atexit.register(self.close)
+
+    def _park(self, identifier: str, alternatives: List[Track]) -> None:
+        with self._parked_lock:
+            self._parked[identifier] = (time.time(), alternatives)
+            full = len(self._parked) >= SPILL_BATCH and not self._write_queued
+            if full:
+                self._write_queued = True
+        if full:
+            self._writer.submit(self._write_spill)
+
+    def _write_spill(self) -> None:
+        """Write every parked entry in one transaction (on the writer thread, or at close)."""
+        with self._parked_lock:
+            self._write_queued = False
+            if not self._parked:
+                return
+            batch, self._parked = self._parked, {}
+            self._writing = batch
+        rows = [
+            (identifier, json.dumps([t.encode() for t in alts], ensure_ascii=False, separators=(",", ":")), used)
+            for identifier, (used, alts) in batch.items()
+        ]
+        try:
+            with self._spill_lock:
+                self._spill.execute("BEGIN")
+                try:
+                    self._spill.executemany(
+                        "INSERT OR REPLACE INTO alternatives (identifier, data, used) VALUES (?, ?, ?)", rows
+                    )
+                    before = self._spill_writes
+                    self._spill_writes += len(rows)
+                    if self._spill_writes // 100 != before // 100:
+                        self._spill.execute(
+                            "DELETE FROM alternatives WHERE identifier NOT IN "
+                            "(SELECT identifier FROM alternatives ORDER BY used DESC LIMIT ?)",
+                            (self.spill_max,),
+                        )
+                    self._spill.execute("COMMIT")
+                except BaseException:
+                    self._spill.execute("ROLLBACK")
+                    raise
+        finally:
+            with self._parked_lock:
+                self._writing = {}
+
+    def _read_spill(self, identifier: str) -> Optional[List[Track]]:
+        # Reader thread. WAL lets this read run while the writer holds its transaction open.
+        with self._parked_lock:
+            waiting = self._parked.pop(identifier, None) or self._writing.get(identifier)
+        if waiting is not None:
+            return waiting[1]
+        row = self._spill_read.execute(
+            "SELECT data FROM alternatives WHERE identifier = ?", (identifier,)
+        ).fetchone()
+        return [Track.decode(t) for t in json.loads(row[0])] if row else None
+
+    async def get(self, identifier: Optional[str]) -> List[Track]:
+        """Cached alternatives for ``identifier`` (empty list when unknown)."""
+        if not identifier:
+            return []
+        alternatives = self._memory.get(identifier)
+        if alternatives is None and self._spill is not None:
+            loop = asyncio.get_running_loop()
+            alternatives = await loop.run_in_executor(self._reader, self._read_spill, identifier)
+            if alternatives is not None:
+                self._memory.put(identifier, alternatives)
+        return list(alternatives or [])
+
+    def put(self, identifier: Optional[str], alternatives: Iterable[TrackData]) -> None:
+        if not identifier:
+            return
+        self._memory.put(identifier, [Track.decode(t) for t in alternatives])
+
+    def stats(self) -> dict:
+        return self._memory.stats()
+
+    def close(self) -> None:
+        """Spill everything still in memory (when spilling is enabled) and close the file."""
+        if self._spill is None:
+            return
+        self._writer.shutdown(wait=True)
+        self._reader.shutdown(wait=True)
+        self._memory.on_evict = None  # later evictions just drop; the writer is gone
+        for identifier in self._memory.keys():
+            alternatives = self._memory.pop(identifier)
+            if alternatives is not None:
+                with self._parked_lock:
+                    self._parked[identifier] = (time.time(), alternatives)
+        self._write_spill()
+        with self._spill_lock:
+            self._spill.close()
+        self._spill_read.close()
+        self._spill = self._spill_read = None
+
+
+def open_alternatives_cache() -> AlternativesCache:
+    """Alternatives cache configured from the environment.
+
+    ``ALTERNATIVES_CACHE_SIZE`` bounds the in-memory entries (default 512);
+    ``ALTERNATIVES_SPILL=1`` spills evicted entries to alternatives.sqlite3.
+    """
+    size = int(os.getenv("ALTERNATIVES_CACHE_SIZE") or 512)
+    spill = (os.getenv("ALTERNATIVES_SPILL") or "").strip().lower() in ("1", "true", "yes", "on")
+    return AlternativesCache(size, spill_path=DEFAULT_SPILL_PATH if spill else None)
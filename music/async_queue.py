@@ -0,0 +1,134 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from .persistent_queue import GuildTransaction, PersistentQueue
+from .track import Track, TrackData
+
+T = TypeVar("T")
+
+
+class AsyncQueueStore:
+    """
+    Event-loop-safe facade over a PersistentQueue (any backend).
+
+    Every call runs on a small dedicated thread pool so JSON serialization and
+    disk/SQLite I/O never block the bot's event loop. Mutations are serialized
+    per guild with an asyncio.Lock, so writes for one guild land in the order
+    they were awaited. ``store`` is the wrapped sync store; code on the event
+    loop shouldn't call it (read what a View needs before building it).
+    """
+
+    def __init__(self, store: PersistentQueue, max_workers: int = 2):
+        self.store = store
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="queue-store")
+        self._locks: Dict[int, asyncio.Lock] = {}
+
+    def _lock(self, guild_id: int) -> asyncio.Lock:
+        lock = self._locks.get(guild_id)
+        if not lock:
+            lock = asyncio.Lock()
+            self._locks[guild_id] = lock
+        return lock
+
+    async def _run(self, fn: Callable[..., T], *args: Any) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args))
+
+    async def _write(self, guild_id: int, fn: Callable[..., T], *args: Any) -> T:
+        async with self._lock(guild_id):
+            return await self._run(fn, guild_id, *args)
+
+    async def transaction(self, guild_id: int, fn: Callable[[GuildTransaction], T]) -> T:
+        """Run ``fn(g)`` inside ``store.transaction(guild_id)`` off the loop and return its result."""
+        def run() -> T:
+            with self.store.transaction(guild_id) as g:
+                return fn(g)
+
+        async with self._lock(guild_id):
+            return await self._run(run)
+
+    async def close(self) -> None:
+        await self._run(self.store.close)
+        self._executor.shutdown(wait=False)
+
+    # Reads
+    async def get_guild(self, guild_id: int) -> Dict[str, Any]:
+        return await self._run(self.store.get_guild, guild_id)
+
+    async def get_guild_prop(self, guild_id: int, key: str, default: Any = None) -> Any:
+        return await self._run(self.store.get_guild_prop, guild_id, key, default)
+
+    async def get_queue(self, guild_id: int) -> List[Track]:
+        return await self._run(self.store.get_queue, guild_id)
+
+    async def get_index(self, guild_id: int) -> int:
+        return await self._run(self.store.get_index, guild_id)
+
+    async def current_track(self, guild_id: int) -> Optional[Track]:
+        return await self._run(self.store.current_track, guild_id)
+
+    async def next_index(self, guild_id: int) -> int:
+        return await self._run(self.store.next_index, guild_id)
+
+    async def step_index(self, guild_id: int, delta: int, wrap: bool = False) -> Optional[int]:
+        return await self._run(self.store.step_index, guild_id, delta, wrap)
+
+    async def length(self, guild_id: int) -> int:
+        return await self._run(self.store.length, guild_id)
+
+    async def item(self, guild_id: int, index: int) -> Optional[Track]:
+        return await self._run(self.store.item, guild_id, index)
+
+    async def window(self, guild_id: int, offset: int, limit: int) -> List[Track]:
+        return await self._run(self.store.window, guild_id, offset, limit)
+
+    async def page(self, guild_id: int, offset: int, limit: int) -> Tuple[int, int, List[Track]]:
+        return await self._run(self.store.page, guild_id, offset, limit)
+
+    async def current(self, guild_id: int) -> Tuple[int, Optional[Track]]:
+        return await self._run(self.store.current, guild_id)
+
+    # Writes
+    async def set_guild_prop(self, guild_id: int, key: str, value: Any) -> None:
+        await self._write(guild_id, self.store.set_guild_prop, key, value)
+
+    async def clear_guild(self, guild_id: int) -> None:
+        await self._write(guild_id, self.store.clear_guild)
+
+    async def set_index(self, guild_id: int, index: int) -> None:
+        await self._write(guild_id, self.store.set_index, index)
+
+    async def append_track(self, guild_id: int, track: TrackData) -> None:
+        await self._write(guild_id, self.store.append_track, track)
+
+    async def extend_tracks(self, guild_id: int, tracks: List[TrackData]) -> None:
+        await self._write(guild_id, self.store.extend_tracks, tracks)
+
+    async def remove_at(self, guild_id: int, index: int) -> Optional[Track]:
+        return await self._write(guild_id, self.store.remove_at, index)
+
+    async def remove_range(self, guild_id: int, start: int, stop: int) -> int:
+        return await self._write(guild_id, self.store.remove_range, start, stop)
+
+    async def remove_by_requester(self, guild_id: int, requester: int) -> int:
+        return await self._write(guild_id, self.store.remove_by_requester, requester)
+
+    async def move_track(self, guild_id: int, src: int, dst: int) -> Optional[Track]:
+        return await self._write(guild_id, self.store.move_track, src, dst)
+
+    async def swap_tracks(self, guild_id: int, i: int, j: int) -> bool:
+        return await self._write(guild_id, self.store.swap_tracks, i, j)
+
+    async def set_queue(self, guild_id: int, tracks: List[TrackData]) -> None:
+        await self._write(guild_id, self.store.set_queue, tracks)
+
+    async def update_track(self, guild_id: int, index: int, track_data: TrackData) -> bool:
+        return await self._write(guild_id, self.store.update_track, index, track_data)
+
+    async def shuffle(self, guild_id: int) -> None:
+        await self._write(guild_id, self.store.shuffle)
+
+    async def unshuffle(self, guild_id: int) -> None:
+        await self._write(guild_id, self.store.unshuffle)
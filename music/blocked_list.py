@@ -0,0 +1,150 @@
+from typing import Any, Iterable, Iterator, List, Tuple, Union
+
+
+class BlockedList:
+    """
+    List-like sequence stored as a list of bounded blocks (a "blocked list").
+
+    Indexing, ``insert``, ``pop`` and deleting a slice touch one or two blocks
+    plus a scan over the block lengths, i.e. O(sqrt(n))-ish instead of the
+    O(n) element shifts of a plain list. It supports exactly the list API the
+    queue stores use, so ``_apply_op`` works on either.
+    """
+
+    __slots__ = ("_blocks", "_len")
+    __hash__ = None  # type: ignore[assignment]
+
+    BLOCK = 256  # target block size; blocks split at 2 * BLOCK
+
+    def __init__(self, items: Iterable[Any] = ()):
+        items = list(items)
+        b = self.BLOCK
+        self._blocks: List[List[Any]] = [items[i:i + b] for i in range(0, len(items), b)]
+        self._len = len(items)
+
+    # --- internals ---
+
+    def _locate(self, index: int) -> Tuple[int, int]:
+        """(block number, offset) of a non-negative, in-range index."""
+        for bi, block in enumerate(self._blocks):
+            if index < len(block):
+                return bi, index
+            index -= len(block)
+        raise IndexError("BlockedList index out of range")
+
+    def _norm(self, index: int) -> int:
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError("BlockedList index out of range")
+        return index
+
+    def _split(self, bi: int) -> None:
+        block = self._blocks[bi]
+        if len(block) > 2 * self.BLOCK:
+            self._blocks[bi:bi + 1] = [block[:self.BLOCK], block[self.BLOCK:]]
+
+    # --- list API ---
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self) -> Iterator[Any]:
+        for block in self._blocks:
+            yield from block
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._len)
+            if step != 1:
+                return list(self)[index]
+            out: List[Any] = []
+            if start >= stop:
+                return out
+            bi, off = self._locate(start)
+            need = stop - start
+            for block in self._blocks[bi:]:
+                chunk = block[off:off + need]
+                out.extend(chunk)
+                need -= len(chunk)
+                off = 0
+                if not need:
+                    break
+            return out
+        bi, off = self._locate(self._norm(index))
+        return self._blocks[bi][off]
+
+    def __setitem__(self, index: int, value: Any) -> None:
+        bi, off = self._locate(self._norm(index))
+        self._blocks[bi][off] = value
+
+    def __delitem__(self, index: Union[int, slice]) -> None:
+        if not isinstance(index, slice):
+            self.pop(index)
+            return
+        start, stop, step = index.indices(self._len)
+        if step != 1:
+            for i in sorted(range(start, stop, step), reverse=True):
+                self.pop(i)
+            return
+        if start >= stop:
+            return
+        bi, off = self._locate(start)
+        need = stop - start
+        self._len -= need
+        while need:
+            block = self._blocks[bi]
+            take = min(need, len(block) - off)
+            del block[off:off + take]
+            need -= take
+            if block:
+                bi += 1
+            else:
+                del self._blocks[bi]
+            off = 0
+
+    def insert(self, index: int, value: Any) -> None:
+        if index < 0:
+            index = max(0, index + self._len)
+        if not self._blocks:
+            self._blocks.append([value])
+        elif index >= self._len:
+            self._blocks[-1].append(value)
+            self._split(len(self._blocks) - 1)
+        else:
+            bi, off = self._locate(index)
+            self._blocks[bi].insert(off, value)
+            self._split(bi)
+        self._len += 1
+
+    def append(self, value: Any) -> None:
+        self.insert(self._len, value)
+
+    def extend(self, values: Iterable[Any]) -> None:
+        values = list(values)
+        if not values:
+            return
+        if self._blocks and len(self._blocks[-1]) < self.BLOCK:
+            room = self.BLOCK - len(self._blocks[-1])
+            self._blocks[-1].extend(values[:room])
+            values = values[room:]
+        b = self.BLOCK
+        self._blocks.extend(values[i:i + b] for i in range(0, len(values), b))
+        self._len = sum(len(block) for block in self._blocks)
+
+    def pop(self, index: int = -1) -> Any:
+        bi, off = self._locate(self._norm(index))
+        block = self._blocks[bi]
+        value = block.pop(off)
+        if not block:
+            del self._blocks[bi]
+        self._len -= 1
+        return value
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (BlockedList, list)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"BlockedList({list(self)!r})"
@@ -1,17 +1,29 @@
 import discord
 import lavalink
 from typing import Dict, List, Tuple, Callable, Optional
-import random
 import logging
 import asyncio
 
+from .alternatives import AlternativesCache
+from .engine import PlaybackEngine
+from .resolver import get_tracks
+from .track import Track
 from .utils import format_duration
 
 logger = logging.getLogger(__name__)
 
 
 class PlayerControls(discord.ui.View):
-    """Enhanced music player controls with persistent queue support."""
+    """Enhanced music player controls with persistent queue support.
+
+    ``queue_store`` is the AsyncQueueStore facade; button callbacks await it so
+    queue I/O never blocks the event loop. ``alternatives`` is the
+    AlternativesCache the 🔎 picker reads other search results from.
+    ``get_engine_func(guild_id)`` returns the guild's PlaybackEngine, which
+    every button that changes the playing track goes through. ``loop_mode``
+    is the guild's loop setting, read by the caller beforehand so building
+    the view never touches the store.
+    """
     
     def __init__(
         self,
@@ -20,10 +32,16 @@ class PlayerControls(discord.ui.View):
         get_prefs_func: Callable | None = None,
         apply_eq_func: Callable | None = None,
         eq_presets: Dict[str, List[Tuple[int, float]]] | None = None,
+        alternatives: AlternativesCache | None = None,
+        get_engine_func: Callable[[int], PlaybackEngine] | None = None,
+        loop_mode: int = 0,
     ):
         super().__init__(timeout=None)
         self.player = player
         self.queue_store = queue_store
+        self.alternatives = alternatives
+        self.get_engine = get_engine_func
+        self.loop_mode = loop_mode
         self.get_prefs = get_prefs_func
         self.apply_equalizer = apply_eq_func
         self.eq_presets = eq_presets or {}
@@ -53,13 +71,9 @@ class PlayerControls(discord.ui.View):
         except Exception:
             pass
 
-        # Loop label - get from queue store if available
+        # Loop label - from the queue store (see refresh_loop_mode) if available
         if self.queue_store:
-            try:
-                guild_data = self.queue_store.get_guild(self.player.guild_id)
-                loop_state = guild_data.get('loop', 0)
-            except Exception:
-                loop_state = 0
+            loop_state = self.loop_mode
         else:
             loop_state = self.player.fetch('loop') or 0
             
@@ -82,6 +96,14 @@ class PlayerControls(discord.ui.View):
         except Exception:
             pass
 
+    async def refresh_loop_mode(self) -> None:
+        """Re-read the loop mode (it may have changed via /loop since the view was built)."""
+        if self.queue_store:
+            try:
+                self.loop_mode = int(await self.queue_store.get_guild_prop(self.player.guild_id, 'loop', 0))
+            except Exception:
+                pass
+
     async def interaction_check(self, interaction: discord.Interaction) -> bool:
         """Check if user can interact with the controls."""
         if not interaction.user.voice:
@@ -100,15 +122,11 @@ class PlayerControls(discord.ui.View):
         try:
             if not self.queue_store:
                 self.update_buttons()
-                await interaction.response.edit_message(view=self)
+                await self._edit_panel(interaction, view=self)
                 return
 
-            # Get current track and queue info
-            guild_id = interaction.guild.id
-            current_index = self.queue_store.get_index(guild_id)
-            queue = self.queue_store.get_queue(guild_id)
-            guild_data = self.queue_store.get_guild(guild_id)
-            
+            await self.refresh_loop_mode()
+
             # Update the embed if message has one
             if interaction.message and interaction.message.embeds:
                 embed = interaction.message.embeds[0]
@@ -123,18 +141,25 @@ class PlayerControls(discord.ui.View):
                     logger.error(f"[PlayerControls] Error updating embed fields: {e}")
                 
                 self.update_buttons()
-                await interaction.response.edit_message(embed=embed, view=self)
+                await self._edit_panel(interaction, embed=embed, view=self)
             else:
                 self.update_buttons()
-                await interaction.response.edit_message(view=self)
+                await self._edit_panel(interaction, view=self)
                     
         except Exception as e:
             logger.error(f"[PlayerControls] Error updating embed and view: {e}")
             try:
-                await interaction.response.edit_message(view=self)
+                await self._edit_panel(interaction, view=self)
             except:
                 pass
 
+    async def _edit_panel(self, interaction: discord.Interaction, **fields) -> None:
+        """Edit the panel message, whether or not the interaction was deferred."""
+        if interaction.response.is_done():
+            await interaction.edit_original_response(**fields)
+        else:
+            await interaction.response.edit_message(**fields)
+
     async def _edit_added_to_queue_message(self, interaction: discord.Interaction, track_data: Dict):
         """Best-effort: update the original 'Added ... to the queue' message for the current queue item."""
         try:
@@ -167,32 +192,22 @@ class PlayerControls(discord.ui.View):
     async def _get_current_track_and_index(self, guild_id: int):
         if not self.queue_store:
             return None, None
-        idx = self.queue_store.get_index(guild_id)
-        queue = self.queue_store.get_queue(guild_id)
-        if not (0 <= idx < len(queue)):
+        idx, track = await self.queue_store.current(guild_id)
+        if track is None:
             return None, None
-        return queue[idx], idx
+        return track, idx
 
-    async def _load_youtube_alternatives(self, query: str, max_items: int = 10) -> List[Dict]:
-        """Run a ytsearch and return a JSON-serializable list of alternative tracks."""
+    async def _load_youtube_alternatives(self, query: str, max_items: int = 10) -> List[Track]:
+        """Run a ytsearch and return the results as alternative tracks."""
         normalized = self._normalize_query(query)
         if not normalized:
             return []
 
-        results = await self.player.node.get_tracks(f"ytsearch:{normalized}")
+        results = await get_tracks(self.player.node, f"ytsearch:{normalized}")
         if not results or not getattr(results, 'tracks', None):
             return []
 
-        alternatives: List[Dict] = []
-        for t in results.tracks[: max_items + 1]:
-            alternatives.append({
-                'title': getattr(t, 'title', 'Unknown'),
-                'uri': getattr(t, 'uri', ''),
-                'duration': getattr(t, 'duration', 0),
-                'identifier': getattr(t, 'identifier', ''),
-                'author': getattr(t, 'author', ''),
-            })
-        return alternatives
+        return [Track.from_lavalink(t) for t in results.tracks[: max_items + 1]]
 
     @discord.ui.button(emoji="🔎", style=discord.ButtonStyle.secondary, row=1)
     async def search(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -206,8 +221,12 @@ class PlayerControls(discord.ui.View):
             if current_track is None or current_index is None:
                 return await interaction.response.send_message("Nothing is currently queued/playing.", ephemeral=True)
 
-            # Prefer cached alternatives from /play; otherwise generate from current title/author.
-            alternatives: List[Dict] = list(current_track.get('alternatives') or [])
+            # Prefer cached alternatives from /play (or entries queued before the side cache existed);
+            # otherwise generate from current title/author.
+            identifier = current_track.get('identifier')
+            alternatives: List[Track] = await self.alternatives.get(identifier) if self.alternatives else []
+            if not alternatives:
+                alternatives = [Track.decode(a) for a in current_track.get('alternatives') or []]
             if not alternatives:
                 query = f"{current_track.get('author','')} {current_track.get('title','')}".strip()
                 alternatives = await self._load_youtube_alternatives(query, max_items=10)
@@ -219,14 +238,9 @@ class PlayerControls(discord.ui.View):
                 except Exception:
                     pass
 
-                # Cache for next time.
-                try:
-                    updated = dict(current_track)
-                    updated['alternatives'] = alternatives
-                    self.queue_store.update_track(guild_id, int(current_index), updated)
-                    current_track = updated
-                except Exception:
-                    pass
+                # Cache for next time (in the side cache; the queue entry stays untouched).
+                if self.alternatives:
+                    self.alternatives.put(identifier, alternatives)
 
             if not alternatives:
                 return await interaction.response.send_message(
@@ -281,28 +295,32 @@ class PlayerControls(discord.ui.View):
                         alt = alternatives[picked]
 
                         # Update queue item data.
-                        new_data = dict(current_track)
-                        new_data.update({
-                            'title': alt.get('title'),
-                            'uri': alt.get('uri'),
-                            'duration': alt.get('duration'),
-                            'identifier': alt.get('identifier'),
-                            'author': alt.get('author'),
-                            'requester': requester_id,
-                            'alternatives': [],
-                        })
-
-                        if not outer.queue_store.update_track(guild_id, int(current_index), new_data):
+                        new_data = current_track.replace(
+                            title=alt.get('title'),
+                            uri=alt.get('uri'),
+                            duration=alt.get('duration'),
+                            identifier=alt.get('identifier'),
+                            author=alt.get('author'),
+                            requester=requester_id,
+                            encoded=alt.encoded,
+                            alternatives=None,
+                        )
+
+                        if not await outer.queue_store.update_track(guild_id, int(current_index), new_data):
                             return await itx.edit_original_response(content="That track is no longer in the queue.")
 
-                        # Switch playback if we're currently on this index.
+                        # The previous pick becomes one of the choices for the new one.
+                        if outer.alternatives:
+                            others = [a for i, a in enumerate(alternatives) if i != picked]
+                            outer.alternatives.put(
+                                new_data.identifier,
+                                [Track(*current_track.encode()[:5], encoded=current_track.encoded)] + others,
+                            )
+
+                        # Switch playback to the new pick.
                         try:
-                            outer.queue_store.set_index(guild_id, int(current_index))
-                            res = await outer.player.node.get_tracks(new_data.get('uri'))
-                            if res and res.tracks:
-                                track_obj = res.tracks[0]
-                                track_obj.requester = requester_id
-                                await outer.player.play(track_obj)
+                            if outer.get_engine:
+                                await outer.get_engine(guild_id).jump(outer.player, int(current_index))
                         except Exception as e:
                             logger.debug(f"[PlayerControls] Failed to switch playback: {e}")
 
@@ -361,117 +379,73 @@ class PlayerControls(discord.ui.View):
     async def skip(self, interaction: discord.Interaction, button: discord.ui.Button):
         """Skip to next track."""
         try:
-            if not self.queue_store:
+            if not self.queue_store or not self.get_engine:
                 await interaction.response.send_message("Queue system not available.", ephemeral=True)
                 return
 
             guild_id = interaction.guild.id
-            guild_data = self.queue_store.get_guild(guild_id)
-            current_index = guild_data.get('index', 0)
-            queue = self.queue_store.get_queue(guild_id)
-            loop_mode = guild_data.get('loop', 0)
-            
-            # Calculate next index (skip always moves forward, even in track loop)
-            if current_index + 1 < len(queue):
-                next_index = current_index + 1
-            elif loop_mode == 2:  # Queue loop
-                next_index = 0
-            else:
-                await interaction.response.send_message("No next track to skip to.", ephemeral=True)
+
+            # Resolving the next track can outlast the interaction deadline, so acknowledge first
+            await interaction.response.defer()
+            if not await self.get_engine(guild_id).skip(self.player):
+                await interaction.followup.send("No next track to skip to.", ephemeral=True)
                 return
+
+            await self.update_embed_and_view(interaction)
             
-            # Set new index and play track
-            self.queue_store.set_index(guild_id, next_index)
-            
-            # Play the track at new index
-            current_track = self.queue_store.current_track(guild_id)
-            if current_track:
-                res = await self.player.node.get_tracks(current_track.get('uri'))
-                if res and res.tracks:
-                    track = res.tracks[0]
-                    track.requester = current_track.get('requester')
-                    await self.player.play(track)
-                    
-                    await self.update_embed_and_view(interaction)
-                    
-                    # Send ephemeral feedback message
-                    message = await interaction.followup.send(
-                        embed=discord.Embed(
-                            description=f"<:skip:1412530943121555546> **Skipped** to next track", 
-                            color=discord.Color.green()
-                        ), ephemeral=True
-                    )
-                    
-                    # Auto-delete after 3 seconds
-                    asyncio.create_task(self._auto_delete_message(message, 3))
-                    
-                    logger.info(f"[PlayerControls] Skipped to track at index {next_index} for guild {guild_id}")
-                else:
-                    await interaction.response.send_message("Error loading next track.", ephemeral=True)
-            else:
-                await interaction.response.send_message("No track found at next position.", ephemeral=True)
+            # Send ephemeral feedback message
+            message = await interaction.followup.send(
+                embed=discord.Embed(
+                    description=f"<:skip:1412530943121555546> **Skipped** to next track", 
+                    color=discord.Color.green()
+                ), ephemeral=True
+            )
+            
+            # Auto-delete after 3 seconds
+            asyncio.create_task(self._auto_delete_message(message, 3))
+            
+            logger.info(f"[PlayerControls] Skipped to next track for guild {guild_id}")
                 
         except Exception as e:
             logger.error(f"[PlayerControls] Error in skip for guild {interaction.guild.id}: {e}")
-            await interaction.response.send_message("Error skipping track.", ephemeral=True)
+            respond = interaction.followup.send if interaction.response.is_done() else interaction.response.send_message
+            await respond("Error skipping track.", ephemeral=True)
 
     @discord.ui.button(label="Back", style=discord.ButtonStyle.secondary, row=0)
     async def back(self, interaction: discord.Interaction, button: discord.ui.Button):
         """Go to previous track."""
         try:
-            if not self.queue_store:
+            if not self.queue_store or not self.get_engine:
                 await interaction.response.send_message("Queue system not available.", ephemeral=True)
                 return
 
             guild_id = interaction.guild.id
-            guild_data = self.queue_store.get_guild(guild_id)
-            current_index = guild_data.get('index', 0)
-            queue = self.queue_store.get_queue(guild_id)
-            
-            # Calculate previous index
-            if current_index > 0:
-                prev_index = current_index - 1
-            elif len(queue) > 0:
-                # Go to last track if at beginning
-                prev_index = len(queue) - 1
-            else:
-                await interaction.response.send_message("No previous track.", ephemeral=True)
+
+            # Resolving the next track can outlast the interaction deadline, so acknowledge first
+            await interaction.response.defer()
+            if not await self.get_engine(guild_id).previous(self.player):
+                await interaction.followup.send("No previous track.", ephemeral=True)
                 return
+
+            await self.update_embed_and_view(interaction)
             
-            # Set new index and play track
-            self.queue_store.set_index(guild_id, prev_index)
-            
-            # Play the track at new index
-            current_track = self.queue_store.current_track(guild_id)
-            if current_track:
-                res = await self.player.node.get_tracks(current_track.get('uri'))
-                if res and res.tracks:
-                    track = res.tracks[0]
-                    track.requester = current_track.get('requester')
-                    await self.player.play(track)
-                    
-                    await self.update_embed_and_view(interaction)
-                    
-                    # Send ephemeral feedback message
-                    message = await interaction.followup.send(
-                        embed=discord.Embed(
-                            description=f"<:prev:1412530972779352214> **Went back** to previous track", 
-                            color=discord.Color.green()
-                        ), ephemeral=True
-                    )
-                    
-                    # Auto-delete after 3 seconds
-                    asyncio.create_task(self._auto_delete_message(message, 3))
-                    
-                    logger.info(f"[PlayerControls] Went back to track at index {prev_index} for guild {guild_id}")
-                else:
-                    await interaction.response.send_message("Error loading previous track.", ephemeral=True)
-            else:
-                await interaction.response.send_message("No track found at previous position.", ephemeral=True)
+            # Send ephemeral feedback message
+            message = await interaction.followup.send(
+                embed=discord.Embed(
+                    description=f"<:prev:1412530972779352214> **Went back** to previous track", 
+                    color=discord.Color.green()
+                ), ephemeral=True
+            )
+            
+            # Auto-delete after 3 seconds
+            asyncio.create_task(self._auto_delete_message(message, 3))
+            
+            logger.info(f"[PlayerControls] Went back to previous track for guild {guild_id}")
                 
         except Exception as e:
             logger.error(f"[PlayerControls] Error in back for guild {interaction.guild.id}: {e}")
-            await interaction.response.send_message("Error going back.", ephemeral=True)
+            respond = interaction.followup.send if interaction.response.is_done() else interaction.response.send_message
+            await respond("Error going back.", ephemeral=True)
 
     @discord.ui.button(label="Down", style=discord.ButtonStyle.secondary, row=0)
     async def vol_down(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -557,7 +531,9 @@ class PlayerControls(discord.ui.View):
                     prefs['volume'] = 70
                     
                 if self.queue_store:
-                    self.queue_store.clear_guild(interaction.guild.id)
+                    await self.queue_store.clear_guild(interaction.guild.id)
+                if self.get_engine:
+                    self.get_engine(interaction.guild.id).reset()
                     
                 self.player.store('volume', 70)
             
@@ -583,10 +559,13 @@ class PlayerControls(discord.ui.View):
                 cur = (int(cur) + 1) % 3
                 self.player.store('loop', cur)
             else:
-                guild_data = self.queue_store.get_guild(interaction.guild.id)
-                cur = guild_data.get('loop', 0)
-                cur = (int(cur) + 1) % 3
-                self.queue_store.set_guild_prop(interaction.guild.id, 'loop', cur)
+                def cycle(g) -> int:
+                    new_loop = (int(g.get_guild_prop('loop', 0)) + 1) % 3
+                    g.set_guild_prop('loop', new_loop)
+                    return new_loop
+
+                cur = await self.queue_store.transaction(interaction.guild.id, cycle)
+                self.loop_mode = cur
             
             # Update the embed to reflect the new loop mode
             await self.update_embed_and_view(interaction)
@@ -622,37 +601,32 @@ class PlayerControls(discord.ui.View):
                 return
 
             guild_id = interaction.guild.id
-            queue = self.queue_store.get_queue(guild_id)
+
+            def toggle_shuffle(g):
+                # Toggles the play-order overlay; the queue itself is never rewritten
+                if len(g) < 2:
+                    return None
+                if g.is_shuffled():
+                    g.unshuffle()
+                    return False
+                g.shuffle()
+                return True
+
+            shuffled = await self.queue_store.transaction(guild_id, toggle_shuffle)
             
-            if len(queue) < 2:
+            if shuffled is None:
                 await interaction.response.send_message("Need at least 2 tracks to shuffle.", ephemeral=True)
                 return
             
-            # Get current track to preserve it
-            current_index = self.queue_store.get_index(guild_id)
-            current_track = None
-            if 0 <= current_index < len(queue):
-                current_track = queue[current_index]
-            
-            # Shuffle the queue
-            random.shuffle(queue)
-            
-            # If there was a current track, move it to the front and update index
-            if current_track:
-                if current_track in queue:
-                    queue.remove(current_track)
-                queue.insert(0, current_track)
-                self.queue_store.set_index(guild_id, 0)
-            
-            # Save shuffled queue using the new method
-            self.queue_store.set_queue(guild_id, queue)
-            
             await self.update_embed_and_view(interaction)
             
             # Send ephemeral feedback message
             message = await interaction.followup.send(
                 embed=discord.Embed(
-                    description=f"<:shuffle:1412532183750676532> **Shuffled** the queue", 
+                    description=(
+                        f"<:shuffle:1412532183750676532> **Shuffled** the queue" if shuffled
+                        else "➡️ **Unshuffled** - back to the original order"
+                    ), 
                     color=discord.Color.green()
                 ), ephemeral=True
             )
@@ -675,19 +649,18 @@ class PlayerControls(discord.ui.View):
                 return
 
             guild_id = interaction.guild.id
-            queue = self.queue_store.get_queue(guild_id)
-            
-            if not queue:
+            queue_length, current_index, _ = await self.queue_store.page(guild_id, 0, 0)
+            if not queue_length:
                 await interaction.response.send_message("Queue is empty.", ephemeral=True)
                 return
             
             # Show current page (around current playing track)
-            current_index = self.queue_store.get_index(guild_id)
             items_per_page = 10
             current_page = current_index // items_per_page
             
             # Create interactive queue view
-            view = QueueView(self.queue_store, guild_id, current_page)
+            view = QueueView(self.queue_store, guild_id, current_page, self.get_engine)
+            await view.refresh()
             embed = view.get_queue_embed()
             
             message = await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
@@ -707,23 +680,47 @@ class PlayerControls(discord.ui.View):
 
 
 class QueueView(discord.ui.View):
-    """Interactive queue view with pagination and clear button."""
+    """Interactive queue view with pagination and clear button.
+
+    ``queue_store`` is the AsyncQueueStore facade. ``refresh()`` reads the
+    queue length, current index and the visible page off the event loop, in
+    one store call so they always agree;
+    await it before ``get_queue_embed()`` whenever the page or queue changes.
+    ``get_engine_func`` (as for PlayerControls) lets Clear drop the guild's
+    prefetched tracks along with the queue.
+    """
     
-    def __init__(self, queue_store, guild_id: int, current_page: int = 0):
+    def __init__(
+        self,
+        queue_store,
+        guild_id: int,
+        current_page: int = 0,
+        get_engine_func: Callable[[int], PlaybackEngine] | None = None,
+    ):
         super().__init__(timeout=300)
         self.queue_store = queue_store
+        self.get_engine = get_engine_func
         self.guild_id = guild_id
         self.current_page = current_page
         self.items_per_page = 10
+        self.queue_length = 0
+        self.current_index = 0
+        self.page: List[Track] = []
+
+    async def refresh(self):
+        """Load what the current page shows, then update the buttons."""
+        self.queue_length, self.current_index, self.page = await self.queue_store.page(
+            self.guild_id, self.current_page * self.items_per_page, self.items_per_page
+        )
         self.update_buttons()
     
     def update_buttons(self):
         """Update button states based on current page."""
-        queue = self.queue_store.get_queue(self.guild_id)
-        if not queue:
+        queue_length = self.queue_length
+        if not queue_length:
             return
         
-        total_pages = max(1, -(-len(queue) // self.items_per_page))
+        total_pages = max(1, -(-queue_length // self.items_per_page))
         
         # Update Previous button
         self.previous_page.disabled = self.current_page <= 0
@@ -732,37 +729,36 @@ class QueueView(discord.ui.View):
         self.next_page.disabled = self.current_page >= total_pages - 1
         
         # Update Clear button (always enabled if queue exists)
-        self.clear_queue.disabled = len(queue) == 0
+        self.clear_queue.disabled = queue_length == 0
     
     def get_queue_embed(self):
-        """Generate the queue embed for current page."""
-        queue = self.queue_store.get_queue(self.guild_id)
-        current_index = self.queue_store.get_index(self.guild_id)
+        """Generate the queue embed for current page (from the last ``refresh()``)."""
+        queue_length = self.queue_length
+        current_index = self.current_index
         
-        if not queue:
+        if not queue_length:
             return discord.Embed(
                 description="The queue is empty.", 
                 color=discord.Color.orange()
             )
         
         start_index = self.current_page * self.items_per_page
-        end_index = min(start_index + self.items_per_page, len(queue))
+        page = self.page
         
         queue_list = ""
-        for i in range(start_index, end_index):
-            track = queue[i]
+        for i, track in enumerate(page, start=start_index):
             # Add marker for currently playing track
             marker = "<:bolt:1415190820658745415> " if i == current_index else ""
             queue_list += f"`{i + 1}.` {marker}`[{format_duration(track.get('duration'))}]` {track.get('title')}\n"
         
-        total_pages = max(1, -(-len(queue) // self.items_per_page))
+        total_pages = max(1, -(-queue_length // self.items_per_page))
         
         embed = discord.Embed(
             title="<a:Milk10:1399578671941156996> Music Queue", 
             description=queue_list, 
             color=discord.Color.blue()
         )
-        embed.set_footer(text=f"Page {self.current_page + 1}/{total_pages} | Total: {len(queue)} | Current: {current_index + 1}")
+        embed.set_footer(text=f"Page {self.current_page + 1}/{total_pages} | Total: {queue_length} | Current: {current_index + 1}")
         
         return embed
     
@@ -772,7 +768,7 @@ class QueueView(discord.ui.View):
         try:
             if self.current_page > 0:
                 self.current_page -= 1
-                self.update_buttons()
+                await self.refresh()
                 embed = self.get_queue_embed()
                 await interaction.response.edit_message(embed=embed, view=self)
             else:
@@ -785,12 +781,12 @@ class QueueView(discord.ui.View):
     async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
         """Go to next page."""
         try:
-            queue = self.queue_store.get_queue(self.guild_id)
-            total_pages = max(1, -(-len(queue) // self.items_per_page))
+            # As of the last refresh; the refresh below re-reads the queue
+            total_pages = max(1, -(-self.queue_length // self.items_per_page))
             
             if self.current_page < total_pages - 1:
                 self.current_page += 1
-                self.update_buttons()
+                await self.refresh()
                 embed = self.get_queue_embed()
                 await interaction.response.edit_message(embed=embed, view=self)
             else:
@@ -804,11 +800,13 @@ class QueueView(discord.ui.View):
         """Clear the entire queue."""
         try:
             # Clear the entire queue including current track
-            self.queue_store.clear_guild(self.guild_id)
+            await self.queue_store.clear_guild(self.guild_id)
+            if self.get_engine:
+                self.get_engine(self.guild_id).reset()
             
             # Update the view
             self.current_page = 0
-            self.update_buttons()
+            await self.refresh()
             embed = self.get_queue_embed()
             
             await interaction.response.edit_message(embed=embed, view=self)
@@ -0,0 +1,371 @@
+"""Playback transitions for one guild: start, skip, back, track end and the look-ahead prefetch."""
+
+import asyncio
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+import lavalink
+
+from .resolver import decode_stored_many, get_tracks, is_dead, mark_dead, track_key
+from .track import Track
+
+logger = logging.getLogger(__name__)
+
+# Look-ahead prefetch: the next PREFETCH_WINDOW tracks in play order, resolved and ready to play.
+PREFETCH_WINDOW = max(0, int(os.getenv("PREFETCH_WINDOW") or 3))
+PREFETCH_LEAD_MS = 15000  # refresh the window when this close to the end of a track
+
+# Resolving a queue entry without a stored track: start the search fallback this long after
+# the direct URI load if that hasn't produced a track yet, and give up on both after the timeout.
+STRATEGY_HEDGE_MS = float(os.getenv("STRATEGY_HEDGE_MS") or 800)
+STRATEGY_TIMEOUT = float(os.getenv("STRATEGY_TIMEOUT") or 15)
+strategy_stats: Dict[str, Dict[str, float]] = {}  # winning strategy -> wins, total ms to win
+
+# (index, track at that index, queue length) as read inside one store transaction
+Position = Tuple[int, Optional[Track], int]
+
+
+def _position(g) -> Position:
+    return g.get_index(), g.current_track(), len(g)
+
+
+class PlaybackEngine:
+    """
+    The one place a guild's playback moves from track to track.
+
+    Commands, the player buttons and Lavalink events all call these methods
+    instead of touching the index themselves. Every transition runs under the
+    guild's ``lock`` and reads the loop mode, play order and target track in
+    the same store transaction that moves the index, so the track it starts
+    never needs a second read. The queue store stays the record of index,
+    loop mode and shuffle order (the commands that change those write there);
+    the engine keeps the resolved upcoming tracks in memory.
+    """
+
+    def __init__(self, guild_id: int, queue_store):
+        self.guild_id = guild_id
+        self.queue_store = queue_store
+        self.lock = asyncio.Lock()
+        self.prefetched: Dict[str, lavalink.AudioTrack] = {}  # by track_key
+        self._prefetch_task: Optional[asyncio.Task] = None
+        self._prefetch_mark: Optional[str] = None  # track the near-end refresh already ran for
+
+    # --- Transitions ---
+
+    async def play_current(self, player: lavalink.DefaultPlayer) -> bool:
+        """(Re)start the track at the current index."""
+        async with self.lock:
+            position = await self.queue_store.transaction(self.guild_id, _position)
+            return await self._play(player, position)
+
+    async def jump(self, player: lavalink.DefaultPlayer, index: int) -> bool:
+        """Move to ``index`` and play it."""
+        def step(g) -> Optional[Position]:
+            if not 0 <= index < len(g):
+                return None
+            g.set_index(index)
+            return _position(g)
+
+        async with self.lock:
+            position = await self.queue_store.transaction(self.guild_id, step)
+            return position is not None and await self._play(player, position)
+
+    async def start_if_idle(self, player: lavalink.DefaultPlayer, index: int) -> bool:
+        """Play ``index`` unless something is already playing (checked under the lock)."""
+        async with self.lock:
+            if player.is_playing:
+                return False
+
+            def step(g) -> Optional[Position]:
+                if not 0 <= index < len(g):
+                    return None
+                g.set_index(index)
+                return _position(g)
+
+            position = await self.queue_store.transaction(self.guild_id, step)
+            if position is None:
+                return False
+            logger.info(f"[Playback] Starting playback at index {index}: '{position[1].get('title', 'Unknown')}'")
+            return await self._play(player, position)
+
+    async def skip(self, player: lavalink.DefaultPlayer) -> bool:
+        """Next track in play order; track loop still moves on, queue loop wraps."""
+        async with self.lock:
+            return await self._advance(player)
+
+    async def previous(self, player: lavalink.DefaultPlayer) -> bool:
+        """Previous track in play order; at the first track, wrap to the last one."""
+        def step(g) -> Optional[Position]:
+            logger.info(f"[Playback] Previous request - Guild: {self.guild_id}, Current index: {g.get_index()}, Queue length: {len(g)}")
+            prev_index = g.step_index(-1, wrap=True)
+            if prev_index is None:
+                return None
+            g.set_index(prev_index)
+            return _position(g)
+
+        async with self.lock:
+            position = await self.queue_store.transaction(self.guild_id, step)
+            return position is not None and await self._play(player, position)
+
+    async def track_ended(self, player: lavalink.DefaultPlayer) -> bool:
+        """After a track finished: replay it (track loop) or move on. False when the queue is done."""
+        def step(g) -> Optional[Position]:
+            loop_mode = g.get_guild_prop('loop', 0)
+            logger.info(f"[Playback] Track ended - Guild: {self.guild_id}, Current index: {g.get_index()}, Loop mode: {loop_mode}, Queue length: {len(g)}")
+            if loop_mode == 1:
+                return _position(g)
+            # Move to next track in play order; queue loop restarts from the beginning
+            next_index = g.step_index(1, wrap=loop_mode == 2)
+            if next_index is not None:
+                g.set_index(next_index)
+                return _position(g)
+            # Queue finished, no loop: index -1 marks it finished so new additions start cleanly
+            logger.info(f"[Playback] Queue finished for guild {self.guild_id}")
+            g.set_index(-1)
+            return None
+
+        async with self.lock:
+            position = await self.queue_store.transaction(self.guild_id, step)
+            return position is not None and await self._play(player, position)
+
+    def reset(self) -> None:
+        """Forget resolved tracks (the queue was cleared or the player left)."""
+        self.prefetched = {}
+        self._prefetch_mark = None
+        if self._prefetch_task and not self._prefetch_task.done():
+            self._prefetch_task.cancel()
+
+    # --- Internals (caller holds the lock) ---
+
+    async def _advance(self, player: lavalink.DefaultPlayer, skipped: int = 0) -> bool:
+        def step(g) -> Optional[Position]:
+            loop_mode = g.get_guild_prop('loop', 0)
+            logger.info(f"[Playback] Skip request - Guild: {self.guild_id}, Current index: {g.get_index()}, Loop mode: {loop_mode}, Queue length: {len(g)}")
+            next_index = g.step_index(1, wrap=loop_mode == 2)
+            if next_index is None:
+                logger.info(f"[Playback] No more tracks to skip to for guild {self.guild_id}")
+                return None
+            g.set_index(next_index)
+            return _position(g)
+
+        position = await self.queue_store.transaction(self.guild_id, step)
+        return position is not None and await self._play(player, position, skipped)
+
+    async def _play(self, player: lavalink.DefaultPlayer, position: Position, skipped: int = 0) -> bool:
+        """Play the entry at ``position``, skipping ahead past entries that can't be played.
+
+        ``skipped`` counts unplayable entries passed over in a row, so a queue
+        (or queue loop) of nothing but dead tracks stops instead of cycling forever.
+        """
+        index, current_track, queue_length = position
+        if not current_track:
+            logger.warning(f"[Playback] No current track for guild {self.guild_id}")
+            return False
+
+        title = current_track.get('title', 'Unknown')
+        if skipped > queue_length:
+            logger.warning(f"[Playback] No playable tracks left in the queue for guild {self.guild_id}")
+            return False
+
+        # Known-dead entry (failed every strategy recently): skip without re-running the cascade
+        if is_dead(current_track):
+            logger.info(f"[Playback] ⏭️ Skipping recently failed track at index {index}: {title}")
+            return await self._advance(player, skipped + 1)
+
+        # Prefetched by the look-ahead window: already resolved, play it straight away
+        ready = self.prefetched.pop(track_key(current_track) or '', None)
+        if ready is not None:
+            try:
+                ready.requester = current_track.requester
+                await player.play(ready)
+                player.store('current_track_info', current_track)
+                logger.info(f"[Playback] ✅ Playing prefetched track at index {index}: {title}")
+                return True
+            except Exception as e:
+                logger.warning(f"[Playback] Prefetched track failed for {title}: {e}")
+
+        # Stored encoded track - no REST round trip (node decode only if the local one fails)
+        if current_track.encoded:
+            try:
+                track = (await decode_stored_many(player.node, [current_track]))[0]
+                if track:
+                    await player.play(track)
+                    player.store('current_track_info', current_track)
+                    logger.info(f"[Playback] ✅ Playing stored track at index {index}: {title}")
+                    return True
+            except Exception as e:
+                logger.warning(f"[Playback] Stored track failed for {title}: {e}")
+
+        # Race the direct URI load against a YouTube re-search, hedged
+        track, strategy = await self._race_strategies(player, current_track)
+        if track is not None:
+            try:
+                track.requester = current_track.get('requester')
+                await player.play(track)
+                # Update the stored track with the new working URI and encoded track
+                current_track = await self._remember_resolved(index, current_track, track)
+                player.store('current_track_info', current_track)
+                logger.info(f"[Playback] ✅ Playing {strategy} result at index {index}: {track.title}")
+                return True
+            except Exception as e:
+                logger.warning(f"[Playback] Playing {strategy} result failed for {title}: {e}")
+
+        # Everything failed - remember it and skip to next track
+        logger.error(f"[Playback] ❌ All playback attempts failed for: {title}")
+        mark_dead(current_track)
+        return await self._advance(player, skipped + 1)
+
+    async def _remember_resolved(self, index: int, current_track: Track, track: lavalink.AudioTrack) -> Track:
+        """Store a freshly resolved track's encoded string (and URI) so the next play of this entry skips resolving.
+
+        The lookup took a node round trip, so the queue may have been edited
+        meanwhile: the write happens in a transaction, and only while ``index``
+        still holds the same entry.
+        """
+        uri, encoded = track.uri or current_track.uri, getattr(track, 'track', None)
+        updated = current_track.replace(uri=uri, encoded=encoded)
+        if updated == current_track:
+            return updated
+        key = track_key(current_track)
+
+        def write(g) -> None:
+            entry = g.item(index)
+            if entry is not None and track_key(entry) == key:
+                g.update_track(index, entry.replace(uri=uri, encoded=encoded))
+
+        await self.queue_store.transaction(self.guild_id, write)
+        return updated
+
+    async def _race_strategies(self, player: lavalink.DefaultPlayer, current_track: Track) -> Tuple[Optional[lavalink.AudioTrack], Optional[str]]:
+        """Resolve a queue entry by racing its direct URI against a YouTube re-search.
+
+        The direct load starts first; the search starts STRATEGY_HEDGE_MS later,
+        or as soon as the direct load comes back empty. The first usable track
+        wins and the other lookup is cancelled (a shared node request keeps
+        running for its other waiters). Gives up after STRATEGY_TIMEOUT seconds.
+        Returns ``(track, strategy)``, or ``(None, None)`` when nothing resolved.
+        """
+        title = current_track.get('title', 'Unknown')
+        query = f"{current_track.get('author')} {title}" if current_track.get('author') else title
+
+        async def first_track(identifier: str) -> Optional[lavalink.AudioTrack]:
+            res = await get_tracks(player.node, identifier)
+            return res.tracks[0] if res and res.tracks else None
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        deadline = started + STRATEGY_TIMEOUT
+        names: Dict[asyncio.Future, str] = {}
+        pending = set()
+
+        def start(name: str, identifier: str) -> None:
+            task = asyncio.ensure_future(first_track(identifier))
+            names[task] = name
+            pending.add(task)
+
+        if current_track.get('uri'):
+            start('direct', current_track.get('uri'))
+        searching = False
+        try:
+            while True:
+                now = loop.time()
+                if not searching and (not pending or now >= started + STRATEGY_HEDGE_MS / 1000):
+                    logger.info(f"[Playback] 🔍 Smart search for: {query}")
+                    start('search', f"ytsearch:{query}")
+                    searching = True
+                if now >= deadline:
+                    logger.warning(f"[Playback] ⏱️ Resolving timed out after {STRATEGY_TIMEOUT:.0f}s for: {title}")
+                    return None, None
+                wake = deadline if searching else min(deadline, started + STRATEGY_HEDGE_MS / 1000)
+                done, pending = await asyncio.wait(pending, timeout=wake - now, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    name = names[task]
+                    if task.exception() is not None:
+                        logger.warning(f"[Playback] {name} lookup failed for {title}: {task.exception()}")
+                    elif task.result() is not None:
+                        stats = strategy_stats.setdefault(name, {'wins': 0, 'ms': 0.0})
+                        stats['wins'] += 1
+                        stats['ms'] += (loop.time() - started) * 1000
+                        return task.result(), name
+                if searching and not pending:
+                    return None, None
+        finally:
+            for task in pending:
+                task.cancel()
+
+    # --- Look-ahead prefetch ---
+
+    def schedule_prefetch(self, player: lavalink.DefaultPlayer) -> None:
+        """Start a window refresh unless one is already running."""
+        if not PREFETCH_WINDOW:
+            return
+        if self._prefetch_task is None or self._prefetch_task.done():
+            self._prefetch_task = asyncio.create_task(self._prefetch(player))
+
+    def on_position(self, player: lavalink.DefaultPlayer, position: int) -> None:
+        """Player position update: refresh the window once near the end of each track,
+        picking up queue edits made since it started."""
+        current = player.current
+        if not current or getattr(current, 'stream', False):
+            return
+        if current.duration - position <= PREFETCH_LEAD_MS and self._prefetch_mark != current.identifier:
+            self._prefetch_mark = current.identifier
+            self.schedule_prefetch(player)
+
+    async def _prefetch(self, player: lavalink.DefaultPlayer) -> None:
+        """Resolve the next PREFETCH_WINDOW tracks in play order so they start without a lookup.
+
+        Follows shuffle order and queue loop (track loop replays the current
+        track, so there's nothing to fetch). Stored tracks are decoded in one
+        batch; entries without a usable encoded string are resolved by URI
+        concurrently and their encoded strings stored for next time.
+        """
+        def upcoming(g) -> List[Tuple[int, Track]]:
+            loop_mode = g.get_guild_prop('loop', 0)
+            if loop_mode == 1:
+                return []
+            entries = []
+            for step in range(1, min(PREFETCH_WINDOW, len(g) - 1) + 1):
+                index = g.step_index(step, wrap=loop_mode == 2)
+                if index is None:
+                    break
+                track = g.item(index)
+                if track and not is_dead(track):
+                    entries.append((index, track))
+            return entries
+
+        try:
+            entries = [(i, t) for i, t in await self.queue_store.transaction(self.guild_id, upcoming) if track_key(t)]
+            previous = self.prefetched
+            window: Dict[str, lavalink.AudioTrack] = {}
+            todo = []
+            for index, track in entries:
+                key = track_key(track)
+                if key in previous:
+                    window[key] = previous[key]
+                elif key not in window:
+                    todo.append((index, track))
+
+            decoded = await decode_stored_many(player.node, [t for _, t in todo])
+
+            async def resolve(index: int, track: Track) -> Optional[lavalink.AudioTrack]:
+                try:
+                    res = await get_tracks(player.node, track.uri)
+                    if res and res.tracks:
+                        await self._remember_resolved(index, track, res.tracks[0])
+                        return res.tracks[0]
+                except Exception as e:
+                    logger.debug(f"[Playback] Prefetch failed for {track.title}: {e}")
+                return None
+
+            missing = [n for n, audio in enumerate(decoded) if audio is None and todo[n][1].uri]
+            for n, audio in zip(missing, await asyncio.gather(*(resolve(*todo[n]) for n in missing))):
+                decoded[n] = audio
+            for (_, track), audio in zip(todo, decoded):
+                if audio is not None:
+                    window[track_key(track)] = audio
+            self.prefetched = window
+            logger.debug(f"[Playback] Prefetched {len(window)}/{len(entries)} upcoming tracks for guild {self.guild_id}")
+        except Exception as e:
+            logger.debug(f"[Playback] Error prefetching upcoming tracks for guild {self.guild_id}: {e}")
@@ -2,6 +2,7 @@
 
 Features:
 - Persistent JSON-based queue storage with current index tracking
+  (optionally journaled, write-behind cached or SQLite via QUEUE_BACKEND)
 - Proper loop modes: Track (1), Queue (2), Off (0)
 - Pagination for queue display (10 tracks per page)
 - Queue position markers and navigation
@@ -13,14 +14,24 @@ import discord
 from discord.ext import commands
 import lavalink
 import asyncio
-import random
+import io
 import logging
 import os
 from typing import Dict, List, Tuple, Optional
 
 from .client import LavalinkVoiceClient
 from .controls import PlayerControls
-from .persistent_queue import PersistentQueue
+from .alternatives import open_alternatives_cache
+from .async_queue import AsyncQueueStore
+from .engine import PlaybackEngine, strategy_stats
+from .persistent_queue import open_queue_store
+from .resolver import (
+    dead_tracks, get_tracks, hedge_stats, negative_cache, node_inflight, node_latency, resolution_cache,
+    search_cache, singleflight_stats, use_search_pool,
+)
+from .ranking import ranker
+from .timings import INTERVALS, PERCENTILES, PlayTimings, PlayTrace, percentile
+from .track import Track
 from .utils import URL_REGEX, format_duration
 
 # Set up logging
@@ -37,18 +48,47 @@ SEARCH_ENHANCERS = [
 def setup(bot: commands.Bot):
     # YouTube-only mode (no Spotify/SoundCloud integrations).
     
-    # Initialize persistent queue store
-    queue_store = PersistentQueue()
+    # Initialize persistent queue store (backend chosen via QUEUE_BACKEND).
+    # Handlers await it so disk I/O runs off the event loop.
+    queue_store = AsyncQueueStore(open_queue_store())
+
+    # Searches go to the node manager's search pool so playback nodes only stream audio.
+    node_manager = getattr(bot, 'node_manager', None)
+    if node_manager is not None:
+        use_search_pool(lambda node: node_manager.get_search_node(avoid=node, inflight=node_inflight))
+
+    # Alternative search results per track for the 🔎 picker (bounded, optionally spilled to disk).
+    alternatives_cache = open_alternatives_cache()
     
-    # Playback lock per guild to serialize queue/play transitions and avoid races
-    playback_locks: Dict[int, asyncio.Lock] = {}
+    # /play: voice connects in progress (shared by concurrent calls) and per-stage timings up to first audio
+    voice_connects: Dict[int, asyncio.Task] = {}
+    play_timings = PlayTimings()
+
+    # One playback engine per guild: every track-to-track transition goes through it (and its lock)
+    engines: Dict[int, PlaybackEngine] = {}
 
-    def get_lock(guild_id: int) -> asyncio.Lock:
-        lock = playback_locks.get(guild_id)
-        if not lock:
-            lock = asyncio.Lock()
-            playback_locks[guild_id] = lock
-        return lock
+    def get_engine(guild_id: int) -> PlaybackEngine:
+        engine = engines.get(guild_id)
+        if engine is None:
+            engine = engines[guild_id] = PlaybackEngine(guild_id, queue_store)
+        return engine
+
+    async def build_controls(player: lavalink.DefaultPlayer) -> PlayerControls:
+        """Now-playing panel buttons; the loop label is read from the store here, off the event loop."""
+        try:
+            loop_mode = int(await queue_store.get_guild_prop(player.guild_id, 'loop', 0))
+        except Exception:
+            loop_mode = 0
+        return PlayerControls(
+            player,
+            queue_store=queue_store,
+            alternatives=alternatives_cache,
+            get_prefs_func=get_prefs,
+            apply_eq_func=apply_equalizer,
+            eq_presets=EQ_PRESETS,
+            get_engine_func=get_engine,
+            loop_mode=loop_mode,
+        )
 
     # Per-guild audio preferences (volume, EQ preset, autoplay)
     audio_prefs: Dict[int, Dict] = {}
@@ -59,6 +99,7 @@ def setup(bot: commands.Bot):
                 'volume': 70,  # comfortable default
                 'eq_preset': 'bass-boost',  # keep bass on by default
                 'autoplay': False,
+                'smart_rank': False,  # rank search results (official uploads first) instead of YouTube's order
             }
         return audio_prefs[guild_id]
 
@@ -133,13 +174,33 @@ def setup(bot: commands.Bot):
         ],
     }
 
+    # Which EQ call the installed lavalink.py has, found on first use: 'filters', 'gains', 'equalizer' or None
+    eq_api: Dict[type, Optional[str]] = {}
+
+    def detect_eq_api(player: lavalink.DefaultPlayer) -> Optional[str]:
+        kind = type(player)
+        if kind not in eq_api:
+            if hasattr(lavalink, 'Filters') and hasattr(player, 'set_filters'):
+                eq_api[kind] = 'filters'  # v5+ possible API
+            elif hasattr(player, 'set_gains'):
+                eq_api[kind] = 'gains'  # Older API: set_gains(*[(band, gain), ...])
+            elif hasattr(player, 'equalizer'):
+                eq_api[kind] = 'equalizer'  # Older API: equalizer([{band, gain}, ...])
+            else:
+                eq_api[kind] = None
+            logger.info(f"[Music] Equalizer API: {eq_api[kind] or 'none'}")
+        return eq_api[kind]
+
     async def apply_equalizer(player: lavalink.DefaultPlayer, bands_tuples: List[Tuple[int, float]]):
-        """Try multiple APIs to apply EQ depending on lavalink.py version."""
+        """Apply EQ bands, unless they're already the ones last sent to this player."""
+        bands = [tuple(b) for b in bands_tuples]
+        if player.fetch('applied_eq') == bands:
+            return
+        api = detect_eq_api(player)
         # Convert tuples to the structure various APIs expect
-        bands_dicts = [{'band': b, 'gain': g} for b, g in bands_tuples]
+        bands_dicts = [{'band': b, 'gain': g} for b, g in bands]
         try:
-            # v5+ possible API
-            if hasattr(lavalink, 'Filters') and hasattr(player, 'set_filters'):
+            if api == 'filters':
                 filters = lavalink.Filters()
                 # Some versions use property, others a method
                 try:
@@ -148,25 +209,20 @@ def setup(bot: commands.Bot):
                     # fall back in case different structure needed
                     pass
                 await player.set_filters(filters)
-                return
-        except Exception as e:
-            logger.error(f"[Music] set_filters equalizer failed: {e}")
-
-        try:
-            # Older API: set_gains(*[(band, gain), ...])
-            if hasattr(player, 'set_gains'):
-                await player.set_gains(*bands_tuples)
-                return
-        except Exception as e:
-            logger.error(f"[Music] set_gains failed: {e}")
-
-        try:
-            # Older API: equalizer([{band, gain}, ...])
-            if hasattr(player, 'equalizer'):
+            elif api == 'gains':
+                await player.set_gains(*bands)
+            elif api == 'equalizer':
                 await player.equalizer(bands_dicts)  # type: ignore
+            else:
                 return
+            player.store('applied_eq', bands)
         except Exception as e:
-            logger.error(f"[Music] equalizer() failed: {e}")
+            logger.error(f"[Music] Applying equalizer ({api}) failed: {e}")
+
+    async def apply_volume(player: lavalink.DefaultPlayer, volume: int):
+        """Set the player's volume, unless it's already at that level."""
+        if player.volume != volume:
+            await player.set_volume(volume)
 
     def enhance_search_query(query: str) -> str:
         """Normalize a user query for YouTube search without changing intent."""
@@ -192,103 +248,6 @@ def setup(bot: commands.Bot):
         except Exception:
             return ""
 
-    def filter_youtube_for_official(tracks, query: str):
-        """Smart filtering for YouTube to find official/best quality content."""
-        if not tracks or len(tracks) <= 1:
-            return tracks
-            
-        scored_tracks = []
-        query_lower = query.lower()
-        query_words = set(query_lower.split())
-        
-        for track in tracks:
-            score = 0
-            title_lower = track.title.lower()
-            author_lower = getattr(track, 'author', '').lower()
-            
-            # 🏆 HIGH PRIORITY SCORING
-            
-            # Official indicators in author name (major boost)
-            if any(indicator in author_lower for indicator in [
-                'official', 'records', 'music', 'entertainment', 'label', 'vevo'
-            ]):
-                score += 100
-                
-            # Verified/popular account indicators
-            if any(indicator in author_lower for indicator in [
-                'verified', 'artist', 'band', 'singer'
-            ]):
-                score += 50
-            
-            # Title quality indicators
-            if any(indicator in title_lower for indicator in [
-                'official', 'original', 'single', 'album'
-            ]):
-                score += 40
-                
-            # 🎵 CONTENT MATCHING
-            
-            # Perfect author-title matching (likely official)
-            if author_lower in title_lower or title_lower.startswith(author_lower):
-                score += 60
-                
-            # Query word matching in author (artist name match)
-            author_matches = sum(1 for word in query_words if word in author_lower and len(word) > 2)
-            score += author_matches * 30
-            
-            # Query word matching in title
-            title_matches = sum(1 for word in query_words if word in title_lower and len(word) > 2)
-            score += title_matches * 15
-            
-            # Exact or close title matching
-            if query_lower in title_lower:
-                score += 35
-            
-            # 🚫 PENALTY SYSTEM - FIXED TO PRIORITIZE ORIGINAL CONTENT
-            
-            # SEVERE penalties for unwanted content (these should NEVER win)
-            severe_penalties = [
-                ('remix', -150), ('cover', -120), ('nightcore', -100),
-                ('slowed', -100), ('reverb', -90), ('sped up', -90),
-                ('8d audio', -80), ('bass boosted', -80), ('karaoke', -150),
-                ('instrumental', -60), ('acoustic version', -50), 
-                ('live version', -40), ('mashup', -100), ('bootleg', -120),
-                ('edit', -80), ('unofficial', -100)
-            ]
-            
-            for penalty_word, penalty_score in severe_penalties:
-                if penalty_word in title_lower:
-                    score += penalty_score
-                    
-            # Additional penalties for remix indicators in author names
-            if any(word in author_lower for word in ['remix', 'edit', 'bootleg', 'cover']):
-                score -= 100
-                    
-            # User upload indicators (penalty)
-            if any(bad in author_lower for bad in ['user', 'upload', 'random', '123', 'dj']):
-                score -= 30
-                
-            # Duration-based scoring (2-6 minutes is typical)
-            duration_minutes = (track.duration or 0) / 60000
-            if 2 <= duration_minutes <= 6:
-                score += 20
-            elif duration_minutes > 8:
-                score -= 10  # Very long might be mix/compilation
-                
-            scored_tracks.append((track, score))
-        
-        # Sort by score (highest first)
-        scored_tracks.sort(key=lambda x: x[1], reverse=True)
-        
-        # Log top candidates for debugging
-        logger.info(f"[Music] 🎯 YouTube ranking for '{query}':")
-        for i, (track, score) in enumerate(scored_tracks[:3]):
-            logger.info(f"[Music]   {i+1}. [{score}pts] {track.author} - {track.title}")
-        
-        return [track for track, score in scored_tracks]
-
-
-
     YOUTUBE_DOMAINS = ('youtube.com', 'youtu.be', 'music.youtube.com')
 
     def is_youtube_url(url: str) -> bool:
@@ -299,51 +258,41 @@ def setup(bot: commands.Bot):
         """YouTube-only search.
 
         - URL: only YouTube URLs are accepted and loaded directly.
-        - Text: one `ytsearch:` call; caller uses first result.
+        - Text: one `ytsearch:` call; caller uses first result. With smart
+          ranking on for the guild, official uploads are moved to the front.
         """
         if is_url:
             if not is_youtube_url(query):
                 return None
-            return await player.node.get_tracks(query)
+            return await get_tracks(player.node, query)
 
         normalized = enhance_search_query(query)
         if not normalized:
             return None
-        return await player.node.get_tracks(f"ytsearch:{normalized}")
+        results = await get_tracks(player.node, f"ytsearch:{normalized}")
+        if results and len(results.tracks) > 1 and get_prefs(player.guild_id).get('smart_rank'):
+            # get_tracks hands out a copy, so reordering it doesn't touch the cached result
+            results.tracks = ranker.rank(results.tracks, normalized)
+            logger.debug(f"[Music] 🎯 Ranked {len(results.tracks)} results for '{normalized}': {results.tracks[0].title}")
+        return results
+
+    async def apply_audio_settings(player: lavalink.DefaultPlayer, prefs: dict):
+        """Bring the player to the guild's volume and EQ preset, sending only what differs.
+
+        Volume defaults to 75% (good dynamic range) and EQ to the 'enhanced'
+        preset for YouTube-like quality. Filters and volume stay set on the
+        node across tracks, so on most track starts this sends nothing.
+        """
+        volume = int(prefs.get('volume') if prefs.get('volume') is not None else 75)
+        preset = prefs.get('eq_preset') or 'enhanced'
+        if preset not in EQ_PRESETS:
+            preset = 'enhanced'
 
-    async def apply_enhanced_audio_settings(player: lavalink.DefaultPlayer):
-        """Apply enhanced audio settings for YouTube-like quality"""
-        try:
-            # Enhanced equalizer settings for richer sound
-            # Frequencies: 25, 40, 63, 100, 160, 250, 400, 630, 1000, 1600, 2500, 4000, 6300, 10000, 16000
-            enhanced_eq = [
-                (0, 0.1),    # 25Hz - Sub bass boost
-                (1, 0.15),   # 40Hz - Bass boost  
-                (2, 0.2),    # 63Hz - Low bass
-                (3, 0.1),    # 100Hz - Upper bass
-                (4, 0.05),   # 160Hz - Low mids
-                (5, 0.0),    # 250Hz - Mids (neutral)
-                (6, 0.0),    # 400Hz - Upper mids
-                (7, 0.05),   # 630Hz - Presence
-                (8, 0.1),    # 1000Hz - Clarity
-                (9, 0.05),   # 1600Hz - Definition
-                (10, 0.1),   # 2500Hz - Brightness
-                (11, 0.15),  # 4000Hz - Vocal clarity
-                (12, 0.1),   # 6300Hz - Presence
-                (13, 0.05),  # 10000Hz - Air
-                (14, 0.0),   # 16000Hz - Sparkle
-            ]
-            
-            # Apply enhanced equalizer
-            await apply_equalizer(player, enhanced_eq)
-            
-            # Set optimal volume (75% for good dynamic range)
-            await player.set_volume(75)
-            
-            logger.info(f"[Music] ✨ Applied enhanced audio settings for guild {player.guild_id}")
-            
-        except Exception as e:
-            logger.error(f"[Music] Failed to apply enhanced audio settings: {e}")
+        await apply_equalizer(player, EQ_PRESETS[preset])
+        await apply_volume(player, volume)
+        player.store('eq_preset', preset)
+        if prefs.get('volume') is not None:
+            player.store('volume', volume)
 
     async def schedule_idle_disconnect(player: lavalink.DefaultPlayer, guild_id: int):
         """Schedule a gentle idle disconnect if no activity for reasonable time"""
@@ -355,7 +304,7 @@ def setup(bot: commands.Bot):
             if (player.is_connected and 
                 not player.is_playing and 
                 not player.current and 
-                len(queue_store.get_queue(guild_id)) == 0):
+                await queue_store.length(guild_id) == 0):
                 
                 logger.info(f"[Music] Disconnecting idle player for guild {guild_id}")
                 try:
@@ -363,7 +312,8 @@ def setup(bot: commands.Bot):
                     if guild and guild.voice_client:
                         await guild.voice_client.disconnect(force=True)
                         # Only clear queue on actual disconnect, not during normal operations
-                        queue_store.clear_guild(guild_id)
+                        await queue_store.clear_guild(guild_id)
+                        get_engine(guild_id).reset()
                 except Exception as e:
                     logger.error(f"[Music] Error during idle disconnect: {e}")
             else:
@@ -374,208 +324,6 @@ def setup(bot: commands.Bot):
 
     # Track recovery intentionally removed for YouTube-only fast mode.
 
-    async def play_track_at_index(player: lavalink.DefaultPlayer, guild_id: int) -> bool:
-        """Play track at current index from persistent queue with enhanced retry mechanism."""
-        current_track = queue_store.current_track(guild_id)
-        if not current_track:
-            logger.warning(f"[Music] No current track for guild {guild_id}")
-            return False
-
-        track_title = current_track.get('title', 'Unknown')
-        track_uri = current_track.get('uri', '')
-        
-        # Strategy 1: Try direct URI first (works for YouTube URLs and any directly supported sources)
-        if track_uri:
-            try:
-                res = await player.node.get_tracks(track_uri)
-                if res and res.tracks:
-                    track = res.tracks[0]
-                    track.requester = current_track.get('requester')
-                    await player.play(track)
-                    player.store('current_track_info', current_track)
-                    current_index = queue_store.get_index(guild_id)
-                    logger.info(f"[Music] ✅ Playing direct track at index {current_index}: {track_title}")
-                    return True
-            except Exception as e:
-                logger.warning(f"[Music] Direct URI failed for {track_title}: {e}")
-
-        # Strategy 2: Re-resolve via YouTube search
-        try:
-            search_query = track_title
-            if current_track.get('author'):
-                search_query = f"{current_track.get('author')} {track_title}"
-            
-            logger.info(f"[Music] 🔍 Smart search for: {search_query}")
-            
-            # 🎯 SIMPLE SELECTION: YouTube search
-            search_attempts = [
-                ('ytsearch', 'YouTube'),
-            ]
-            logger.info(f"[Music] 🎵 YouTube search")
-            
-            for search_type, source_name in search_attempts:
-                try:
-                    search_result = await player.node.get_tracks(f"{search_type}:{search_query}")
-                    
-                    if search_result and search_result.tracks:
-                        track = search_result.tracks[0]
-                        track.requester = current_track.get('requester')
-                        
-                        # Play the track
-                        await player.play(track)
-                        
-                        # Update the stored track with new working URI
-                        current_track['uri'] = track.uri
-                        queue_store.update_track(guild_id, queue_store.get_index(guild_id), current_track)
-                        
-                        player.store('current_track_info', current_track)
-                        current_index = queue_store.get_index(guild_id)
-                        logger.info(f"[Music] ✅ Playing track from {source_name} at index {current_index}: {track.title}")
-                        return True
-                        
-                except Exception as e:
-                    logger.debug(f"[Music] {source_name} search failed for {track_title}: {e}")
-                    continue
-                    
-            logger.warning(f"[Music] ❌ All search sources failed for: {search_query}")
-                
-        except Exception as e:
-            logger.error(f"[Music] Enhanced search failed for {track_title}: {e}")
-
-        # Strategy 3: Final fallback - try direct URI one more time
-        if track_uri:
-            try:
-                res = await player.node.get_tracks(track_uri)
-                if res and res.tracks:
-                    track = res.tracks[0]
-                    track.requester = current_track.get('requester')
-                    await player.play(track)
-                    player.store('current_track_info', current_track)
-                    logger.info(f"[Music] ✅ Playing fallback URI for: {track_title}")
-                    return True
-            except Exception as e:
-                logger.error(f"[Music] Final URI attempt failed for {track_title}: {e}")
-
-        # All strategies failed - skip to next track
-        logger.error(f"[Music] ❌ All playback attempts failed for: {track_title}")
-        return await skip_to_next(player, guild_id)
-
-    async def skip_to_next(player: lavalink.DefaultPlayer, guild_id: int) -> bool:
-        """Skip to next track based on current index and loop mode."""
-        try:
-            guild_data = queue_store.get_guild(guild_id)
-            current_index = guild_data.get('index', 0)
-            loop_mode = guild_data.get('loop', 0)
-            queue = queue_store.get_queue(guild_id)
-            
-            logger.info(f"[Music] Skip request - Guild: {guild_id}, Current index: {current_index}, Loop mode: {loop_mode}, Queue length: {len(queue)}")
-            
-            # Calculate next index
-            if loop_mode == 1:  # Track loop - move to next track anyway when skip is pressed
-                next_index = current_index + 1
-            elif current_index + 1 < len(queue):
-                next_index = current_index + 1
-            elif loop_mode == 2:  # Queue loop - go to beginning
-                next_index = 0
-            else:
-                # No more tracks and no queue loop
-                logger.info(f"[Music] No more tracks to skip to for guild {guild_id}")
-                return False
-            
-            if 0 <= next_index < len(queue):
-                queue_store.set_index(guild_id, next_index)
-                return await play_track_at_index(player, guild_id)
-            
-        except Exception as e:
-            logger.error(f"[Music] Error skipping to next track for guild {guild_id}: {e}")
-        return False
-
-    async def go_to_previous(player: lavalink.DefaultPlayer, guild_id: int) -> bool:
-        """Go to previous track."""
-        try:
-            guild_data = queue_store.get_guild(guild_id)
-            current_index = guild_data.get('index', 0)
-            queue = queue_store.get_queue(guild_id)
-            
-            logger.info(f"[Music] Previous request - Guild: {guild_id}, Current index: {current_index}, Queue length: {len(queue)}")
-            
-            if current_index > 0:
-                prev_index = current_index - 1
-                queue_store.set_index(guild_id, prev_index)
-                return await play_track_at_index(player, guild_id)
-            elif len(queue) > 0:
-                # If at first track, go to last track
-                last_index = len(queue) - 1
-                queue_store.set_index(guild_id, last_index)
-                return await play_track_at_index(player, guild_id)
-            
-        except Exception as e:
-            logger.error(f"[Music] Error going to previous track for guild {guild_id}: {e}")
-        return False
-
-    async def preload_next_track(player: lavalink.DefaultPlayer, guild_id: int) -> None:
-        """Preload next track for seamless playback."""
-        try:
-            guild_data = queue_store.get_guild(guild_id)
-            current_index = guild_data.get('index', 0)
-            queue = queue_store.get_queue(guild_id)
-            loop_mode = guild_data.get('loop', 0)
-            
-            # Calculate next track index
-            if loop_mode == 1:  # Track loop - no need to preload
-                return
-            elif current_index + 1 < len(queue):
-                next_index = current_index + 1
-            elif loop_mode == 2:  # Queue loop
-                next_index = 0
-            else:
-                return  # No next track
-            
-            if 0 <= next_index < len(queue):
-                next_track = queue[next_index]
-                # Preload the track to cache
-                try:
-                    await player.node.get_tracks(next_track.get('uri'))
-                    logger.debug(f"[Music] Preloaded next track for guild {guild_id}")
-                except Exception as e:
-                    logger.debug(f"[Music] Failed to preload next track for guild {guild_id}: {e}")
-                    
-        except Exception as e:
-            logger.debug(f"[Music] Error preloading next track for guild {guild_id}: {e}")
-
-    async def handle_track_end(player: lavalink.DefaultPlayer, guild_id: int) -> bool:
-        """Handle track end based on loop mode."""
-        try:
-            guild_data = queue_store.get_guild(guild_id)
-            current_index = guild_data.get('index', 0)
-            loop_mode = guild_data.get('loop', 0)
-            queue = queue_store.get_queue(guild_id)
-            
-            logger.info(f"[Music] Track ended - Guild: {guild_id}, Current index: {current_index}, Loop mode: {loop_mode}, Queue length: {len(queue)}")
-            
-            # Track loop: replay same track
-            if loop_mode == 1:
-                return await play_track_at_index(player, guild_id)
-            
-            # Move to next track
-            if current_index + 1 < len(queue):
-                next_index = current_index + 1
-                queue_store.set_index(guild_id, next_index)
-                return await play_track_at_index(player, guild_id)
-            elif loop_mode == 2:  # Queue loop: restart from beginning
-                queue_store.set_index(guild_id, 0)
-                return await play_track_at_index(player, guild_id)
-            else:
-                # Queue finished, no loop - reset state for clean new additions
-                logger.info(f"[Music] Queue finished for guild {guild_id}")
-                # Reset index to -1 to indicate queue has finished
-                queue_store.set_index(guild_id, -1)
-                return False
-                
-        except Exception as e:
-            logger.error(f"[Music] Error handling track end for guild {guild_id}: {e}")
-        return False
-
     # --- 'Now Playing' Message Management ---
     async def delete_old_np_message(player: lavalink.DefaultPlayer):
         """Safely delete the previous 'Now Playing' message if it exists."""
@@ -615,12 +363,6 @@ def setup(bot: commands.Bot):
             logger.warning(f"[Music] NP aborted: no current track for guild {guild_id}")
             return
 
-        # Get queue position info
-        current_index = queue_store.get_index(guild_id)
-        queue = queue_store.get_queue(guild_id)
-        queue_length = len(queue)
-        loop_mode = queue_store.get_guild(guild_id).get('loop', 0)
-        
         # Build embed with clean styling
         requester = channel.guild.get_member(getattr(track, 'requester', 0))
         
@@ -668,13 +410,7 @@ def setup(bot: commands.Bot):
                     message = await channel.fetch_message(existing_message_id)
                     await message.edit(
                         embed=embed,
-                        view=PlayerControls(
-                            player,
-                            queue_store=queue_store,
-                            get_prefs_func=get_prefs,
-                            apply_eq_func=apply_equalizer,
-                            eq_presets=EQ_PRESETS,
-                        ),
+                        view=await build_controls(player),
                     )
                     player.store('panel_channel_id', int(channel_id))
                     logger.info(f"[Music] NP updated: guild={guild_id}, channel={channel.id}, message_id={existing_message_id}, track={track.title}")
@@ -686,13 +422,7 @@ def setup(bot: commands.Bot):
 
             message = await channel.send(
                 embed=embed,
-                view=PlayerControls(
-                    player,
-                    queue_store=queue_store,
-                    get_prefs_func=get_prefs,
-                    apply_eq_func=apply_equalizer,
-                    eq_presets=EQ_PRESETS,
-                ),
+                view=await build_controls(player),
             )
             player.store('message_id', message.id)
             player.store('panel_channel_id', int(channel_id))
@@ -760,13 +490,7 @@ def setup(bot: commands.Bot):
 
                 await message.edit(
                     embed=embed,
-                    view=PlayerControls(
-                        player,
-                        queue_store=queue_store,
-                        get_prefs_func=get_prefs,
-                        apply_eq_func=apply_equalizer,
-                        eq_presets=EQ_PRESETS,
-                    ),
+                    view=await build_controls(player),
                 )
                     
             except (discord.NotFound, discord.Forbidden):
@@ -792,43 +516,34 @@ def setup(bot: commands.Bot):
                 
             guild_id = player.guild_id
             logger.info(f"[Music] TrackStartEvent received: guild={guild_id}")
+
+            trace = play_timings.audio_started(guild_id, getattr(getattr(event, 'track', None), 'identifier', None))
+            if trace is not None and 'audio' in trace.marks:
+                logger.info(f"[Music] Time to first audio for guild {guild_id}: {trace.marks['audio']:.0f} ms")
             
-            await asyncio.sleep(0.15)  # Small delay for stability
-            
-            # Apply enhanced audio settings and preferred settings per guild
+            # Apply the guild's volume and EQ (a no-op unless they changed since the last track)
             try:
-                prefs = get_prefs(guild_id)
-                
-                # Apply enhanced audio settings first for YouTube-like quality
-                await apply_enhanced_audio_settings(player)
-                
-                # Then apply user preferences if they exist
-                if prefs.get('volume') is not None:
-                    await player.set_volume(int(prefs.get('volume', 75)))
-                    player.store('volume', int(prefs.get('volume', 75)))
-                
-                # Apply custom EQ if user has preference, otherwise keep enhanced settings
-                if prefs.get('eq_preset') and prefs.get('eq_preset') != 'enhanced':
-                    preset = prefs.get('eq_preset', 'enhanced')
-                    bands = EQ_PRESETS.get(preset)
-                    if bands:
-                        await apply_equalizer(player, bands)
-                    player.store('eq_preset', preset)
-                else:
-                    player.store('eq_preset', 'enhanced')
-                
+                await apply_audio_settings(player, get_prefs(guild_id))
             except Exception as e:
                 logger.error(f"[Music] Failed to apply audio settings on start: {e}")
             
             # Sticky panel: always update (or create) on track start.
             if player.current and player.is_playing:
                 await update_now_playing_panel(guild_id)
-                asyncio.create_task(preload_next_track(player, guild_id))
+                get_engine(guild_id).schedule_prefetch(player)
             else:
                 logger.info(f"[Music] Skipping NP panel - track failed or not playing")
             
             return
 
+        # Position updates: refresh the prefetch window once near the end of each track,
+        # picking up queue edits made since it started
+        if event_name == 'PlayerUpdateEvent':
+            player = getattr(event, 'player', None)
+            if player:
+                get_engine(player.guild_id).on_position(player, getattr(event, 'position', None) or player.position)
+            return
+
         # Track End
         if event_name == 'TrackEndEvent':
             player = getattr(event, 'player', None)
@@ -844,21 +559,18 @@ def setup(bot: commands.Bot):
                 logger.info(f"[Music] Ignoring TrackEndEvent with reason '{reason}' - already handled")
                 return
                 
-            # Serialize end-handling to avoid races
-            lock = get_lock(guild_id)
-            async with lock:
-                try:
-                    # Try to play next track based on queue and loop settings
-                    success = await handle_track_end(player, guild_id)
-                    if not success:
-                        # Queue ended - don't block, just stay connected for new requests
-                        logger.info(f"[Music] Queue ended for guild {guild_id} - staying connected for new requests")
-                        
-                        # Schedule a gentle disconnect after reasonable idle time (non-blocking)
-                        asyncio.create_task(schedule_idle_disconnect(player, guild_id))
-                        
-                except Exception as e:
-                    logger.error(f"[Music] Error during TrackEnd handling: {e}")
+            try:
+                # Try to play next track based on queue and loop settings
+                success = await get_engine(guild_id).track_ended(player)
+                if not success:
+                    # Queue ended - don't block, just stay connected for new requests
+                    logger.info(f"[Music] Queue ended for guild {guild_id} - staying connected for new requests")
+                    
+                    # Schedule a gentle disconnect after reasonable idle time (non-blocking)
+                    asyncio.create_task(schedule_idle_disconnect(player, guild_id))
+                    
+            except Exception as e:
+                logger.error(f"[Music] Error during TrackEnd handling: {e}")
             return
 
         # Track Stuck or Exception -> skip quickly (YouTube-only)
@@ -870,13 +582,12 @@ def setup(bot: commands.Bot):
             guild_id = player.guild_id
             exception_info = getattr(event, 'exception', 'Unknown error')
             logger.warning(f"[Music] {event_name}: guild={guild_id}, error={exception_info}")
-            lock = get_lock(guild_id)
-            async with lock:
-                try:
-                    await skip_to_next(player, guild_id)
-                except Exception as e:
-                    logger.error(f"[Music] Failed to handle {event_name}: {e}")
-                    await skip_to_next(player, guild_id)
+            engine = get_engine(guild_id)
+            try:
+                await engine.skip(player)
+            except Exception as e:
+                logger.error(f"[Music] Failed to handle {event_name}: {e}")
+                await engine.skip(player)
             return
 
     # Register event hook
@@ -887,175 +598,183 @@ def setup(bot: commands.Bot):
         logger.error(f"[Music] Failed to register lavalink event hook: {e}")
 
     # --- Commands ---
+    async def ensure_voice(ctx: commands.Context) -> None:
+        """Connect to the author's voice channel unless already connected.
+
+        Concurrent /play calls in one guild share a single connect attempt.
+        """
+        if ctx.voice_client:
+            return
+        guild_id = ctx.guild.id
+        task = voice_connects.get(guild_id)
+        if task is None:
+            task = asyncio.ensure_future(ctx.author.voice.channel.connect(cls=LavalinkVoiceClient))
+            voice_connects[guild_id] = task
+            task.add_done_callback(lambda _: voice_connects.pop(guild_id, None))
+            logger.info(f"[Music] Connecting to VC for guild {guild_id}")
+        await asyncio.shield(task)
+
     @bot.hybrid_command(name="play", description="Play a song or add to the queue")
     async def play(ctx: commands.Context, *, query: str):
+        trace = PlayTrace(ctx.guild.id)
+        search = None
         try:
             if not ctx.author.voice or not ctx.author.voice.channel:
                 return await ctx.send("You must be in a voice channel.", ephemeral=True)
+            if ctx.voice_client and ctx.voice_client.channel.id != ctx.author.voice.channel.id:
+                return await ctx.send("You must be in the same voice channel as me.", ephemeral=True)
                 
             player = bot.lavalink.player_manager.create(ctx.guild.id)
             player.store('channel', ctx.channel.id)
             logger.info(f"[Music] Play command - Guild: {ctx.guild.id}, Query: {query[:50]}...")
 
-            lock = get_lock(ctx.guild.id)
-            async with lock:
-                if not ctx.voice_client:
-                    await ctx.author.voice.channel.connect(cls=LavalinkVoiceClient)
-                    # Only clear queue if bot was disconnected for a long time or explicitly disconnected
-                    # Don't clear for normal queue end situations
-                    logger.info(f"[Music] Connected to VC for guild {ctx.guild.id}")
-                elif ctx.voice_client.channel.id != ctx.author.voice.channel.id:
-                    return await ctx.send("You must be in the same voice channel as me.", ephemeral=True)
-
-                await ctx.defer()
-
-                query = query.strip('<>')
-                is_url = URL_REGEX.match(query) is not None
-
-                # YouTube-only: reject non-YouTube URLs for clarity and speed.
-                if is_url and not is_youtube_url(query):
-                    return await ctx.send(
-                        embed=discord.Embed(
-                            description="Only **YouTube** links are supported. Try searching by name instead.",
-                            color=discord.Color.red(),
-                        )
+            await ctx.defer()
+
+            query = query.strip('<>')
+            is_url = URL_REGEX.match(query) is not None
+
+            # YouTube-only: reject non-YouTube URLs for clarity and speed.
+            if is_url and not is_youtube_url(query):
+                return await ctx.send(
+                    embed=discord.Embed(
+                        description="Only **YouTube** links are supported. Try searching by name instead.",
+                        color=discord.Color.red(),
                     )
+                )
 
-                temp_msg = await ctx.send(
+            async def connect():
+                if not ctx.voice_client:
+                    await ensure_voice(ctx)
+                    trace.mark('connected')
+
+            # Search while connecting to voice and posting the "Searching..." notice
+            trace.mark('search_start')
+            search = asyncio.ensure_future(search_tracks(player, query, is_url))
+            search.add_done_callback(lambda _: trace.mark('search_end'))
+            await asyncio.gather(
+                connect(),
+                ctx.send(
                     embed=discord.Embed(
                         description="<:ZeroSip:1404982303180066856> Searching...", 
                         color=discord.Color.blurple()
                     ), 
                     delete_after=3  # Faster deletion
-                )
+                ),
+            )
+            if ctx.voice_client and ctx.voice_client.channel.id != ctx.author.voice.channel.id:
+                # Someone else's /play connected us to another channel meanwhile
+                return await ctx.send("You must be in the same voice channel as me.", ephemeral=True)
 
-                # Search for tracks
-                try:
-                    results = await search_tracks(player, query, is_url)
-                except Exception as e:
-                    logger.error(f"[Music] Search failed for guild {ctx.guild.id}: {e}")
-                    results = None
-
-                if not results or not results.tracks:
-                    return await ctx.send(
-                        embed=discord.Embed(
-                            description=f"<:no:1404980370486722621> No results found for `{query}`.", 
-                            color=discord.Color.red()
-                        )
-                    )
+            try:
+                results = await search
+            except Exception as e:
+                logger.error(f"[Music] Search failed for guild {ctx.guild.id}: {e}")
+                results = None
 
-                # Handle playlist
-                if results.load_type == lavalink.LoadType.PLAYLIST:
-                    tracks_data = []
-                    for track in results.tracks:
-                        tracks_data.append({
-                            'title': track.title,
-                            'uri': track.uri,
-                            'duration': track.duration,
-                            'identifier': track.identifier,
-                            'author': track.author,
-                            'requester': ctx.author.id,
-                        })
-                    
-                    queue_store.extend_tracks(ctx.guild.id, tracks_data)
-                    
-                    embed = discord.Embed(
-                        title="<:playlist:1412531317186498580> Playlist Added", 
-                        description=f"Added **{len(tracks_data)}** songs from **{results.playlist_info.name}**.", 
-                        color=discord.Color.purple()
+            if not results or not results.tracks:
+                return await ctx.send(
+                    embed=discord.Embed(
+                        description=f"<:no:1404980370486722621> No results found for `{query}`.", 
+                        color=discord.Color.red()
                     )
-                    await ctx.send(embed=embed)
-                else:
-                    # Single track
-                    chosen = results.tracks[0]
+                )
 
-                    alternatives: list[dict] = []
-                    try:
-                        for t in results.tracks[1:11]:
-                            alternatives.append({
-                                'title': t.title,
-                                'uri': t.uri,
-                                'duration': t.duration,
-                                'identifier': t.identifier,
-                                'author': t.author,
-                            })
-                    except Exception:
-                        alternatives = []
-
-                    track_data = {
-                        'title': chosen.title,
-                        'uri': chosen.uri,
-                        'duration': chosen.duration,
-                        'identifier': chosen.identifier,
-                        'author': chosen.author,
-                        'requester': ctx.author.id,
-                        'alternatives': alternatives,
-                    }
-                    
-                    # Add to queue
-                    queue_store.append_track(ctx.guild.id, track_data)
+            # Handle playlist
+            if results.load_type == lavalink.LoadType.PLAYLIST:
+                tracks_data = [Track.from_lavalink(track, requester=ctx.author.id) for track in results.tracks]
+                embed = discord.Embed(
+                    title="<:playlist:1412531317186498580> Playlist Added", 
+                    description=f"Added **{len(tracks_data)}** songs from **{results.playlist_info.name}**.", 
+                    color=discord.Color.purple()
+                )
+                chosen = None
+            else:
+                # Single track
+                chosen = results.tracks[0]
 
-                    added_index = len(queue_store.get_queue(ctx.guild.id)) - 1
-                    
-                    # Debug logging for queue state
-                    current_index = queue_store.get_index(ctx.guild.id)
-                    queue_length = len(queue_store.get_queue(ctx.guild.id))
-                    logger.info(f"[Music] Added track: '{chosen.title}' | Queue length: {queue_length} | Current index: {current_index}")
-                    
-                    added_message = await ctx.send(
-                        embed=discord.Embed(
-                            description=f"<a:verify:1399579399107379271> Added **[{chosen.title}]({chosen.uri})** to the queue.", 
-                            color=discord.Color.green()
-                        )
+                # Runner-up results feed the 🔎 picker; they live in the side cache, not the queue file.
+                try:
+                    alternatives_cache.put(
+                        chosen.identifier, [Track.from_lavalink(t) for t in results.tracks[1:11]]
                     )
+                except Exception:
+                    pass
 
-                    # Persist the message reference so the 🔎 button can update it later if the user swaps results.
-                    try:
-                        msg_id = getattr(added_message, 'id', None)
-                        ch_id = getattr(getattr(added_message, 'channel', None), 'id', None)
-                        if msg_id and ch_id:
-                            latest = dict(queue_store.get_queue(ctx.guild.id)[added_index])
-                            latest['added_message_id'] = int(msg_id)
-                            latest['added_channel_id'] = int(ch_id)
-                            queue_store.update_track(ctx.guild.id, added_index, latest)
-                    except Exception as e:
-                        logger.debug(f"[Music] Failed to store added-message metadata: {e}")
-
-                # If nothing is playing, start playback  
-                if not player.is_playing:
-                    queue = queue_store.get_queue(ctx.guild.id)
-                    if queue:
-                        # Always play the newly added track (last in queue) when playback is stopped
-                        new_index = len(queue) - 1  # Last track = newly added track
-                        queue_store.set_index(ctx.guild.id, new_index)
-                        logger.info(f"[Music] Starting playback - newly added track at index {new_index}: '{queue[new_index].get('title', 'Unknown')}'")
-                        await play_track_at_index(player, ctx.guild.id)
+                tracks_data = [Track.from_lavalink(chosen, requester=ctx.author.id)]
+                embed = discord.Embed(
+                    description=f"<a:verify:1399579399107379271> Added **[{chosen.title}]({chosen.uri})** to the queue.", 
+                    color=discord.Color.green()
+                )
+
+            def add(g):
+                g.extend_tracks(tracks_data)
+                return len(g), g.get_index()
+
+            trace.node = getattr(player.node, 'name', None)
+            trace.mark('store_start')
+            queue_length, current_index = await queue_store.transaction(ctx.guild.id, add)
+            trace.mark('stored')
+            added_index = queue_length - 1
+
+            # Debug logging for queue state
+            logger.info(f"[Music] Added {len(tracks_data)} track(s) | Queue length: {queue_length} | Current index: {current_index}")
+
+            added = asyncio.ensure_future(ctx.send(embed=embed))
+            # When nothing is playing, start the newly added track (the first one for a playlist);
+            # the engine re-checks under its lock
+            if not player.is_playing:
+                if await get_engine(ctx.guild.id).start_if_idle(player, queue_length - len(tracks_data)):
+                    trace.mark('played')
+                    play_timings.awaiting_audio(trace, getattr(player.current, 'identifier', None))
+
+            added_message = await added
+            elapsed = trace.mark('added')
+            logger.info(f"[Music] Time to 'Added' for guild {ctx.guild.id}: {elapsed:.0f} ms")
+
+            # Persist the message reference so the 🔎 button can update it later if the user swaps results.
+            if chosen is not None:
+                try:
+                    msg_id = getattr(added_message, 'id', None)
+                    ch_id = getattr(getattr(added_message, 'channel', None), 'id', None)
+                    if msg_id and ch_id:
+                        def remember_message(g):
+                            latest = g.item(added_index)
+                            if latest is not None and latest.identifier == chosen.identifier:
+                                g.update_track(
+                                    added_index,
+                                    latest.replace(added_message_id=int(msg_id), added_channel_id=int(ch_id)),
+                                )
+
+                        await queue_store.transaction(ctx.guild.id, remember_message)
+                except Exception as e:
+                    logger.debug(f"[Music] Failed to store added-message metadata: {e}")
                         
         except Exception as e:
             logger.error(f"[Music] Error in play command for guild {ctx.guild.id}: {e}")
             await ctx.send("An error occurred while processing your request.", ephemeral=True)
+        finally:
+            if search is not None and not search.done():
+                search.cancel()
+            play_timings.done(trace)
 
     @bot.hybrid_command(name="queue", description="Shows the current music queue")
     async def queue_cmd(ctx: commands.Context, page: int = 1):
         try:
             from .controls import QueueView
+
+            # Convert 1-based page to 0-based
+            current_page = max(0, page - 1)
             
-            queue = queue_store.get_queue(ctx.guild.id)
-            current_index = queue_store.get_index(ctx.guild.id)
-            
-            if not queue:
+            # Create interactive queue view
+            view = QueueView(queue_store, ctx.guild.id, current_page, get_engine)
+            await view.refresh()
+            if not view.queue_length:
                 return await ctx.send(
                     embed=discord.Embed(
                         description="The queue is empty.", 
                         color=discord.Color.orange()
                     )
                 )
-
-            # Convert 1-based page to 0-based
-            current_page = max(0, page - 1)
-            
-            # Create interactive queue view
-            view = QueueView(queue_store, ctx.guild.id, current_page)
             embed = view.get_queue_embed()
             
             message = await ctx.send(embed=embed, view=view)
@@ -1087,11 +806,12 @@ def setup(bot: commands.Bot):
     @bot.hybrid_command(name="loop", description="Toggle loop mode (Off, Track, Queue)")
     async def loop_cmd(ctx: commands.Context):
         try:
-            guild_data = queue_store.get_guild(ctx.guild.id)
-            current_loop = guild_data.get('loop', 0)
-            new_loop = (current_loop + 1) % 3
-            
-            queue_store.set_guild_prop(ctx.guild.id, 'loop', new_loop)
+            def cycle(g) -> int:
+                new_loop = (g.get_guild_prop('loop', 0) + 1) % 3
+                g.set_guild_prop('loop', new_loop)
+                return new_loop
+
+            new_loop = await queue_store.transaction(ctx.guild.id, cycle)
             
             loop_map = {0: '➡️ Off', 1: '🔂 Track', 2: '🔁 Queue'}
             embed = discord.Embed(
@@ -1109,11 +829,28 @@ def setup(bot: commands.Bot):
             logger.error(f"[Music] Error in loop command for guild {ctx.guild.id}: {e}")
             await ctx.send("An error occurred while changing loop mode.", ephemeral=True)
 
+    @bot.hybrid_command(name="smartsearch", description="Toggle ranking search results to prefer official uploads")
+    async def smartsearch_cmd(ctx: commands.Context):
+        prefs = get_prefs(ctx.guild.id)
+        prefs['smart_rank'] = not prefs.get('smart_rank')
+        state = 'on' if prefs['smart_rank'] else 'off'
+        embed = discord.Embed(
+            description=f"🎯 Smart search ranking is now **{state}**.",
+            color=discord.Color.blue()
+        )
+        await ctx.send(embed=embed)
+        logger.info(f"[Music] Smart search ranking {state} for guild {ctx.guild.id}")
+
     @bot.hybrid_command(name="shuffle", description="Shuffles the queue")
     async def shuffle_cmd(ctx: commands.Context):
+        def shuffle_queue(g) -> int:
+            # Only the play order is shuffled; the queue itself (and the file on disk) is untouched
+            if len(g):
+                g.shuffle()
+            return len(g)
+
         try:
-            queue = queue_store.get_queue(ctx.guild.id)
-            if not queue:
+            if not await queue_store.transaction(ctx.guild.id, shuffle_queue):
                 return await ctx.send(
                     embed=discord.Embed(
                         description="The queue is empty.", 
@@ -1121,25 +858,6 @@ def setup(bot: commands.Bot):
                     )
                 )
             
-            # Get current track to preserve it
-            current_index = queue_store.get_index(ctx.guild.id)
-            current_track = None
-            if 0 <= current_index < len(queue):
-                current_track = queue[current_index]
-            
-            # Shuffle the queue
-            random.shuffle(queue)
-            
-            # If there was a current track, move it to the front
-            if current_track:
-                if current_track in queue:
-                    queue.remove(current_track)
-                queue.insert(0, current_track)
-                queue_store.set_index(ctx.guild.id, 0)
-            
-            # Save shuffled queue using the new method
-            queue_store.set_queue(ctx.guild.id, queue)
-            
             embed = discord.Embed(
                 description="<:shuffle:1412532183750676532> The queue has been shuffled!", 
                 color=discord.Color.random()
@@ -1152,11 +870,32 @@ def setup(bot: commands.Bot):
             logger.error(f"[Music] Error in shuffle command for guild {ctx.guild.id}: {e}")
             await ctx.send("An error occurred while shuffling the queue.", ephemeral=True)
 
+    @bot.hybrid_command(name="unshuffle", description="Restores the original queue order")
+    async def unshuffle_cmd(ctx: commands.Context):
+        try:
+            await queue_store.unshuffle(ctx.guild.id)
+            embed = discord.Embed(
+                description="➡️ Playing the queue in its original order.", 
+                color=discord.Color.random()
+            )
+            await ctx.send(embed=embed)
+            
+            logger.info(f"[Music] Queue unshuffled for guild {ctx.guild.id}")
+            
+        except Exception as e:
+            logger.error(f"[Music] Error in unshuffle command for guild {ctx.guild.id}: {e}")
+            await ctx.send("An error occurred while unshuffling the queue.", ephemeral=True)
+
     @bot.hybrid_command(name="remove", description="Removes a song from the queue")
     async def remove_cmd(ctx: commands.Context, index: int):
         try:
-            queue = queue_store.get_queue(ctx.guild.id)
-            if not queue:
+            def remove(g):
+                # Convert to 0-based index
+                removed = g.remove_at(index - 1) if 1 <= index <= len(g) else None
+                return len(g) + (removed is not None), removed
+
+            queue_length, removed_track = await queue_store.transaction(ctx.guild.id, remove)
+            if not queue_length:
                 return await ctx.send(
                     embed=discord.Embed(
                         description="The queue is empty.", 
@@ -1164,18 +903,14 @@ def setup(bot: commands.Bot):
                     )
                 )
             
-            if not 1 <= index <= len(queue):
+            if not 1 <= index <= queue_length:
                 return await ctx.send(
                     embed=discord.Embed(
-                        description=f"Invalid index. Please provide a number between 1 and {len(queue)}.", 
+                        description=f"Invalid index. Please provide a number between 1 and {queue_length}.", 
                         color=discord.Color.red()
                     )
                 )
             
-            # Convert to 0-based index
-            remove_index = index - 1
-            removed_track = queue_store.remove_at(ctx.guild.id, remove_index)
-            
             if removed_track:
                 title = removed_track.get('title', 'Unknown')
                 embed = discord.Embed(
@@ -1191,11 +926,119 @@ def setup(bot: commands.Bot):
             logger.error(f"[Music] Error in remove command for guild {ctx.guild.id}: {e}")
             await ctx.send("An error occurred while removing the track.", ephemeral=True)
 
+    @bot.hybrid_command(name="move", description="Moves a song to another position in the queue")
+    async def move_cmd(ctx: commands.Context, from_index: int, to_index: int):
+        try:
+            def move(g):
+                # Convert to 0-based indices; one queue op and one write regardless of queue size
+                return len(g), g.move_track(from_index - 1, to_index - 1)
+
+            queue_length, moved_track = await queue_store.transaction(ctx.guild.id, move)
+            if not (1 <= from_index <= queue_length and 1 <= to_index <= queue_length):
+                return await ctx.send(
+                    embed=discord.Embed(
+                        description=f"Invalid index. Please provide numbers between 1 and {max(queue_length, 1)}.", 
+                        color=discord.Color.red()
+                    )
+                )
+            
+            if moved_track:
+                embed = discord.Embed(
+                    description=f"↕️ Moved **{moved_track.get('title', 'Unknown')}** to position **{to_index}**.", 
+                    color=discord.Color.green()
+                )
+                await ctx.send(embed=embed)
+                logger.info(f"[Music] Moved track {from_index} -> {to_index} for guild {ctx.guild.id}")
+            else:
+                await ctx.send("That track is already at that position.", ephemeral=True)
+                
+        except Exception as e:
+            logger.error(f"[Music] Error in move command for guild {ctx.guild.id}: {e}")
+            await ctx.send("An error occurred while moving the track.", ephemeral=True)
+
+    @bot.hybrid_command(name="swap", description="Swaps two songs in the queue")
+    async def swap_cmd(ctx: commands.Context, first: int, second: int):
+        try:
+            def swap(g):
+                return len(g), g.swap_tracks(first - 1, second - 1)
+
+            queue_length, swapped = await queue_store.transaction(ctx.guild.id, swap)
+            if not (1 <= first <= queue_length and 1 <= second <= queue_length):
+                return await ctx.send(
+                    embed=discord.Embed(
+                        description=f"Invalid index. Please provide numbers between 1 and {max(queue_length, 1)}.", 
+                        color=discord.Color.red()
+                    )
+                )
+            
+            if swapped:
+                embed = discord.Embed(
+                    description=f"🔀 Swapped positions **{first}** and **{second}**.", 
+                    color=discord.Color.green()
+                )
+                await ctx.send(embed=embed)
+                logger.info(f"[Music] Swapped tracks {first} <-> {second} for guild {ctx.guild.id}")
+            else:
+                await ctx.send("Pick two different positions to swap.", ephemeral=True)
+                
+        except Exception as e:
+            logger.error(f"[Music] Error in swap command for guild {ctx.guild.id}: {e}")
+            await ctx.send("An error occurred while swapping tracks.", ephemeral=True)
+
+    @bot.hybrid_command(name="removerange", description="Removes songs from one position to another (inclusive)")
+    async def removerange_cmd(ctx: commands.Context, start: int, end: int):
+        try:
+            if start > end:
+                start, end = end, start
+            # 1-based inclusive -> 0-based half-open
+            removed = await queue_store.remove_range(ctx.guild.id, start - 1, end)
+            if not removed:
+                return await ctx.send(
+                    embed=discord.Embed(
+                        description="No songs in that range.", 
+                        color=discord.Color.orange()
+                    )
+                )
+            
+            embed = discord.Embed(
+                description=f"<:Sage_Trash:1399580044531339356> Removed **{removed}** song{'s' if removed != 1 else ''} from the queue.", 
+                color=discord.Color.green()
+            )
+            await ctx.send(embed=embed)
+            logger.info(f"[Music] Removed {removed} tracks ({start}-{end}) for guild {ctx.guild.id}")
+                
+        except Exception as e:
+            logger.error(f"[Music] Error in removerange command for guild {ctx.guild.id}: {e}")
+            await ctx.send("An error occurred while removing tracks.", ephemeral=True)
+
+    @bot.hybrid_command(name="removeuser", description="Removes every song queued by a member (default: you)")
+    async def removeuser_cmd(ctx: commands.Context, member: Optional[discord.Member] = None):
+        member = member or ctx.author
+        try:
+            removed = await queue_store.remove_by_requester(ctx.guild.id, member.id)
+            if not removed:
+                return await ctx.send(
+                    embed=discord.Embed(
+                        description=f"No songs in the queue were requested by {member.display_name}.", 
+                        color=discord.Color.orange()
+                    )
+                )
+            
+            embed = discord.Embed(
+                description=f"<:Sage_Trash:1399580044531339356> Removed **{removed}** song{'s' if removed != 1 else ''} requested by {member.display_name}.", 
+                color=discord.Color.green()
+            )
+            await ctx.send(embed=embed)
+            logger.info(f"[Music] Removed {removed} tracks requested by {member.id} for guild {ctx.guild.id}")
+                
+        except Exception as e:
+            logger.error(f"[Music] Error in removeuser command for guild {ctx.guild.id}: {e}")
+            await ctx.send("An error occurred while removing tracks.", ephemeral=True)
+
     @bot.hybrid_command(name="clearqueue", aliases=["cq"], description="Clear the entire queue")
     async def clearqueue_cmd(ctx: commands.Context):
         try:
-            queue = queue_store.get_queue(ctx.guild.id)
-            if not queue:
+            if not await queue_store.length(ctx.guild.id):
                 return await ctx.send(
                     embed=discord.Embed(
                         description="The queue is already empty.", 
@@ -1204,7 +1047,8 @@ def setup(bot: commands.Bot):
                 )
             
             # Clear the entire queue including current track
-            queue_store.clear_guild(ctx.guild.id)
+            await queue_store.clear_guild(ctx.guild.id)
+            get_engine(ctx.guild.id).reset()
             
             embed = discord.Embed(
                 description="<:trash:1415172903061815317> Queue has been cleared!", 
@@ -1228,14 +1072,11 @@ def setup(bot: commands.Bot):
             if not player or not player.is_playing:
                 return await ctx.send("Nothing is playing to skip.")
             
-            lock = get_lock(ctx.guild.id)
-            async with lock:
-                success = await skip_to_next(player, ctx.guild.id)
-                if success:
-                    await ctx.send("<:skip:1412530943121555546> Skipped the current song.")
-                    logger.info(f"[Music] Skipped track for guild {ctx.guild.id}")
-                else:
-                    await ctx.send("No next track to skip to.")
+            if await get_engine(ctx.guild.id).skip(player):
+                await ctx.send("<:skip:1412530943121555546> Skipped the current song.")
+                logger.info(f"[Music] Skipped track for guild {ctx.guild.id}")
+            else:
+                await ctx.send("No next track to skip to.")
                     
         except Exception as e:
             logger.error(f"[Music] Error in skip command for guild {ctx.guild.id}: {e}")
@@ -1248,14 +1089,11 @@ def setup(bot: commands.Bot):
             if not player:
                 return await ctx.send("Not connected.")
             
-            lock = get_lock(ctx.guild.id)
-            async with lock:
-                success = await go_to_previous(player, ctx.guild.id)
-                if success:
-                    await ctx.send("<:prev:1412530972779352214> Went back to the previous song.")
-                    logger.info(f"[Music] Went back for guild {ctx.guild.id}")
-                else:
-                    await ctx.send("No previous track.")
+            if await get_engine(ctx.guild.id).previous(player):
+                await ctx.send("<:prev:1412530972779352214> Went back to the previous song.")
+                logger.info(f"[Music] Went back for guild {ctx.guild.id}")
+            else:
+                await ctx.send("No previous track.")
                     
         except Exception as e:
             logger.error(f"[Music] Error in back command for guild {ctx.guild.id}: {e}")
@@ -1277,7 +1115,8 @@ def setup(bot: commands.Bot):
             # Reset preferences and clear queue
             prefs = get_prefs(ctx.guild.id)
             prefs['volume'] = 70
-            queue_store.clear_guild(ctx.guild.id)
+            await queue_store.clear_guild(ctx.guild.id)
+            get_engine(ctx.guild.id).reset()
             
             embed = discord.Embed(
                 description="<:MomijiWave:1399580630207168606> Disconnected and cleared the queue.", 
@@ -1361,6 +1200,114 @@ def setup(bot: commands.Bot):
             logger.error(f"[Music] Error in resume command for guild {ctx.guild.id}: {e}")
             await ctx.send("An error occurred while resuming.", ephemeral=True)
 
+    @bot.hybrid_command(name="searchcache", description="Inspect the shared search cache (Bot owner only)")
+    async def searchcache_cmd(ctx: commands.Context, action: Optional[str] = None):
+        if not await bot.is_owner(ctx.author):
+            return await ctx.send("Only the bot owner can use this command!", ephemeral=True)
+        
+        if (action or '').lower() == 'clear':
+            search_cache.clear()
+            negative_cache.clear()
+            dead_tracks.clear()
+            if resolution_cache:
+                await resolution_cache.clear()
+            return await ctx.send("Search cache cleared.", ephemeral=True)
+        
+        stats = search_cache.stats()
+        embed = discord.Embed(title="Search Cache", color=discord.Color.blurple())
+        embed.add_field(name="Entries", value=f"{stats['size']}/{stats['maxsize']}", inline=True)
+        embed.add_field(name="Hit rate", value=f"{stats['hit_rate']:.0%}", inline=True)
+        embed.add_field(name="TTL", value=f"{int(search_cache.ttl or 0)}s", inline=True)
+        embed.add_field(name="Hits / Misses", value=f"{stats['hits']} / {stats['misses']}", inline=True)
+        embed.add_field(name="Evicted / Expired", value=f"{stats['evictions']} / {stats['expirations']}", inline=True)
+        embed.add_field(
+            name="Node lookups / Coalesced",
+            value=f"{singleflight_stats['started']} / {singleflight_stats['coalesced']}",
+            inline=True,
+        )
+        embed.add_field(
+            name="Known empty / Dead tracks",
+            value=f"{len(negative_cache)} / {len(dead_tracks)} ({int(negative_cache.ttl or 0)}s)",
+            inline=True,
+        )
+        added = play_timings.summary(stage='added')
+        if added:
+            embed.add_field(
+                name="/play to \"Added\" p50 / p95",
+                value=f"{added[1][0]:.0f} / {added[1][1]:.0f} ms",
+                inline=True,
+            )
+        embed.add_field(
+            name="Hedged / Hedge won",
+            value=f"{hedge_stats['hedged']} / {hedge_stats['hedge_wins']}",
+            inline=True,
+        )
+        if strategy_stats:
+            embed.add_field(
+                name="Resolve winners",
+                value="\n".join(
+                    f"{name}: {int(st['wins'])} (avg {st['ms'] / st['wins']:.0f} ms)"
+                    for name, st in sorted(strategy_stats.items())
+                ),
+                inline=True,
+            )
+        if resolution_cache:
+            disk = await resolution_cache.stats()
+            embed.add_field(
+                name="On disk",
+                value=(
+                    f"{disk['entries']} entries, {disk['bytes'] / 1048576:.1f}/{disk['max_bytes'] / 1048576:.0f} MB, "
+                    f"{disk['hit_rate']:.0%} hits"
+                ),
+                inline=False,
+            )
+        recent = search_cache.keys()[:10]
+        if recent:
+            embed.add_field(
+                name="Most recent",
+                value="\n".join(f"`{k[:80]}`" for k in recent),
+                inline=False,
+            )
+        await ctx.send(embed=embed, ephemeral=True)
+
+    @bot.hybrid_command(name="playtimings", description="Time to first audio per stage and node (Bot owner only)")
+    async def playtimings_cmd(ctx: commands.Context, action: Optional[str] = None):
+        if not await bot.is_owner(ctx.author):
+            return await ctx.send("Only the bot owner can use this command!", ephemeral=True)
+
+        action = (action or '').lower()
+        if action == 'clear':
+            play_timings.clear()
+            return await ctx.send("Play timings cleared.", ephemeral=True)
+        if action == 'export':
+            data = play_timings.export(lookups=node_latency).encode()
+            return await ctx.send(file=discord.File(io.BytesIO(data), filename="play_timings.prom"), ephemeral=True)
+
+        embed = discord.Embed(
+            title="Time to First Audio",
+            description="p50 / p95 / p99 in ms (samples). `export` for Prometheus text, `clear` to reset.",
+            color=discord.Color.blurple(),
+        )
+        for node in play_timings.nodes()[:10]:
+            lines = []
+            for stage, _, _ in INTERVALS:
+                summary = play_timings.summary(node, stage)
+                if summary:
+                    count, (p50, p95, p99) = summary
+                    lines.append(f"{stage}: {p50:.0f} / {p95:.0f} / {p99:.0f} ({count})")
+            embed.add_field(name=f"Player node: {node}", value="\n".join(lines) or "No samples", inline=False)
+        lookups = []
+        for node, samples in sorted(node_latency.items()):
+            if samples:
+                values = sorted(samples)
+                p50, p95, p99 = (percentile(values, q) for q in PERCENTILES)
+                lookups.append(f"{node}: {p50:.0f} / {p95:.0f} / {p99:.0f} ({len(values)})")
+        if lookups:
+            embed.add_field(name="Lookups by node", value="\n".join(lookups[:10]), inline=False)
+        if not embed.fields:
+            embed.add_field(name="No samples yet", value="Run /play a few times.", inline=False)
+        await ctx.send(embed=embed, ephemeral=True)
+
     @bot.event
     async def on_voice_state_update(member, before, after):
         """Clear queue when bot disconnects from voice channel."""
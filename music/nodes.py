@@ -33,6 +33,7 @@ class NodeInfo:
     is_healthy: bool = True
     latency: float = 999.0
     supports_youtube: Optional[bool] = None
+    node: Any = field(default=None, repr=False)  # the lavalink.Node added for it
     
     @property
     def score(self) -> float:
@@ -62,6 +63,7 @@ class EnhancedLavalinkNodeManager:
         self._health_check_interval = 300  # 5 minutes
         self._refresh_interval = 600  # 10 minutes
         self._session: Optional[aiohttp.ClientSession] = None
+        self._search_pool_size = max(1, int(os.getenv("SEARCH_POOL_SIZE") or 3))
 
     async def _get_session(self) -> aiohttp.ClientSession:
         """Get or create aiohttp session."""
@@ -269,7 +271,7 @@ class EnhancedLavalinkNodeManager:
 
                 try:
                     # Add to lavalink client
-                    client.add_node(
+                    node_info.node = client.add_node(
                         host=host,
                         port=port,
                         password=password,
@@ -342,6 +344,49 @@ class EnhancedLavalinkNodeManager:
         )
         return best_node.identifier
 
+    def _lavalink_node(self, node_info: NodeInfo):
+        """The connected lavalink.Node for ``node_info``, or None."""
+        node = node_info.node
+        if node is None:
+            # Older lavalink.py versions don't return the node from add_node; find it by endpoint.
+            manager = getattr(getattr(self.bot, 'lavalink', None), 'node_manager', None)
+            for candidate in getattr(manager, 'nodes', None) or []:
+                if getattr(candidate, 'host', None) == node_info.host and getattr(candidate, 'port', None) == node_info.port:
+                    node = node_info.node = candidate
+                    break
+        return node if node is not None and getattr(node, 'available', True) else None
+
+    def search_pool(self) -> List[Any]:
+        """Healthy YouTube-capable nodes for searches (lavalink.Node objects), best score first."""
+        infos = sorted(
+            (n for n in self._nodes.values() if n.is_healthy and n.supports_youtube),
+            key=lambda n: n.score,
+        )
+        pool = []
+        for info in infos:
+            node = self._lavalink_node(info)
+            if node is not None:
+                pool.append(node)
+                if len(pool) >= self._search_pool_size:
+                    break
+        return pool
+
+    def get_search_node(self, avoid: Any = None, inflight: Optional[Dict[str, int]] = None) -> Optional[Any]:
+        """Least loaded node in the search pool, preferring one other than ``avoid`` (the playback node).
+
+        Load is the searches currently in flight on the node (``inflight``, by
+        node name), then the players it is streaming, then its lavalink penalty.
+        """
+        inflight = inflight or {}
+
+        def load(node) -> Tuple[bool, int, int, float]:
+            stats = getattr(node, 'stats', None)
+            penalty = getattr(getattr(stats, 'penalty', None), 'total', 0)
+            return (node is avoid, inflight.get(node.name, 0), getattr(stats, 'playing_players', 0), penalty)
+
+        pool = self.search_pool()
+        return min(pool, key=load) if pool else None
+
     async def handle_node_failure(self, failed_node_id: str):
         """Handle node failure by marking it unhealthy and switching to backup."""
         if failed_node_id in self._nodes:
@@ -486,6 +531,7 @@ class EnhancedLavalinkNodeManager:
         return {
             "total_nodes": len(self._nodes),
             "healthy_nodes": len(healthy_nodes),
+            "search_nodes": len(self.search_pool()),
             "total_players": total_players,
             "average_load": round(avg_load, 2),
             "average_latency": round(avg_latency, 2)
@@ -1,23 +1,368 @@
+import abc
+import atexit
 import json
 import os
+import random
 import threading
-from typing import Any, Dict, List, Optional
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .blocked_list import BlockedList
+from .track import Track, TrackData
 
 _LOCK = threading.RLock()
 
 DEFAULT_PATH = os.path.join(os.path.dirname(__file__), "queue_data.json")
 
 
+def _new_guild() -> Dict[str, Any]:
+    return {"queue": [], "index": 0, "loop": 0, "shuffle": False, "volume": 70}
+
+
+def _apply_op(g: Dict[str, Any], op: str, args: Tuple[Any, ...]) -> Tuple[Any, bool]:
+    """Apply a single mutation to a guild dict in place.
+
+    Returns ``(result, changed)``; ``changed`` is False when the operation was a
+    no-op (e.g. an out-of-range index) and nothing needs to be persisted.
+    Every store funnels its writes through here so the JSON file, the journal
+    replay and the in-memory state can never disagree.
+    """
+    if op == "init":
+        return None, True
+    if op == "set":
+        key, value = args
+        g[key] = value
+        return None, True
+    if op == "clear":
+        g.clear()
+        g.update(_new_guild())
+        return None, True
+    if op == "append":
+        q = g.setdefault("queue", [])
+        q.append(Track.decode(args[0]))
+        _grow_order(g, len(q) - 1)
+        return None, True
+    if op == "extend":
+        q = g.setdefault("queue", [])
+        start = len(q)
+        q.extend(Track.decode(t) for t in args[0])
+        _grow_order(g, start)
+        return None, True
+    if op == "remove_at":
+        index = args[0]
+        q = g.get("queue") or []
+        if not 0 <= index < len(q):
+            return None, False
+        t = q.pop(index)
+        g["queue"] = q
+        _after_remove(g, [index])
+        return t, True
+    if op == "remove_range":
+        q = g.get("queue") or []
+        start, stop = max(0, args[0]), min(len(q), args[1])
+        if start >= stop:
+            return 0, False
+        del q[start:stop]
+        _after_remove(g, range(start, stop))
+        return stop - start, True
+    if op == "remove_by":
+        requester = args[0]
+        q = g.get("queue") or []
+        removed = [i for i, t in enumerate(q) if t.get("requester") == requester]
+        if not removed:
+            return 0, False
+        gone = set(removed)
+        g["queue"] = type(q)(t for i, t in enumerate(q) if i not in gone)
+        _after_remove(g, removed)
+        return len(removed), True
+    if op == "move":
+        src, dst = args
+        q = g.get("queue") or []
+        if not (0 <= src < len(q) and 0 <= dst < len(q)) or src == dst:
+            return None, False
+        t = q.pop(src)
+        q.insert(dst, t)
+
+        def moved(p: int) -> int:
+            if p == src:
+                return dst
+            if src < p <= dst:
+                return p - 1
+            if dst <= p < src:
+                return p + 1
+            return p
+
+        _after_remap(g, moved)
+        return t, True
+    if op == "swap":
+        i, j = args
+        q = g.get("queue") or []
+        if not (0 <= i < len(q) and 0 <= j < len(q)) or i == j:
+            return False, False
+        q[i], q[j] = q[j], q[i]
+        _after_remap(g, lambda p: j if p == i else i if p == j else p)
+        return True, True
+    if op == "set_queue":
+        tracks = [Track.decode(t) for t in args[0]]
+        g["queue"] = tracks
+        g.pop("order", None)
+        g["shuffle"] = False
+        # Ensure index is within bounds
+        g["index"] = max(0, min(g.get("index", 0), len(tracks) - 1)) if tracks else 0
+        return None, True
+    if op == "update_track":
+        index, track_data = args
+        q = g.get("queue") or []
+        if not 0 <= index < len(q):
+            return False, False
+        q[index] = Track.decode(track_data)
+        g["queue"] = q
+        return True, True
+    if op == "shuffle":
+        g["order"] = list(args[0])
+        g["shuffle"] = True
+        return None, True
+    if op == "unshuffle":
+        if not g.get("order") and not g.get("shuffle"):
+            return None, False
+        g.pop("order", None)
+        g["shuffle"] = False
+        return None, True
+    raise ValueError(f"Unknown queue operation: {op}")
+
+
+def _after_remove(g: Dict[str, Any], removed: Sequence[int]) -> None:
+    """Fix the index pointer and play order after the sorted positions ``removed`` were deleted.
+
+    A removed current track leaves the pointer on the same numeric index,
+    which now points to the next surviving track.
+    """
+    cur = int(g.get("index", 0))
+    cur -= bisect_left(removed, cur)
+    g["index"] = max(0, min(cur, len(g.get("queue") or [])))
+    if g.get("order"):
+        gone = set(removed)
+        g["order"] = [p - bisect_left(removed, p) for p in g["order"] if p not in gone]
+
+
+def _after_remap(g: Dict[str, Any], new_pos: Callable[[int], int]) -> None:
+    """Follow tracks that changed position: the current track and the play order move with them."""
+    cur = int(g.get("index", 0))
+    if 0 <= cur < len(g.get("queue") or []):
+        g["index"] = new_pos(cur)
+    if g.get("order"):
+        g["order"] = [new_pos(p) for p in g["order"]]
+
+
+def _adopt(g: Dict[str, Any]) -> Dict[str, Any]:
+    """Back an in-memory guild's queue with a BlockedList so edits don't shift the whole list."""
+    q = g.get("queue")
+    if type(q) is list:
+        g["queue"] = BlockedList(q)
+    return g
+
+
+def _decode_guilds(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn the queues of freshly loaded JSON (compact lists or legacy dicts) into Track records."""
+    for g in data.values():
+        if isinstance(g, dict) and g.get("queue"):
+            g["queue"] = [Track.decode(t) for t in g["queue"]]
+    return data
+
+
+def _json_default(o: Any) -> Any:
+    if isinstance(o, Track):
+        return o.encode()
+    if isinstance(o, BlockedList):
+        return list(o)
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def _grow_order(g: Dict[str, Any], start: int) -> None:
+    # Tracks added while shuffled play after the already-shuffled ones.
+    # (The order list is always replaced, never edited in place, so snapshots
+    # handed to transactions can't alias the live state.)
+    if g.get("order"):
+        g["order"] = g["order"] + list(range(start, len(g["queue"])))
+
+
+def _shuffled_order(g: Dict[str, Any], rng: random.Random) -> List[int]:
+    """A play order over queue positions that starts with the current track."""
+    n = len(g.get("queue") or [])
+    idx = int(g.get("index", 0))
+    rest = [i for i in range(n) if i != idx]
+    rng.shuffle(rest)
+    return [idx] + rest if 0 <= idx < n else rest
+
+
+def _step_index(g: Dict[str, Any], delta: int, wrap: bool) -> Optional[int]:
+    """Queue position ``delta`` steps from the current one in play order.
+
+    Play order is the queue itself, or the ``order`` permutation while
+    shuffled. Returns None when stepping off either end without ``wrap``. A
+    finished queue (index -1) steps forward to the first track and back to
+    the last one.
+    """
+    n = len(g.get("queue") or [])
+    if not n:
+        return None
+    idx = int(g.get("index", 0))
+    order = g.get("order")
+    if order:
+        try:
+            pos = order.index(idx)
+        except ValueError:
+            pos = -1 if delta > 0 else len(order)
+    else:
+        pos = idx if 0 <= idx < n else (-1 if delta > 0 else n)
+    pos += delta
+    if not 0 <= pos < n:
+        if not wrap:
+            return None
+        pos %= n
+    return order[pos] if order else pos
+
+
+def _next_index(g: Dict[str, Any]) -> int:
+    idx = int(g.get("index", 0))
+    q = g.get("queue") or []
+    loop = int(g.get("loop", 0))
+    if not q:
+        return 0
+    if loop == 1:  # track loop
+        return idx
+    nxt = _step_index(g, 1, wrap=loop == 2)
+    # no loop, end: points past end
+    return len(q) if nxt is None else nxt
+
+
+# Operations that leave the queue list itself alone (a transaction on a live guild needn't copy it for them)
+_QUEUE_UNTOUCHED = frozenset(("init", "set", "clear", "shuffle", "unshuffle"))
+
+
+class GuildTransaction:
+    """
+    Handle yielded by ``PersistentQueue.transaction``: one guild read and
+    mutated locally, and committed to the store in a single write.
+
+    With ``shared=True`` the guild is the store's live in-memory dict: reads
+    go straight to it and it is copied on the first change (the queue list
+    only by operations that edit it), so a transaction that just moves the
+    index doesn't copy the queue.
+
+    The store lock is held for the lifetime of the ``with`` block, so keep the
+    body synchronous (no ``await``) and short.
+    """
+
+    def __init__(self, guild: Dict[str, Any], shared: bool = False):
+        self._g = guild
+        self._shared_dict = self._shared_queue = shared
+        self.ops: List[Tuple[str, Tuple[Any, ...]]] = []
+
+    def _do(self, op: str, *args: Any) -> Any:
+        if self._shared_dict:
+            self._g = dict(self._g)
+            self._shared_dict = False
+        if self._shared_queue and op not in _QUEUE_UNTOUCHED:
+            self._g["queue"] = list(self._g.get("queue") or [])
+            self._shared_queue = False
+        result, changed = _apply_op(self._g, op, args)
+        if changed:
+            self.ops.append((op, args))
+        return result
+
+    def __len__(self) -> int:
+        return len(self._g.get("queue") or [])
+
+    # Reads (served from the loaded guild)
+    def get_guild(self) -> Dict[str, Any]:
+        """The whole guild dict (read-only). Prefer the narrower reads: on SQLite this loads every track."""
+        return self._g
+
+    def get_guild_prop(self, key: str, default: Any = None) -> Any:
+        return self._g.get(key, default)
+
+    def get_queue(self) -> List[Track]:
+        return list(self._g.get("queue") or [])
+
+    def get_index(self) -> int:
+        return int(self._g.get("index", 0))
+
+    def item(self, index: int) -> Optional[Track]:
+        q = self._g.get("queue") or []
+        return q[index] if 0 <= index < len(q) else None
+
+    def current_track(self) -> Optional[Track]:
+        idx = self.get_index()
+        q = self._g.get("queue") or []
+        return q[idx] if 0 <= idx < len(q) else None
+
+    def next_index(self) -> int:
+        return _next_index(self._g)
+
+    def step_index(self, delta: int, wrap: bool = False) -> Optional[int]:
+        return _step_index(self._g, delta, wrap)
+
+    def is_shuffled(self) -> bool:
+        return bool(self._g.get("order"))
+
+    # Mutations (recorded and committed on exit)
+    def set_guild_prop(self, key: str, value: Any) -> None:
+        self._do("set", key, value)
+
+    def set_index(self, index: int) -> None:
+        self._do("set", "index", int(index))
+
+    def clear(self) -> None:
+        self._do("clear")
+
+    def append_track(self, track: TrackData) -> None:
+        self._do("append", track)
+
+    def extend_tracks(self, tracks: List[TrackData]) -> None:
+        self._do("extend", list(tracks))
+
+    def remove_at(self, index: int) -> Optional[Track]:
+        return self._do("remove_at", index)
+
+    def remove_range(self, start: int, stop: int) -> int:
+        return self._do("remove_range", start, stop)
+
+    def remove_by_requester(self, requester: int) -> int:
+        return self._do("remove_by", requester)
+
+    def move_track(self, src: int, dst: int) -> Optional[Track]:
+        return self._do("move", src, dst)
+
+    def swap_tracks(self, i: int, j: int) -> bool:
+        return self._do("swap", i, j)
+
+    def set_queue(self, tracks: List[TrackData]) -> None:
+        self._do("set_queue", list(tracks))
+
+    def update_track(self, index: int, track_data: TrackData) -> bool:
+        return self._do("update_track", index, track_data)
+
+    def shuffle(self, rng: Optional[random.Random] = None) -> None:
+        self._do("shuffle", _shuffled_order(self._g, rng or random.Random()))
+
+    def unshuffle(self) -> None:
+        self._do("unshuffle")
+
+
 class PersistentQueue:
     """
     Thread-safe JSON store for per-guild queues and minimal now-playing state.
     Data shape:
         {
             "<guild_id>": {
-                "queue": [ {"title": str, "uri": str, "duration": int, "identifier": str, "author": str, "requester": int} ],
+                "queue": [ [title, uri, duration, identifier, author, requester, {extra}?] ],  # Track.encode(); legacy dicts still load
                 "index": int,  # current playback index into queue
                 "loop": 0|1|2,
                 "shuffle": bool,
+                "order": [int],  # optional play-order permutation of queue positions while shuffled
                 "volume": int
             }
         }
@@ -35,7 +380,7 @@ class PersistentQueue:
         with _LOCK:
             try:
                 with open(self.path, "r", encoding="utf-8") as f:
-                    return json.load(f)
+                    return _decode_guilds(json.load(f))
             except Exception:
                 return {}
 
@@ -43,127 +388,440 @@ class PersistentQueue:
         with _LOCK:
             tmp = self.path + ".tmp"
             with open(tmp, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+                json.dump(data, f, ensure_ascii=False, separators=(",", ":"), default=_json_default)
             os.replace(tmp, self.path)
 
+    def _mutate(self, guild_id: int, op: str, *args: Any) -> Any:
+        """Read-modify-write one guild under the file lock."""
+        with _LOCK:
+            data = self._read()
+            gid = str(guild_id)
+            g = data.get(gid) or _new_guild()
+            result, changed = _apply_op(g, op, args)
+            if changed:
+                data[gid] = g
+                self._write(data)
+            return result
+
+    def close(self) -> None:
+        """Release any resources held by the store (no-op for the plain JSON file)."""
+
+    @contextmanager
+    def transaction(self, guild_id: int) -> Iterator[GuildTransaction]:
+        """Load a guild once, allow any number of reads/mutations, commit once.
+
+            with queue_store.transaction(guild_id) as g:
+                g.append_track(track)
+                g.set_index(len(g) - 1)
+
+        Nothing is written if the block raises or makes no changes.
+        """
+        with _LOCK:
+            tx = self._begin(guild_id)
+            yield tx
+            if tx.ops:
+                self._commit(str(guild_id), tx)
+
+    def _begin(self, guild_id: int) -> GuildTransaction:
+        # The JSON file is parsed afresh, so the transaction owns its copy outright.
+        return GuildTransaction(self.get_guild(guild_id))
+
+    def _commit(self, gid: str, tx: GuildTransaction) -> None:
+        data = self._read()
+        data[gid] = tx.get_guild()
+        self._write(data)
+
+    def _peek(self, guild_id: int) -> Dict[str, Any]:
+        """Guild dict for read-only use: neither copied nor created if missing."""
+        return self._read().get(str(guild_id)) or {}
+
     def get_guild(self, guild_id: int) -> Dict[str, Any]:
         data = self._read()
         key = str(guild_id)
         g = data.get(key) or {}
         if not g:
-            g = {"queue": [], "index": 0, "loop": 0, "shuffle": False, "volume": 70}
-            data[key] = g
-            self._write(data)
+            g = _new_guild()
+            self._mutate(guild_id, "init")
         return g
 
+    def get_guild_prop(self, guild_id: int, key: str, default: Any = None) -> Any:
+        """One guild field (e.g. ``loop``) without copying the queue."""
+        with _LOCK:
+            return self._peek(guild_id).get(key, default)
+
     def set_guild_prop(self, guild_id: int, key: str, value: Any) -> None:
-        data = self._read()
-        gid = str(guild_id)
-        g = data.get(gid) or {"queue": [], "index": 0, "loop": 0, "shuffle": False, "volume": 70}
-        g[key] = value
-        data[gid] = g
-        self._write(data)
+        self._mutate(guild_id, "set", key, value)
 
     def clear_guild(self, guild_id: int) -> None:
-        data = self._read()
-        gid = str(guild_id)
-        data[gid] = {"queue": [], "index": 0, "loop": 0, "shuffle": False, "volume": 70}
-        self._write(data)
+        self._mutate(guild_id, "clear")
 
     # Queue operations
-    def get_queue(self, guild_id: int) -> List[Dict[str, Any]]:
+    def get_queue(self, guild_id: int) -> List[Track]:
         return list(self.get_guild(guild_id).get("queue", []))
 
     def get_index(self, guild_id: int) -> int:
-        return int(self.get_guild(guild_id).get("index", 0))
+        with _LOCK:
+            return int(self._peek(guild_id).get("index", 0))
 
     def set_index(self, guild_id: int, index: int) -> None:
         self.set_guild_prop(guild_id, "index", int(index))
 
-    def append_track(self, guild_id: int, track: Dict[str, Any]) -> None:
-        data = self._read()
-        gid = str(guild_id)
-        g = data.get(gid) or {"queue": [], "index": 0, "loop": 0, "shuffle": False, "volume": 70}
-        g.setdefault("queue", []).append(track)
-        data[gid] = g
-        self._write(data)
+    def append_track(self, guild_id: int, track: TrackData) -> None:
+        self._mutate(guild_id, "append", track)
 
-    def extend_tracks(self, guild_id: int, tracks: List[Dict[str, Any]]) -> None:
-        data = self._read()
-        gid = str(guild_id)
-        g = data.get(gid) or {"queue": [], "index": 0, "loop": 0, "shuffle": False, "volume": 70}
-        g.setdefault("queue", []).extend(tracks)
-        data[gid] = g
-        self._write(data)
+    def extend_tracks(self, guild_id: int, tracks: List[TrackData]) -> None:
+        self._mutate(guild_id, "extend", list(tracks))
 
-    def current_track(self, guild_id: int) -> Optional[Dict[str, Any]]:
-        g = self.get_guild(guild_id)
-        idx = int(g.get("index", 0))
-        q = g.get("queue") or []
-        if 0 <= idx < len(q):
-            return q[idx]
-        return None
+    def current_track(self, guild_id: int) -> Optional[Track]:
+        return self.current(guild_id)[1]
 
     def next_index(self, guild_id: int) -> int:
-        g = self.get_guild(guild_id)
-        idx = int(g.get("index", 0))
-        q = g.get("queue") or []
-        loop = int(g.get("loop", 0))
-        if not q:
-            return 0
-        if loop == 1:  # track loop
-            return idx
-        if idx + 1 < len(q):
-            return idx + 1
-        if loop == 2:  # queue loop
-            return 0
-        # no loop, end
-        return len(q)  # points past end
-
-    def remove_at(self, guild_id: int, index: int) -> Optional[Dict[str, Any]]:
-        data = self._read()
-        gid = str(guild_id)
-        g = data.get(gid) or {}
-        q = g.get("queue") or []
-        if 0 <= index < len(q):
-            t = q.pop(index)
-            # adjust index pointer
-            cur = int(g.get("index", 0))
-            if index < cur:
-                cur -= 1
-            elif index == cur:
-                # keep pointer at same numeric index which now points to next item
-                pass
-            g["index"] = max(0, min(cur, len(q)))
-            g["queue"] = q
-            data[gid] = g
-            self._write(data)
-            return t
-        return None
+        with _LOCK:
+            return _next_index(self._peek(guild_id))
+
+    def step_index(self, guild_id: int, delta: int, wrap: bool = False) -> Optional[int]:
+        """Queue position ``delta`` steps away in play order (shuffle-aware), or None."""
+        with _LOCK:
+            return _step_index(self._peek(guild_id), delta, wrap)
+
+    # Windowed reads: only the requested rows are copied, never the whole queue
+    def length(self, guild_id: int) -> int:
+        with _LOCK:
+            return len(self._peek(guild_id).get("queue") or [])
+
+    def item(self, guild_id: int, index: int) -> Optional[Track]:
+        with _LOCK:
+            q = self._peek(guild_id).get("queue") or []
+            return q[index] if 0 <= index < len(q) else None
+
+    def window(self, guild_id: int, offset: int, limit: int) -> List[Track]:
+        """Tracks ``offset .. offset+limit-1`` (clipped to the queue)."""
+        offset = max(0, int(offset))
+        with _LOCK:
+            q = self._peek(guild_id).get("queue") or []
+            return list(q[offset:offset + max(0, int(limit))])
+
+    def page(self, guild_id: int, offset: int, limit: int) -> Tuple[int, int, List[Track]]:
+        """``(length, index, window(offset, limit))`` read together, so they describe the same queue."""
+        offset = max(0, int(offset))
+        with _LOCK:
+            g = self._peek(guild_id)
+            q = g.get("queue") or []
+            return len(q), int(g.get("index", 0)), list(q[offset:offset + max(0, int(limit))])
+
+    def current(self, guild_id: int) -> Tuple[int, Optional[Track]]:
+        """``(index, track)`` for the now-playing pointer; track is None when out of range."""
+        with _LOCK:
+            g = self._peek(guild_id)
+            idx = int(g.get("index", 0))
+            q = g.get("queue") or []
+            return idx, (q[idx] if 0 <= idx < len(q) else None)
 
-    def set_queue(self, guild_id: int, tracks: List[Dict[str, Any]]) -> None:
+    def remove_at(self, guild_id: int, index: int) -> Optional[Track]:
+        return self._mutate(guild_id, "remove_at", index)
+
+    def remove_range(self, guild_id: int, start: int, stop: int) -> int:
+        """Remove positions ``start .. stop-1`` (clipped) in one write; returns how many were removed."""
+        return self._mutate(guild_id, "remove_range", int(start), int(stop))
+
+    def remove_by_requester(self, guild_id: int, requester: int) -> int:
+        """Remove every track queued by ``requester`` in one write; returns how many were removed."""
+        return self._mutate(guild_id, "remove_by", requester)
+
+    def move_track(self, guild_id: int, src: int, dst: int) -> Optional[Track]:
+        """Move the track at ``src`` to ``dst``; the now-playing pointer follows its track."""
+        return self._mutate(guild_id, "move", int(src), int(dst))
+
+    def swap_tracks(self, guild_id: int, i: int, j: int) -> bool:
+        """Swap two queue positions; the now-playing pointer follows its track."""
+        return self._mutate(guild_id, "swap", int(i), int(j))
+
+    def set_queue(self, guild_id: int, tracks: List[TrackData]) -> None:
         """Replace the entire queue with new tracks."""
-        data = self._read()
-        gid = str(guild_id)
-        g = data.get(gid) or {"queue": [], "index": 0, "loop": 0, "shuffle": False, "volume": 70}
-        g["queue"] = tracks
-        # Ensure index is within bounds
-        g["index"] = max(0, min(g.get("index", 0), len(tracks) - 1)) if tracks else 0
-        data[gid] = g
-        self._write(data)
+        self._mutate(guild_id, "set_queue", list(tracks))
 
-    def update_track(self, guild_id: int, index: int, track_data: Dict[str, Any]) -> bool:
+    def update_track(self, guild_id: int, index: int, track_data: TrackData) -> bool:
         """Update a specific track in the queue with new data (e.g., fresh URI)."""
-        data = self._read()
+        return self._mutate(guild_id, "update_track", index, track_data)
+
+    def shuffle(self, guild_id: int, rng: Optional[random.Random] = None) -> None:
+        """Store a shuffled play order; the queue itself is left untouched."""
+        with _LOCK:
+            order = _shuffled_order(self._peek(guild_id), rng or random.Random())
+            self._mutate(guild_id, "shuffle", order)
+
+    def unshuffle(self, guild_id: int) -> None:
+        """Drop the play order so playback continues in queue order."""
+        self._mutate(guild_id, "unshuffle")
+
+
+class _InMemoryQueue(PersistentQueue, abc.ABC):
+    """Shared base for stores whose authoritative state lives in ``self._data``.
+
+    Queues are held as ``BlockedList``s, so removals and moves in the middle of
+    a long queue don't shift every later track.
+
+    Subclasses persist changes in ``_record`` (called under the lock after a
+    mutation actually changed something); one that doesn't define it can't
+    be instantiated.
+    """
+
+    _data: Dict[str, Dict[str, Any]]
+
+    def _read(self) -> Dict[str, Any]:
+        return self._data
+
+    def _write(self, data: Dict[str, Any]) -> None:
+        self._data = data
+
+    @abc.abstractmethod
+    def _record(self, gid: str, op: str, args: Tuple[Any, ...]) -> None:
+        """Persist ``op(*args)``, just applied to guild ``gid``."""
+
+    def _mutate(self, guild_id: int, op: str, *args: Any) -> Any:
+        with _LOCK:
+            gid = str(guild_id)
+            g = _adopt(self._data.get(gid) or _new_guild())
+            result, changed = _apply_op(g, op, args)
+            if changed:
+                self._data[gid] = _adopt(g)
+                self._record(gid, op, args)
+            return result
+
+    def _begin(self, guild_id: int) -> GuildTransaction:
+        # Caller holds the lock for the whole transaction, so it can read the live guild.
         gid = str(guild_id)
-        g = data.get(gid) or {"queue": [], "index": 0, "loop": 0, "shuffle": False, "volume": 70}
-        q = g.get("queue") or []
-        
-        if 0 <= index < len(q):
-            q[index] = track_data
-            g["queue"] = q
-            data[gid] = g
-            self._write(data)
-            return True
-        return False
+        if not self._data.get(gid):
+            self._mutate(guild_id, "init")
+        return GuildTransaction(self._data[gid], shared=True)
+
+    def _commit(self, gid: str, tx: GuildTransaction) -> None:
+        # Replay against the live state so each backend persists the ops its own way.
+        for op, args in tx.ops:
+            self._mutate(gid, op, *args)
+
+    def get_guild(self, guild_id: int) -> Dict[str, Any]:
+        with _LOCK:
+            g = self._data.get(str(guild_id))
+            if not g:
+                self._mutate(guild_id, "init")
+                g = self._data[str(guild_id)]
+            # Callers treat the result as a snapshot; don't hand out the live dict.
+            snap = dict(g)
+            snap["queue"] = list(g.get("queue") or [])
+            return snap
+
+
+class JournaledQueue(_InMemoryQueue):
+    """
+    PersistentQueue that keeps the materialized state in memory and appends one
+    small JSON record per mutation to a journal instead of rewriting every guild.
+
+    Files (next to ``path``):
+        <name>.journal        one ``{"n": seq, "g": guild_id, "op": str, "a": [...]}`` per line
+        <name>.snapshot.json  ``{"seq": int, "guilds": {...}}`` written on compaction
+
+    Startup loads the snapshot (or the plain JSON file on first run) and replays
+    journal records with ``n > seq``; the result is exactly what PersistentQueue
+    would have written. A torn trailing line from a crash is ignored.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH, compact_every: int = 1000):
+        self.path = path
+        base, _ = os.path.splitext(path)
+        self.journal_path = base + ".journal"
+        self.snapshot_path = base + ".snapshot.json"
+        self.compact_every = max(1, int(compact_every))
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        self._seq = 0
+        self._pending = 0  # records written since the last snapshot
+        self._data = self._replay()
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+
+    def _load_snapshot(self) -> Dict[str, Any]:
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                snap = json.load(f)
+            self._seq = int(snap.get("seq", 0))
+            return _decode_guilds(snap.get("guilds") or {})
+        except FileNotFoundError:
+            # First run in journaled mode: migrate from the plain JSON file.
+            return PersistentQueue._read(self) if os.path.exists(self.path) else {}
+        except Exception:
+            return {}
+
+    def _replay(self) -> Dict[str, Any]:
+        data = self._load_snapshot()
+        try:
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        break  # torn write at the tail
+                    n = int(rec.get("n", 0))
+                    if n <= self._seq:
+                        continue
+                    gid = rec["g"]
+                    g = _adopt(data.get(gid) or _new_guild())
+                    _, changed = _apply_op(g, rec["op"], tuple(rec.get("a") or ()))
+                    if changed:
+                        data[gid] = _adopt(g)
+                    self._seq = n
+                    self._pending += 1
+        except FileNotFoundError:
+            pass
+        return data
+
+    def _record(self, gid: str, op: str, args: Tuple[Any, ...]) -> None:
+        self._seq += 1
+        rec = {"n": self._seq, "g": gid, "op": op, "a": list(args)}
+        self._journal.write(json.dumps(rec, ensure_ascii=False, separators=(",", ":"), default=_json_default) + "\n")
+        self._journal.flush()
+        self._pending += 1
+        if self._pending >= self.compact_every:
+            self.compact()
+
+    def compact(self) -> None:
+        """Fold the journal into a fresh snapshot and truncate it."""
+        with _LOCK:
+            tmp = self.snapshot_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"seq": self._seq, "guilds": self._data}, f,
+                    ensure_ascii=False, separators=(",", ":"), default=_json_default,
+                )
+            os.replace(tmp, self.snapshot_path)
+            # Records up to self._seq are now covered by the snapshot, so a crash
+            # before the truncate below only leaves records that replay skips.
+            self._journal.close()
+            self._journal = open(self.journal_path, "w", encoding="utf-8")
+            self._pending = 0
 
+    def close(self) -> None:
+        with _LOCK:
+            if self._journal.closed:
+                return
+            self.compact()
+            self._journal.close()
+
+
+class CachedQueue(_InMemoryQueue):
+    """
+    Write-behind PersistentQueue: every read is served from memory and dirty
+    guilds are flushed to the same JSON file ``flush_delay`` seconds after the
+    last change, or as soon as possible once ``flush_threshold`` changes are
+    pending.
+
+    Flushes run on one background flusher thread; a mutation only moves its
+    deadline, so neither a burst of edits nor the threshold puts disk I/O on
+    the caller's thread. Each guild's JSON is cached between flushes, so a
+    flush only re-serializes the guilds that actually changed. Call
+    ``flush()`` (or ``close()``) on shutdown; an atexit hook does it as a
+    last resort.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH, flush_delay: float = 2.0, flush_threshold: int = 200):
+        super().__init__(path)
+        self.flush_delay = float(flush_delay)
+        self.flush_threshold = max(1, int(flush_threshold))
+        self._data = PersistentQueue._read(self)
+        self._encoded: Dict[str, str] = {}
+        self._dirty: set[str] = set(self._data)
+        self._pending = 0
+        # Flusher thread: sleeps until ``_due`` (a time.monotonic() deadline, None when clean).
+        # Lock order is _LOCK, then _wake; the flusher never holds _wake while flushing.
+        self._wake = threading.Condition()
+        self._due: Optional[float] = None
+        self._closed = False
+        self._flusher = threading.Thread(target=self._flush_loop, name="queue-flusher", daemon=True)
+        self._flusher.start()
+        self.stats = {"reads_avoided": 0, "flushes": 0, "bytes_written": 0, "guilds_serialized": 0}
+        atexit.register(self.close)
+
+    def _record(self, gid: str, op: str, args: Tuple[Any, ...]) -> None:
+        self._dirty.add(gid)
+        self._pending += 1
+        delay = 0.0 if self._pending >= self.flush_threshold else self.flush_delay
+        with self._wake:
+            self._due = time.monotonic() + delay
+            self._wake.notify()
+
+    def _flush_loop(self) -> None:
+        while True:
+            with self._wake:
+                while not self._closed and (self._due is None or self._due > time.monotonic()):
+                    self._wake.wait(None if self._due is None else self._due - time.monotonic())
+                if self._closed:
+                    return
+            try:
+                self.flush()
+            except Exception:
+                # Keep the data dirty and retry after the usual delay rather than losing the thread.
+                with self._wake:
+                    self._due = time.monotonic() + self.flush_delay
+
+    def flush(self) -> None:
+        """Write all dirty guilds to disk now."""
+        with _LOCK:
+            with self._wake:
+                self._due = None
+            if not self._dirty:
+                return
+            for gid in self._dirty:
+                g = self._data.get(gid)
+                if g is None:
+                    self._encoded.pop(gid, None)
+                    continue
+                self._encoded[gid] = json.dumps(g, ensure_ascii=False, separators=(",", ":"), default=_json_default)
+            self.stats["guilds_serialized"] += len(self._dirty)
+            body = "{" + ",".join(f"{json.dumps(gid)}:{enc}" for gid, enc in self._encoded.items()) + "}"
+            payload = body.encode("utf-8")
+            tmp = self.path + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(payload)
+            os.replace(tmp, self.path)
+            self.stats["flushes"] += 1
+            self.stats["bytes_written"] += len(payload)
+            self._dirty.clear()
+            self._pending = 0
+
+    def close(self) -> None:
+        self.flush()
+        with self._wake:
+            self._closed = True
+            self._wake.notify()
+
+    # Every read path ends in one of these three; each call is a disk read the cache saved.
+    def _peek(self, guild_id: int) -> Dict[str, Any]:
+        self.stats["reads_avoided"] += 1
+        return super()._peek(guild_id)
+
+    def get_guild(self, guild_id: int) -> Dict[str, Any]:
+        self.stats["reads_avoided"] += 1
+        return super().get_guild(guild_id)
+
+    def _begin(self, guild_id: int) -> GuildTransaction:
+        self.stats["reads_avoided"] += 1
+        return super()._begin(guild_id)
+
+
+def open_queue_store(backend: Optional[str] = None, path: str = DEFAULT_PATH) -> PersistentQueue:
+    """Create the queue store selected by ``backend`` or the QUEUE_BACKEND env var.
+
+    ``json`` (default) rewrites queue_data.json on every change; ``journal``
+    keeps state in memory and appends per-operation records to a log;
+    ``cached`` serves reads from memory and flushes dirty guilds in the background;
+    ``sqlite`` stores one row per track in queue_data.sqlite3 (importing the
+    JSON file on first use) and can be shared between processes.
+    """
+    backend = (backend or os.getenv("QUEUE_BACKEND") or "json").strip().lower()
+    if backend == "journal":
+        return JournaledQueue(path)
+    if backend == "cached":
+        return CachedQueue(path)
+    if backend == "sqlite":
+        from .sqlite_queue import SQLiteQueue
+        return SQLiteQueue(import_from=path)
+    return PersistentQueue(path)
@@ -0,0 +1,220 @@
+import asyncio
+import atexit
+import functools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+from .track import Track
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = os.path.join(os.path.dirname(__file__), "resolutions.sqlite3")
+
+T = TypeVar("T")
+
+
+class ResolutionCache:
+    """
+    On-disk map from a normalized search query or URI to the tracks it
+    resolved to, so lookups stay warm across restarts.
+
+    Each entry keeps the load type and the stored form of every track
+    (identifier, encoded string and metadata, see ``Track.encode``). The file
+    is opened lazily on first use and entries are read on demand, so startup
+    doesn't pay for a cache it may barely touch. ``max_bytes`` is the size
+    budget for the stored data: once it's exceeded, ``compact`` deletes the
+    least recently used entries until the cache is back under 90% of it
+    (``put`` doesn't compact by itself). Entries older than ``max_age``
+    seconds count as misses.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 64 * 1024 * 1024, max_age: Optional[float] = 7 * 86400):
+        self.path = path
+        self.max_bytes = max(1, int(max_bytes))
+        self.max_age = max_age
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._bytes: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.compactions = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        # Caller holds the lock.
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS resolutions ("
+                "key TEXT PRIMARY KEY, data TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created REAL NOT NULL, used REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS resolutions_used ON resolutions (used)")
+            self._bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM resolutions").fetchone()[0]
+            atexit.register(self.close)
+        return self._conn
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Stored entry for ``key`` as ``{"load_type": str, "tracks": [Track, ...]}``, or None."""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT data, created FROM resolutions WHERE key = ?", (key,)).fetchone()
+            if row is None or (self.max_age and row[1] < now - self.max_age):
+                self.misses += 1
+                return None
+            conn.execute("UPDATE resolutions SET used = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        data = json.loads(row[0])
+        return {"load_type": data["load_type"], "tracks": [Track.decode(t) for t in data["tracks"]]}
+
+    def put(self, key: str, load_type: str, tracks: List[Track]) -> None:
+        data = json.dumps(
+            {"load_type": load_type, "tracks": [t.encode() for t in tracks]},
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+        size = len(key) + len(data)
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            old = conn.execute("SELECT size FROM resolutions WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO resolutions (key, data, size, created, used) VALUES (?, ?, ?, ?, ?)",
+                (key, data, size, now, now),
+            )
+            self._bytes += size - (old[0] if old else 0)
+
+    def compact(self, chunk: int = 256) -> int:
+        """Delete least recently used entries until under 90% of the budget; returns how many.
+
+        Does nothing while the cache is within ``max_bytes``. Deletes
+        ``chunk`` entries per transaction and releases the lock in between,
+        so lookups aren't held up for the whole pass.
+        """
+        with self._lock:
+            self._connect()
+            if self._bytes <= self.max_bytes:
+                return 0
+        target = int(self.max_bytes * 0.9)
+        removed = freed = 0
+        while True:
+            with self._lock:
+                conn = self._connect()
+                if self._bytes <= target:
+                    break
+                doomed = []
+                for key, size in conn.execute("SELECT key, size FROM resolutions ORDER BY used LIMIT ?", (chunk,)):
+                    if self._bytes <= target:
+                        break
+                    doomed.append((key,))
+                    self._bytes -= size
+                    freed += size
+                if not doomed:
+                    break
+                conn.execute("BEGIN")
+                conn.executemany("DELETE FROM resolutions WHERE key = ?", doomed)
+                conn.execute("COMMIT")
+                removed += len(doomed)
+        if removed:
+            self.compactions += 1
+            logger.debug(f"[ResolutionCache] Compacted {removed} entries ({freed} bytes)")
+        return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connect().execute("DELETE FROM resolutions")
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            conn = self._connect()
+            entries = conn.execute("SELECT COUNT(*) FROM resolutions").fetchone()[0]
+            size = self._bytes
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "compactions": self.compactions,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class AsyncResolutionCache:
+    """
+    Event-loop-safe facade over a ResolutionCache.
+
+    Lookups run on a small dedicated thread pool and are awaited; writes are
+    handed to the same pool without waiting for them, and a write that takes
+    the cache over its budget compacts it there, one pass at a time, so
+    neither SQLite I/O nor compaction runs on the bot's event loop.
+    ``cache`` is the wrapped sync cache.
+    """
+
+    def __init__(self, cache: ResolutionCache, max_workers: int = 2):
+        self.cache = cache
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="resolution-cache")
+        self._compacting = threading.Lock()
+
+    async def _run(self, fn: Callable[..., T], *args: Any) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args))
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return await self._run(self.cache.get, key)
+
+    def put(self, key: str, load_type: str, tracks: List[Track]) -> None:
+        """Queue a write of ``key`` (see ``ResolutionCache.put``) and return immediately."""
+        self._executor.submit(self._put, key, load_type, tracks)
+
+    def _put(self, key: str, load_type: str, tracks: List[Track]) -> None:
+        try:
+            self.cache.put(key, load_type, tracks)
+            if self._compacting.acquire(blocking=False):  # one pass at a time; it covers later writes too
+                try:
+                    self.cache.compact()
+                finally:
+                    self._compacting.release()
+        except Exception as e:
+            logger.debug(f"[ResolutionCache] Write failed for {key}: {e}")
+
+    async def clear(self) -> None:
+        await self._run(self.cache.clear)
+
+    async def stats(self) -> Dict[str, Any]:
+        return await self._run(self.cache.stats)
+
+    async def close(self) -> None:
+        """Finish queued writes, then close the database."""
+        await asyncio.get_running_loop().run_in_executor(None, functools.partial(self._executor.shutdown, wait=True))
+        self.cache.close()
+
+
+def open_resolution_cache() -> Optional[ResolutionCache]:
+    """Resolution cache configured from the environment.
+
+    ``RESOLUTION_CACHE_MB`` is the size budget (default 64, ``0`` disables the
+    cache); ``RESOLUTION_CACHE_DAYS`` is how long an entry stays valid (default 7).
+    """
+    budget = float(os.getenv("RESOLUTION_CACHE_MB") or 64)
+    if budget <= 0:
+        return None
+    days = float(os.getenv("RESOLUTION_CACHE_DAYS") or 7)
+    return ResolutionCache(DEFAULT_PATH, max_bytes=int(budget * 1024 * 1024), max_age=days * 86400 or None)
@@ -0,0 +1,326 @@
+"""Turning queries and queued Track records into playable lavalink tracks."""
+
+import asyncio
+import copy
+import logging
+import os
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Sequence
+
+import lavalink
+
+from .cache import LRUCache
+from .resolution_cache import AsyncResolutionCache, open_resolution_cache
+from .track import Track
+
+logger = logging.getLogger(__name__)
+
+SEARCH_PREFIXES = ("ytsearch:", "ytmsearch:", "scsearch:")
+
+# Process-wide: a song one guild searched a minute ago resolves from memory for every other guild.
+search_cache: "LRUCache[str, lavalink.LoadResult]" = LRUCache(
+    maxsize=int(os.getenv("SEARCH_CACHE_SIZE") or 1000),
+    ttl=float(os.getenv("SEARCH_CACHE_TTL") or 900),
+)
+
+
+# Second level on disk so a restart doesn't start cold (None when disabled); playlists aren't kept.
+# Reads and writes go through a thread pool so SQLite never runs on the event loop.
+_disk_cache = open_resolution_cache()
+resolution_cache = AsyncResolutionCache(_disk_cache) if _disk_cache else None
+
+# Negative caching, with a short TTL so a video that comes back (or a flaky node) recovers on its own:
+# lookups that loaded nothing (dead URIs, searches without results), keyed like the search cache, ...
+NEGATIVE_TTL = float(os.getenv("NEGATIVE_CACHE_TTL") or 120)
+negative_cache: "LRUCache[str, lavalink.LoadResult]" = LRUCache(maxsize=2000, ttl=NEGATIVE_TTL)
+# ... and queue entries that failed to play by every strategy, keyed by identifier (or URI).
+dead_tracks: "LRUCache[str, bool]" = LRUCache(maxsize=5000, ttl=NEGATIVE_TTL)
+
+# Singleflight: identical lookups already on their way to a node, by search key or identifier.
+_inflight: Dict[str, "asyncio.Future[lavalink.LoadResult]"] = {}
+singleflight_stats = {"started": 0, "coalesced": 0}
+
+
+# Hedging: when a node hasn't answered within its own p90 load time, the same lookup also goes to the
+# next-best node and the first answer wins. SEARCH_HEDGE=0 turns it off; SEARCH_HEDGE_MS is the delay
+# until a node has enough samples, and the floor after that.
+HEDGE_ENABLED = (os.getenv("SEARCH_HEDGE") or "1").strip().lower() not in ("0", "false", "no", "off")
+HEDGE_MIN_MS = float(os.getenv("SEARCH_HEDGE_MS") or 750)
+HEDGE_MIN_SAMPLES = 10
+node_latency: Dict[str, Deque[float]] = {}  # node name -> recent load times (ms)
+node_inflight: Dict[str, int] = {}  # node name -> loads in progress
+hedge_stats = {"hedged": 0, "hedge_wins": 0}
+
+
+# Search routing: given the player's node, the node lookups should go to (see use_search_pool).
+_route: Optional[Callable[[lavalink.Node], Optional[lavalink.Node]]] = None
+
+
+def use_search_pool(route: Optional[Callable[[lavalink.Node], Optional[lavalink.Node]]]) -> None:
+    """Send lookups to ``route(player_node)`` instead of the player's node (None resets).
+
+    Only lookups move; tracks still play on the player's node, which can play
+    an encoded track loaded anywhere.
+    """
+    global _route
+    _route = route
+
+
+def search_key(identifier: str) -> Optional[str]:
+    """Cache key for a search identifier (whitespace-collapsed, case-folded query), None for anything else."""
+    prefix, sep, query = identifier.partition(":")
+    if not sep or f"{prefix}:" not in SEARCH_PREFIXES:
+        return None
+    query = " ".join(query.split()).casefold()
+    return f"{prefix}:{query}" if query else None
+
+
+def resolution_key(identifier: str) -> str:
+    """Key for ``identifier`` in the on-disk resolution cache: the search key, or the URI itself."""
+    return search_key(identifier) or identifier.strip()
+
+
+def _clone(result: Optional[lavalink.LoadResult]) -> Optional[lavalink.LoadResult]:
+    # Callers set ``requester`` on the tracks they get back, so every caller gets its own track objects.
+    if not result or not getattr(result, "tracks", None):
+        return result
+    clone = copy.copy(result)
+    clone.tracks = [_clone_track(t) for t in result.tracks]
+    return clone
+
+
+def _clone_track(track: lavalink.AudioTrack) -> lavalink.AudioTrack:
+    # ``requester`` lives in the ``extra`` dict, which a shallow copy would share with the cached track.
+    clone = copy.copy(track)
+    if isinstance(getattr(track, "extra", None), dict):
+        clone.extra = dict(track.extra)
+    return clone
+
+
+async def _from_disk(identifier: str) -> Optional[lavalink.LoadResult]:
+    try:
+        entry = await resolution_cache.get(resolution_key(identifier))
+    except Exception as e:
+        logger.debug(f"[Resolver] Resolution cache read failed for {identifier}: {e}")
+        return None
+    if not entry:
+        return None
+    tracks = [decode_stored(t) for t in entry["tracks"]]
+    if not tracks or None in tracks:
+        return None  # something the local decoder can't rebuild; ask the node instead
+    return lavalink.LoadResult(lavalink.LoadType(entry["load_type"]), tracks)
+
+
+def _to_disk(identifier: str, result: lavalink.LoadResult) -> None:
+    load_type = getattr(result.load_type, "value", result.load_type)
+    if load_type not in ("track", "search"):
+        return
+    try:
+        resolution_cache.put(resolution_key(identifier), load_type, [Track.from_lavalink(t) for t in result.tracks])
+    except Exception as e:
+        logger.debug(f"[Resolver] Resolution cache write failed for {identifier}: {e}")
+
+
+def latency_percentile(node: lavalink.Node, q: float) -> Optional[float]:
+    """``q``-th percentile (0-1) of ``node``'s recent load times in ms, None without samples."""
+    samples = sorted(node_latency.get(node.name) or ())
+    if not samples:
+        return None
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+def _hedge_delay(node: lavalink.Node) -> float:
+    samples = node_latency.get(node.name) or ()
+    if len(samples) < HEDGE_MIN_SAMPLES:
+        return HEDGE_MIN_MS
+    return max(HEDGE_MIN_MS, latency_percentile(node, 0.9))
+
+
+def _hedge_node(node: lavalink.Node) -> Optional[lavalink.Node]:
+    """Node to hedge a lookup on ``node`` onto, None when there's no other candidate.
+
+    With a search pool in use, that's the pool's pick other than ``node``, so
+    hedges never land on nodes kept out of the pool (and a pool of one node
+    doesn't hedge). Without one, it's the available node with the fastest
+    median load time, then the lowest penalty.
+    """
+    if _route is not None:
+        try:
+            backup = _route(node)
+        except Exception as e:
+            logger.debug(f"[Resolver] Search routing failed, not hedging: {e}")
+            return None
+        return backup if backup is not node else None
+
+    manager = getattr(node, "manager", None)
+    others = [n for n in getattr(manager, "available_nodes", ()) if n is not node]
+    if not others:
+        return None
+
+    def rank(n: lavalink.Node):
+        p50 = latency_percentile(n, 0.5)
+        penalty = getattr(getattr(getattr(n, "stats", None), "penalty", None), "total", 0)
+        return (p50 is None, p50 or 0.0, penalty)
+
+    return min(others, key=rank)
+
+
+async def _timed_load(node: lavalink.Node, identifier: str) -> lavalink.LoadResult:
+    started = time.perf_counter()
+    node_inflight[node.name] = node_inflight.get(node.name, 0) + 1
+    try:
+        return await node.get_tracks(identifier)
+    finally:
+        node_inflight[node.name] -= 1
+        # Also on failure or cancellation (a lower bound then), so a node that keeps losing looks slow.
+        node_latency.setdefault(node.name, deque(maxlen=100)).append((time.perf_counter() - started) * 1000)
+
+
+async def _load(node: lavalink.Node, identifier: str) -> lavalink.LoadResult:
+    """``node.get_tracks``, hedged onto a second node if it's slower than usual."""
+    backup = _hedge_node(node) if HEDGE_ENABLED else None
+    primary = asyncio.ensure_future(_timed_load(node, identifier))
+    if backup is None:
+        return await primary
+    done, _ = await asyncio.wait({primary}, timeout=_hedge_delay(node) / 1000)
+    if done:
+        return primary.result()
+
+    logger.debug(f"[Resolver] Hedging {identifier} on {backup.name} ({node.name} is slow)")
+    hedge_stats["hedged"] += 1
+    hedge = asyncio.ensure_future(_timed_load(backup, identifier))
+    pending = {primary, hedge}
+    fallback: Optional[lavalink.LoadResult] = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    continue
+                result = task.result()
+                if result and result.tracks:
+                    if task is hedge:
+                        hedge_stats["hedge_wins"] += 1
+                    return result
+                fallback = fallback or result  # empty: give the other node its chance
+        if fallback is not None:
+            return fallback
+        raise primary.exception()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def _fetch(node: lavalink.Node, identifier: str, key: Optional[str]) -> lavalink.LoadResult:
+    result = await _from_disk(identifier) if resolution_cache else None
+    if result is None:
+        if _route is not None:
+            try:
+                node = _route(node) or node
+            except Exception as e:
+                logger.debug(f"[Resolver] Search routing failed, using the player's node: {e}")
+        result = await _load(node, identifier)
+        if resolution_cache and result and result.tracks:
+            _to_disk(identifier, result)
+    if result and result.tracks:
+        if key:
+            search_cache.put(key, result)
+    elif result is not None:
+        # Loaded fine but found nothing (no matches, removed video, load error); transport errors raise instead.
+        negative_cache.put(key or identifier, result)
+    return result
+
+
+def track_key(track: Track) -> Optional[str]:
+    """Identity of a queued track across queue edits: its identifier, or its URI."""
+    return track.identifier or track.uri
+
+
+def mark_dead(track: Track) -> None:
+    """Remember that ``track`` couldn't be played, so playback skips it for ``NEGATIVE_TTL`` seconds."""
+    key = track_key(track)
+    if key:
+        dead_tracks.put(key, True)
+
+
+def is_dead(track: Track) -> bool:
+    key = track_key(track)
+    return bool(key) and dead_tracks.get(key, False)
+
+
+def _landed(flight: str, task: "asyncio.Future[lavalink.LoadResult]") -> None:
+    _inflight.pop(flight, None)
+    if not task.cancelled():
+        task.exception()  # retrieved here so a flight nobody awaited anymore doesn't log a warning
+
+
+async def get_tracks(node: lavalink.Node, identifier: str) -> lavalink.LoadResult:
+    """``node.get_tracks`` behind the shared search cache and a singleflight.
+
+    Searches that returned tracks are served from ``search_cache``, and any
+    lookup that recently loaded nothing is answered from ``negative_cache``;
+    everything else is looked up in the on-disk ``resolution_cache`` and
+    then goes to the node. Concurrent callers for the same lookup
+    await one request, which runs as its own task so a caller giving up
+    doesn't cancel it for the others.
+
+    ``node`` is the player's node; with a search pool in use (see
+    ``use_search_pool``) the request goes to a pool node instead.
+    """
+    key = search_key(identifier)
+    if key:
+        cached = search_cache.get(key)
+        if cached is not None:
+            return _clone(cached)
+    flight = key or identifier
+    empty = negative_cache.get(flight)
+    if empty is not None:
+        return empty
+    task = _inflight.get(flight)
+    if task is None:
+        task = asyncio.ensure_future(_fetch(node, identifier, key))
+        _inflight[flight] = task
+        task.add_done_callback(lambda t: _landed(flight, t))
+        singleflight_stats["started"] += 1
+    else:
+        singleflight_stats["coalesced"] += 1
+    return _clone(await asyncio.shield(task))
+
+
+def decode_stored(track: Track) -> Optional[lavalink.AudioTrack]:
+    """Rebuild the AudioTrack from its stored ``encoded`` string locally (no node round trip).
+
+    Returns None when the track has no encoded string or the local decoder
+    can't read it (e.g. a source plugin with its own fields).
+    """
+    if not track.encoded:
+        return None
+    try:
+        audio = lavalink.decode_track(track.encoded)
+    except Exception as e:
+        logger.debug(f"[Resolver] Local decode failed for {track.title}: {e}")
+        return None
+    audio.requester = track.requester
+    return audio
+
+
+async def decode_stored_many(node: lavalink.Node, tracks: Sequence[Track]) -> List[Optional[lavalink.AudioTrack]]:
+    """Decode stored tracks, asking the node only for the ones the local decoder rejected.
+
+    Those leftovers go to the node's batch decode endpoint in a single request,
+    so restoring a long queue costs at most one round trip. Entries without an
+    encoded string (or that the node can't decode either) come back as None and
+    need resolving by URI/search.
+    """
+    out = [decode_stored(t) for t in tracks]
+    pending = [i for i, (t, a) in enumerate(zip(tracks, out)) if a is None and t.encoded]
+    if pending:
+        try:
+            decoded = await node.decode_tracks([tracks[i].encoded for i in pending])
+            for i, audio in zip(pending, decoded):
+                audio.requester = tracks[i].requester
+                out[i] = audio
+        except Exception as e:
+            logger.debug(f"[Resolver] Node batch decode failed for {len(pending)} track(s): {e}")
+    return out
@@ -0,0 +1,521 @@
+import json
+import os
+import random
+import sqlite3
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .persistent_queue import (
+    DEFAULT_PATH, GuildTransaction, PersistentQueue, _LOCK, _after_remap, _after_remove, _new_guild,
+    _next_index, _shuffled_order, _step_index,
+)
+from .track import Track, TrackData
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(__file__), "queue_data.sqlite3")
+
+# Guild fields that get their own column; anything else set via set_guild_prop
+# (including the shuffle play ``order``) lands in the JSON ``extra`` column.
+_COLUMNS = {"index": "idx", "loop": "loop", "shuffle": "shuffle", "volume": "volume"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS guilds (
+    guild_id TEXT PRIMARY KEY,
+    idx      INTEGER NOT NULL DEFAULT 0,
+    loop     INTEGER NOT NULL DEFAULT 0,
+    shuffle  INTEGER NOT NULL DEFAULT 0,
+    volume   INTEGER NOT NULL DEFAULT 70,
+    extra    TEXT
+);
+CREATE TABLE IF NOT EXISTS tracks (
+    guild_id TEXT    NOT NULL,
+    position INTEGER NOT NULL,
+    data     TEXT    NOT NULL,
+    PRIMARY KEY (guild_id, position)
+) WITHOUT ROWID;
+"""
+
+
+class SQLiteTransaction(GuildTransaction):
+    """
+    GuildTransaction that works on the guild's rows inside one open
+    ``BEGIN IMMEDIATE`` transaction.
+
+    Reads fetch only what they ask for (the length, one track, the index or
+    the play order) and each change is applied to the rows right away, so
+    later reads in the block see it; the whole block commits or rolls back
+    as one. Nothing loads the full queue unless ``get_guild``/``get_queue``
+    is called.
+    """
+
+    def __init__(self, store: "SQLiteQueue", cur: sqlite3.Cursor, gid: str):
+        self._store = store
+        self._cur = cur
+        self._gid = gid
+        self._nav_cache: Optional[Dict[str, Any]] = None  # index/length/order, until the next change
+        self.ops: List[Tuple[str, Tuple[Any, ...]]] = []
+
+    def _do(self, op: str, *args: Any) -> Any:
+        self._nav_cache = None
+        self.ops.append((op, args))
+        return self._store._apply(self._cur, self._gid, op, args)
+
+    def _nav(self) -> Dict[str, Any]:
+        if self._nav_cache is None:
+            self._nav_cache = self._store._nav(self._cur, self._gid)
+        return self._nav_cache
+
+    def __len__(self) -> int:
+        return self._store._length(self._cur, self._gid)
+
+    def get_guild(self) -> Dict[str, Any]:
+        return self._store._load(self._gid) or _new_guild()
+
+    def get_guild_prop(self, key: str, default: Any = None) -> Any:
+        return self._store._prop(self._cur, self._gid, key, default)
+
+    def get_queue(self) -> List[Track]:
+        rows = self._cur.execute(
+            "SELECT data FROM tracks WHERE guild_id = ? ORDER BY position", (self._gid,)
+        ).fetchall()
+        return [self._store._decode(r[0]) for r in rows]
+
+    def get_index(self) -> int:
+        return int(self.get_guild_prop("index", 0))
+
+    def item(self, index: int) -> Optional[Track]:
+        row = self._cur.execute(
+            "SELECT data FROM tracks WHERE guild_id = ? AND position = ?", (self._gid, int(index))
+        ).fetchone()
+        return self._store._decode(row[0]) if row else None
+
+    def current_track(self) -> Optional[Track]:
+        return self.item(self.get_index())
+
+    def next_index(self) -> int:
+        return _next_index(self._nav())
+
+    def step_index(self, delta: int, wrap: bool = False) -> Optional[int]:
+        return _step_index(self._nav(), delta, wrap)
+
+    def is_shuffled(self) -> bool:
+        return bool(self._nav().get("order"))
+
+    def shuffle(self, rng: Optional[random.Random] = None) -> None:
+        self._do("shuffle", _shuffled_order(self._nav(), rng or random.Random()))
+
+
+class SQLiteQueue(PersistentQueue):
+    """
+    PersistentQueue backed by SQLite: one row per queued track keyed by
+    (guild, position) and one row of metadata per guild.
+
+    Appends, index moves and single-track updates touch a single row instead
+    of rewriting every guild. The database runs in WAL mode with a busy
+    timeout and every mutation (or ``transaction()`` block) is one
+    ``BEGIN IMMEDIATE`` transaction, so
+    several bot processes can share one file.
+    """
+
+    def __init__(self, path: str = DEFAULT_DB_PATH, import_from: Optional[str] = DEFAULT_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        if import_from and os.path.exists(import_from):
+            self._import_json(import_from)
+
+    def _import_json(self, json_path: str) -> None:
+        """One-time migration from queue_data.json into an empty database."""
+        with _LOCK:
+            if self._conn.execute("SELECT 1 FROM guilds LIMIT 1").fetchone():
+                return
+            try:
+                with open(json_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except Exception:
+                return
+            with self._tx() as cur:
+                for gid, g in data.items():
+                    self._put_guild(cur, gid, g)
+
+    # --- transaction plumbing ---
+
+    class _Tx:
+        def __init__(self, conn: sqlite3.Connection):
+            self.conn = conn
+
+        def __enter__(self) -> sqlite3.Cursor:
+            self.conn.execute("BEGIN IMMEDIATE")
+            return self.conn.cursor()
+
+        def __exit__(self, exc_type, exc, tb) -> None:
+            self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+
+    def _tx(self) -> "SQLiteQueue._Tx":
+        return SQLiteQueue._Tx(self._conn)
+
+    @staticmethod
+    def _encode(track: TrackData) -> str:
+        return json.dumps(Track.decode(track).encode(), ensure_ascii=False, separators=(",", ":"))
+
+    @staticmethod
+    def _decode(data: str) -> Track:
+        return Track.decode(json.loads(data))
+
+    def _ensure_guild(self, cur: sqlite3.Cursor, gid: str) -> None:
+        cur.execute("INSERT OR IGNORE INTO guilds (guild_id) VALUES (?)", (gid,))
+
+    def _meta(self, cur: sqlite3.Cursor, gid: str) -> Optional[Tuple[int, int, int, int, Optional[str]]]:
+        return cur.execute(
+            "SELECT idx, loop, shuffle, volume, extra FROM guilds WHERE guild_id = ?", (gid,)
+        ).fetchone()
+
+    def _length(self, cur: sqlite3.Cursor, gid: str) -> int:
+        row = cur.execute("SELECT MAX(position) FROM tracks WHERE guild_id = ?", (gid,)).fetchone()
+        return 0 if row[0] is None else int(row[0]) + 1
+
+    def _put_guild(self, cur: sqlite3.Cursor, gid: str, g: Dict[str, Any]) -> None:
+        extra = {k: v for k, v in g.items() if k != "queue" and k not in _COLUMNS}
+        cur.execute(
+            "INSERT OR REPLACE INTO guilds (guild_id, idx, loop, shuffle, volume, extra) VALUES (?, ?, ?, ?, ?, ?)",
+            (gid, int(g.get("index", 0)), int(g.get("loop", 0)), int(bool(g.get("shuffle", False))),
+             int(g.get("volume", 70)), json.dumps(extra) if extra else None),
+        )
+        cur.execute("DELETE FROM tracks WHERE guild_id = ?", (gid,))
+        cur.executemany(
+            "INSERT INTO tracks (guild_id, position, data) VALUES (?, ?, ?)",
+            [(gid, i, self._encode(t)) for i, t in enumerate(g.get("queue") or [])],
+        )
+
+    def _prop(self, cur: sqlite3.Cursor, gid: str, key: str, default: Any = None) -> Any:
+        """One guild field: its column, or its entry in ``extra``."""
+        meta = self._meta(cur, gid)
+        if meta is None:
+            return default
+        col = _COLUMNS.get(key)
+        if col:
+            value = meta[("idx", "loop", "shuffle", "volume").index(col)]
+            return bool(value) if key == "shuffle" else int(value)
+        return (json.loads(meta[4]) if meta[4] else {}).get(key, default)
+
+    def _extra(self, cur: sqlite3.Cursor, gid: str) -> Dict[str, Any]:
+        meta = self._meta(cur, gid)
+        return json.loads(meta[4]) if meta and meta[4] else {}
+
+    def _set_extra(self, cur: sqlite3.Cursor, gid: str, extra: Dict[str, Any]) -> None:
+        cur.execute("UPDATE guilds SET extra = ? WHERE guild_id = ?", (json.dumps(extra) if extra else None, gid))
+
+    def _nav(self, cur: sqlite3.Cursor, gid: str) -> Dict[str, Any]:
+        """Just enough of the guild dict for ``_next_index``/``_step_index`` (no track rows)."""
+        meta = self._meta(cur, gid)
+        if meta is None:
+            return {}
+        g = {"queue": range(self._length(cur, gid)), "index": int(meta[0]), "loop": int(meta[1])}
+        if meta[4]:
+            g["order"] = json.loads(meta[4]).get("order")
+        return g
+
+    def _shift_down(self, cur: sqlite3.Cursor, gid: str, after: int, by: int = 1) -> None:
+        """Close a gap: positions > ``after`` move down by ``by`` without PK collisions."""
+        cur.execute("UPDATE tracks SET position = -position WHERE guild_id = ? AND position > ?", (gid, after))
+        cur.execute("UPDATE tracks SET position = -position - ? WHERE guild_id = ? AND position < 0", (by, gid))
+
+    def _renumber(self, cur: sqlite3.Cursor, gid: str, moves: List[Tuple[int, int]]) -> None:
+        """Apply ``(old, new)`` position changes that permute a set of rows, without PK collisions."""
+        if not moves:
+            return
+        cur.executemany(
+            "UPDATE tracks SET position = -1 - position WHERE guild_id = ? AND position = ?",
+            [(gid, old) for old, _ in moves],
+        )
+        cur.executemany(
+            "UPDATE tracks SET position = ? WHERE guild_id = ? AND position = ?",
+            [(new, gid, -1 - old) for old, new in moves],
+        )
+
+    def _fix_pointers(self, cur: sqlite3.Cursor, gid: str, fix: Callable[[Dict[str, Any]], None]) -> None:
+        """Run one of the shared index/order fix-ups against this guild's row."""
+        g = self._nav(cur, gid)
+        fix(g)
+        cur.execute("UPDATE guilds SET idx = ? WHERE guild_id = ?", (g["index"], gid))
+        if g.get("order") is not None:
+            extra = self._extra(cur, gid)
+            extra["order"] = g["order"]
+            self._set_extra(cur, gid, extra)
+
+    # --- PersistentQueue API ---
+
+    def _read(self) -> Dict[str, Any]:
+        with _LOCK:
+            gids = [r[0] for r in self._conn.execute("SELECT guild_id FROM guilds")]
+            return {gid: self._load(gid) for gid in gids}
+
+    def _write(self, data: Dict[str, Any]) -> None:
+        with _LOCK, self._tx() as cur:
+            for gid, g in data.items():
+                self._put_guild(cur, gid, g)
+
+    def _load(self, gid: str) -> Optional[Dict[str, Any]]:
+        cur = self._conn.cursor()
+        meta = self._meta(cur, gid)
+        if meta is None:
+            return None
+        idx, loop, shuffle, volume, extra = meta
+        g = {"queue": [], "index": idx, "loop": loop, "shuffle": bool(shuffle), "volume": volume}
+        if extra:
+            g.update(json.loads(extra))
+        g["queue"] = [
+            self._decode(r[0])
+            for r in cur.execute("SELECT data FROM tracks WHERE guild_id = ? ORDER BY position", (gid,))
+        ]
+        return g
+
+    def _mutate(self, guild_id: int, op: str, *args: Any) -> Any:
+        with _LOCK, self._tx() as cur:
+            return self._apply(cur, str(guild_id), op, args)
+
+    @contextmanager
+    def transaction(self, guild_id: int) -> Iterator[SQLiteTransaction]:
+        """Like ``PersistentQueue.transaction``, but reads and writes happen inside one
+        ``BEGIN IMMEDIATE``: no other process can write the guild in between, and a
+        block that raises is rolled back."""
+        gid = str(guild_id)
+        with _LOCK, self._tx() as cur:
+            self._ensure_guild(cur, gid)
+            yield SQLiteTransaction(self, cur, gid)
+
+    def _apply(self, cur: sqlite3.Cursor, gid: str, op: str, args: Tuple[Any, ...]) -> Any:
+        if op == "init":
+            self._ensure_guild(cur, gid)
+            return None
+        if op == "set":
+            key, value = args
+            self._ensure_guild(cur, gid)
+            col = _COLUMNS.get(key)
+            if col:
+                cur.execute(f"UPDATE guilds SET {col} = ? WHERE guild_id = ?", (int(value), gid))
+            else:
+                extra = self._extra(cur, gid)
+                extra[key] = value
+                self._set_extra(cur, gid, extra)
+            return None
+        if op == "clear":
+            self._put_guild(cur, gid, _new_guild())
+            return None
+        if op in ("append", "extend"):
+            tracks = [args[0]] if op == "append" else list(args[0])
+            self._ensure_guild(cur, gid)
+            start = self._length(cur, gid)
+            cur.executemany(
+                "INSERT INTO tracks (guild_id, position, data) VALUES (?, ?, ?)",
+                [(gid, start + i, self._encode(t)) for i, t in enumerate(tracks)],
+            )
+            extra = self._extra(cur, gid)
+            if extra.get("order"):
+                extra["order"] += list(range(start, start + len(tracks)))
+                self._set_extra(cur, gid, extra)
+            return None
+        if op == "remove_at":
+            index = args[0]
+            row = cur.execute(
+                "SELECT data FROM tracks WHERE guild_id = ? AND position = ?", (gid, index)
+            ).fetchone()
+            if row is None or index < 0:
+                return None
+            cur.execute("DELETE FROM tracks WHERE guild_id = ? AND position = ?", (gid, index))
+            self._shift_down(cur, gid, index)
+            length = self._length(cur, gid)
+            cur_idx = int(self._meta(cur, gid)[0])
+            if index < cur_idx:
+                cur_idx -= 1
+            cur.execute("UPDATE guilds SET idx = ? WHERE guild_id = ?", (max(0, min(cur_idx, length)), gid))
+            extra = self._extra(cur, gid)
+            if extra.get("order"):
+                extra["order"] = [p - (p > index) for p in extra["order"] if p != index]
+                self._set_extra(cur, gid, extra)
+            return self._decode(row[0])
+        if op == "remove_range":
+            length = self._length(cur, gid)
+            start, stop = max(0, args[0]), min(length, args[1])
+            if start >= stop:
+                return 0
+            cur.execute(
+                "DELETE FROM tracks WHERE guild_id = ? AND position >= ? AND position < ?", (gid, start, stop)
+            )
+            self._shift_down(cur, gid, start - 1, by=stop - start)
+            self._fix_pointers(cur, gid, lambda g: _after_remove(g, range(start, stop)))
+            return stop - start
+        if op == "remove_by":
+            requester = args[0]
+            rows = cur.execute(
+                "SELECT position, data FROM tracks WHERE guild_id = ? ORDER BY position", (gid,)
+            ).fetchall()
+            removed = [p for p, data in rows if self._decode(data).get("requester") == requester]
+            if not removed:
+                return 0
+            gone = set(removed)
+            cur.executemany("DELETE FROM tracks WHERE guild_id = ? AND position = ?", [(gid, p) for p in removed])
+            moves = []
+            for p, _ in rows:
+                shift = bisect_left(removed, p)
+                if shift and p not in gone:
+                    moves.append((p, p - shift))
+            self._renumber(cur, gid, moves)
+            self._fix_pointers(cur, gid, lambda g: _after_remove(g, removed))
+            return len(removed)
+        if op == "move":
+            src, dst = args
+            length = self._length(cur, gid)
+            if not (0 <= src < length and 0 <= dst < length) or src == dst:
+                return None
+            row = cur.execute(
+                "SELECT data FROM tracks WHERE guild_id = ? AND position = ?", (gid, src)
+            ).fetchone()
+            step = 1 if src < dst else -1
+            # src jumps to dst; everything between slides one step towards src
+            self._renumber(cur, gid, [(src, dst)] + [(p, p - step) for p in range(src + step, dst + step, step)])
+
+            def moved(p: int) -> int:
+                if p == src:
+                    return dst
+                if min(src, dst) <= p <= max(src, dst):
+                    return p - step
+                return p
+
+            self._fix_pointers(cur, gid, lambda g: _after_remap(g, moved))
+            return self._decode(row[0])
+        if op == "swap":
+            i, j = args
+            length = self._length(cur, gid)
+            if not (0 <= i < length and 0 <= j < length) or i == j:
+                return False
+            self._renumber(cur, gid, [(i, j), (j, i)])
+            self._fix_pointers(cur, gid, lambda g: _after_remap(g, lambda p: j if p == i else i if p == j else p))
+            return True
+        if op == "set_queue":
+            tracks = list(args[0])
+            self._ensure_guild(cur, gid)
+            cur.execute("DELETE FROM tracks WHERE guild_id = ?", (gid,))
+            cur.executemany(
+                "INSERT INTO tracks (guild_id, position, data) VALUES (?, ?, ?)",
+                [(gid, i, self._encode(t)) for i, t in enumerate(tracks)],
+            )
+            cur_idx = int(self._meta(cur, gid)[0])
+            new_idx = max(0, min(cur_idx, len(tracks) - 1)) if tracks else 0
+            cur.execute("UPDATE guilds SET idx = ?, shuffle = 0 WHERE guild_id = ?", (new_idx, gid))
+            extra = self._extra(cur, gid)
+            if extra.pop("order", None) is not None:
+                self._set_extra(cur, gid, extra)
+            return None
+        if op == "update_track":
+            index, track_data = args
+            cur.execute(
+                "UPDATE tracks SET data = ? WHERE guild_id = ? AND position = ?",
+                (self._encode(track_data), gid, index),
+            )
+            return cur.rowcount > 0
+        if op == "shuffle":
+            self._ensure_guild(cur, gid)
+            extra = self._extra(cur, gid)
+            extra["order"] = list(args[0])
+            self._set_extra(cur, gid, extra)
+            cur.execute("UPDATE guilds SET shuffle = 1 WHERE guild_id = ?", (gid,))
+            return None
+        if op == "unshuffle":
+            extra = self._extra(cur, gid)
+            if extra.pop("order", None) is not None:
+                self._set_extra(cur, gid, extra)
+            cur.execute("UPDATE guilds SET shuffle = 0 WHERE guild_id = ?", (gid,))
+            return None
+        raise ValueError(f"Unknown queue operation: {op}")
+
+    def close(self) -> None:
+        with _LOCK:
+            self._conn.close()
+
+    def get_guild(self, guild_id: int) -> Dict[str, Any]:
+        with _LOCK:
+            g = self._load(str(guild_id))
+            if g is None:
+                self._mutate(guild_id, "init")
+                g = _new_guild()
+            return g
+
+    def get_queue(self, guild_id: int) -> List[Track]:
+        with _LOCK:
+            rows = self._conn.execute(
+                "SELECT data FROM tracks WHERE guild_id = ? ORDER BY position", (str(guild_id),)
+            ).fetchall()
+            return [self._decode(r[0]) for r in rows]
+
+    def get_index(self, guild_id: int) -> int:
+        with _LOCK:
+            meta = self._meta(self._conn.cursor(), str(guild_id))
+            return int(meta[0]) if meta else 0
+
+    def get_guild_prop(self, guild_id: int, key: str, default: Any = None) -> Any:
+        with _LOCK:
+            return self._prop(self._conn.cursor(), str(guild_id), key, default)
+
+    def current(self, guild_id: int) -> Tuple[int, Optional[Track]]:
+        with _LOCK:
+            row = self._conn.execute(
+                "SELECT g.idx, t.data FROM guilds g LEFT JOIN tracks t ON t.guild_id = g.guild_id AND t.position = g.idx "
+                "WHERE g.guild_id = ?",
+                (str(guild_id),),
+            ).fetchone()
+        if row is None:
+            return 0, None
+        return int(row[0]), (self._decode(row[1]) if row[1] is not None else None)
+
+    def length(self, guild_id: int) -> int:
+        with _LOCK:
+            return self._length(self._conn.cursor(), str(guild_id))
+
+    def item(self, guild_id: int, index: int) -> Optional[Track]:
+        with _LOCK:
+            row = self._conn.execute(
+                "SELECT data FROM tracks WHERE guild_id = ? AND position = ?", (str(guild_id), int(index))
+            ).fetchone()
+        return self._decode(row[0]) if row else None
+
+    def window(self, guild_id: int, offset: int, limit: int) -> List[Track]:
+        offset = max(0, int(offset))
+        with _LOCK:
+            rows = self._conn.execute(
+                "SELECT data FROM tracks WHERE guild_id = ? AND position >= ? AND position < ? ORDER BY position",
+                (str(guild_id), offset, offset + max(0, int(limit))),
+            ).fetchall()
+        return [self._decode(r[0]) for r in rows]
+
+    def page(self, guild_id: int, offset: int, limit: int) -> Tuple[int, int, List[Track]]:
+        offset = max(0, int(offset))
+        gid = str(guild_id)
+        with _LOCK:
+            # One read transaction, so another process's write can't land between the three reads
+            self._conn.execute("BEGIN")
+            try:
+                cur = self._conn.cursor()
+                length = self._length(cur, gid)
+                meta = self._meta(cur, gid)
+                rows = cur.execute(
+                    "SELECT data FROM tracks WHERE guild_id = ? AND position >= ? AND position < ? ORDER BY position",
+                    (gid, offset, offset + max(0, int(limit))),
+                ).fetchall()
+            finally:
+                self._conn.execute("COMMIT")
+        return length, int(meta[0]) if meta else 0, [self._decode(r[0]) for r in rows]
+
+    def _peek(self, guild_id: int) -> Dict[str, Any]:
+        return self._nav(self._conn.cursor(), str(guild_id))
+
+    def next_index(self, guild_id: int) -> int:
+        with _LOCK:
+            return _next_index(self._peek(guild_id))
+
+    def step_index(self, guild_id: int, delta: int, wrap: bool = False) -> Optional[int]:
+        with _LOCK:
+            return _step_index(self._peek(guild_id), delta, wrap)
@@ -0,0 +1,178 @@
+"""Where the time goes between /play and the first audio, per stage and per node."""
+
+import time
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+# Stage intervals reported for a /play: (name, from mark, to mark). Marks a /play never reached
+# (e.g. no voice connect needed, or the track was only queued) leave their intervals out.
+INTERVALS: Tuple[Tuple[str, str, str], ...] = (
+    ("connect", "received", "connected"),  # voice connect (runs alongside the search)
+    ("search", "search_start", "search_end"),  # query -> tracks, caches included
+    ("store", "store_start", "stored"),  # queue write
+    ("play", "stored", "played"),  # engine resolves the entry and player.play returns
+    ("audio", "played", "audio"),  # node accepted -> TrackStartEvent
+    ("added", "received", "added"),  # "Added" message sent
+    ("first_audio", "received", "audio"),  # the whole thing
+)
+PERCENTILES = (0.5, 0.95, 0.99)
+
+# A TrackStartEvent this long after the /play that started it belongs to something else
+AUDIO_WAIT_S = 60.0
+
+
+def percentile(samples: Sequence[float], q: float) -> float:
+    """``q``-th percentile (0-1) of sorted ``samples``."""
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+class PlayTrace:
+    """Timestamps of one /play, in ms since the command was received."""
+
+    def __init__(self, guild_id: int):
+        self.guild_id = guild_id
+        self.node: Optional[str] = None  # the player's node
+        self.track: Optional[str] = None  # identifier of the track it started, matched against TrackStartEvents
+        self._t0 = time.perf_counter()
+        self.marks: Dict[str, float] = {"received": 0.0}
+        self._holds = 1  # the /play itself, plus its track start while one is awaited
+        self._dropped = False
+
+    def mark(self, stage: str) -> float:
+        """Timestamp ``stage`` now; returns the ms since the command was received."""
+        self.marks[stage] = elapsed = (time.perf_counter() - self._t0) * 1000
+        return elapsed
+
+    def age(self) -> float:
+        return time.perf_counter() - self._t0
+
+    def intervals(self) -> Dict[str, float]:
+        return {
+            name: self.marks[end] - self.marks[start]
+            for name, start, end in INTERVALS
+            if start in self.marks and end in self.marks
+        }
+
+
+class PlayTimings:
+    """
+    Recent /play stage durations, kept per node so node selection and
+    caching can be tuned against them.
+
+    A trace is recorded once its /play is ``done`` and, if that /play
+    started playback (``awaiting_audio``), the track's TrackStartEvent has
+    arrived (``audio_started``), in whichever order those happen. Each
+    (node, stage) keeps its last ``maxlen`` durations; percentiles are
+    computed from those on demand.
+
+    A track start can beat ``awaiting_audio`` (the node reports it before
+    ``player.play`` returns), so the last start of each guild is kept until
+    a trace claims it. Starts are matched to traces by track identifier, and
+    a trace whose start can't be matched is dropped rather than timed
+    against some other track.
+    """
+
+    def __init__(self, maxlen: int = 500):
+        self.maxlen = maxlen
+        self.samples: Dict[Tuple[str, str], Deque[float]] = {}
+        self._awaiting: Dict[int, PlayTrace] = {}
+        self._started: Dict[int, Tuple[float, Optional[str]]] = {}  # guild -> unclaimed track start (time, identifier)
+
+    def done(self, trace: PlayTrace) -> None:
+        """The /play behind ``trace`` finished (or a hold on it was released)."""
+        trace._holds -= 1
+        if trace._holds or trace._dropped:
+            return
+        node = trace.node or "unknown"
+        for stage, ms in trace.intervals().items():
+            self.samples.setdefault((node, stage), deque(maxlen=self.maxlen)).append(ms)
+
+    def awaiting_audio(self, trace: PlayTrace, track: Optional[str] = None) -> None:
+        """Hold ``trace`` until the TrackStartEvent of ``track`` (its identifier) in its guild.
+
+        Uses the guild's unclaimed start instead if that one already arrived
+        after the /play was received and is for the same track.
+        """
+        trace.track = track
+        stale = self._awaiting.pop(trace.guild_id, None)
+        if stale is not None:
+            self.done(stale)
+        started = self._started.pop(trace.guild_id, None)
+        if started is not None:
+            at, identifier = started
+            if at >= trace._t0 and self._matches(trace, identifier):
+                # Can't be earlier than "played" as far as the stages go: the audio stage is then 0
+                trace.marks["audio"] = max((at - trace._t0) * 1000, trace.marks.get("played", 0.0))
+                return
+        trace._holds += 1
+        self._awaiting[trace.guild_id] = trace
+
+    def audio_started(self, guild_id: int, track: Optional[str] = None) -> Optional[PlayTrace]:
+        """Mark the first audio on the trace waiting for ``guild_id``'s start of ``track``, if any.
+
+        Without a waiting trace the start is kept for the next ``awaiting_audio``
+        of the guild. A waiting trace for a different track is dropped.
+        """
+        trace = self._awaiting.pop(guild_id, None)
+        if trace is None:
+            self._started[guild_id] = (time.perf_counter(), track)
+            return None
+        if not self._matches(trace, track):
+            trace._dropped = True
+        elif trace.age() <= AUDIO_WAIT_S:
+            trace.mark("audio")
+        self.done(trace)
+        return trace
+
+    @staticmethod
+    def _matches(trace: PlayTrace, track: Optional[str]) -> bool:
+        return trace.track is None or track is None or trace.track == track
+
+    def nodes(self) -> List[str]:
+        return sorted({node for node, _ in self.samples})
+
+    def summary(self, node: Optional[str] = None, stage: str = "first_audio") -> Optional[Tuple[int, List[float]]]:
+        """(sample count, [p50, p95, p99]) for ``stage`` on ``node`` (all nodes when None), None without samples."""
+        if node is None:
+            values = sorted(v for (_, s), d in self.samples.items() if s == stage for v in d)
+        else:
+            values = sorted(self.samples.get((node, stage)) or ())
+        if not values:
+            return None
+        return len(values), [percentile(values, q) for q in PERCENTILES]
+
+    def clear(self) -> None:
+        self.samples.clear()
+
+    def export(self, lookups: Optional[Mapping[str, Iterable[float]]] = None) -> str:
+        """Stage durations in the Prometheus text format, as summaries with p50/p95/p99.
+
+        ``lookups`` (node name -> recent load times in ms) is exported
+        alongside as the per-node lookup latency.
+        """
+        lines: List[str] = []
+
+        def summary(metric: str, help_text: str, series: Iterable[Tuple[str, Iterable[float]]]) -> None:
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} summary")
+            for labels, values in series:
+                values = sorted(values)
+                if not values:
+                    continue
+                for q in PERCENTILES:
+                    lines.append(f'{metric}{{{labels},quantile="{q}"}} {percentile(values, q):.1f}')
+                lines.append(f"{metric}_sum{{{labels}}} {sum(values):.1f}")
+                lines.append(f"{metric}_count{{{labels}}} {len(values)}")
+
+        summary(
+            "akio_play_stage_ms",
+            "Duration of each /play stage in milliseconds (recent samples).",
+            ((f'node="{node}",stage="{stage}"', d) for (node, stage), d in sorted(self.samples.items())),
+        )
+        if lookups is not None:
+            summary(
+                "akio_node_lookup_ms",
+                "Track lookup time per Lavalink node in milliseconds (recent samples).",
+                ((f'node="{node}"', d) for node, d in sorted(lookups.items())),
+            )
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,147 @@
+import sys
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+# Positional layout of the compact encoding; anything else rides along in ``extra``.
+FIELDS: Tuple[str, ...] = ("title", "uri", "duration", "identifier", "author", "requester", "encoded")
+
+
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if type(value) is str else value
+
+
+class Track:
+    """
+    Compact record for one queued track.
+
+    Replaces the per-track dict: fixed fields live in ``__slots__`` (no
+    per-instance ``__dict__`` and no repeated key strings), ``author`` and
+    ``uri`` are interned so a playlist by one artist shares a single string,
+    ``encoded`` keeps Lavalink's base64 track so it can be played without
+    resolving the URI again, and rarely-set fields (``added_message_id``, ``alternatives``, ...) go in an
+    optional ``extra`` dict.
+
+    Read-only dict access (``get``, ``[]``, ``in``, ``dict(track)``) keeps old
+    call sites working. Treat instances as immutable - the stores hand the same
+    object to every reader - and use ``replace()`` to derive a changed copy.
+
+    On disk a track is the list ``[title, uri, duration, identifier, author,
+    requester, encoded]`` plus ``extra`` when present (``encoded`` is dropped
+    when unset and nothing follows it); ``decode`` also accepts the older
+    layouts and the dict form, so existing queue files load unchanged.
+    """
+
+    __slots__ = FIELDS + ("extra",)
+
+    def __init__(
+        self,
+        title: Optional[str] = None,
+        uri: Optional[str] = None,
+        duration: Optional[int] = None,
+        identifier: Optional[str] = None,
+        author: Optional[str] = None,
+        requester: Optional[int] = None,
+        encoded: Optional[str] = None,
+        extra: Optional[Dict[str, Any]] = None,
+    ):
+        self.title = title
+        self.uri = _intern(uri)
+        self.duration = duration
+        self.identifier = identifier
+        self.author = _intern(author)
+        self.requester = requester
+        self.encoded = encoded
+        self.extra = extra or None
+
+    @classmethod
+    def from_lavalink(cls, track: Any, requester: Optional[int] = None, **extra: Any) -> "Track":
+        """Build a record from a lavalink AudioTrack (or anything with the same attributes)."""
+        return cls(
+            getattr(track, "title", None),
+            getattr(track, "uri", None),
+            getattr(track, "duration", None),
+            getattr(track, "identifier", None),
+            getattr(track, "author", None),
+            requester,
+            getattr(track, "track", None),  # lavalink.py keeps the encoded track string in ``track``
+            extra,
+        )
+
+    @classmethod
+    def decode(cls, data: Union["Track", List[Any], Dict[str, Any]]) -> "Track":
+        """Track from its compact list form, a legacy dict, or a Track (returned as is)."""
+        if isinstance(data, Track):
+            return data
+        if isinstance(data, dict):
+            extra = {k: v for k, v in data.items() if k not in FIELDS}
+            return cls(*(data.get(f) for f in FIELDS), extra=extra)
+        values = list(data)
+        if len(values) > 6 and isinstance(values[6], dict):
+            values.insert(6, None)  # older layout without ``encoded``
+        extra = values[len(FIELDS)] if len(values) > len(FIELDS) else None
+        values = values[:len(FIELDS)] + [None] * (len(FIELDS) - len(values))
+        return cls(*values, extra=extra)
+
+    def encode(self) -> List[Any]:
+        """Compact JSON-ready form (see ``decode``)."""
+        out = [self.title, self.uri, self.duration, self.identifier, self.author, self.requester]
+        if self.encoded is not None or self.extra:
+            out.append(self.encoded)
+        if self.extra:
+            out.append(self.extra)
+        return out
+
+    def to_dict(self) -> Dict[str, Any]:
+        out = {f: getattr(self, f) for f in FIELDS}
+        if self.extra:
+            out.update(self.extra)
+        return out
+
+    def replace(self, **changes: Any) -> "Track":
+        """Copy with some fields changed; unknown keys go to ``extra`` (None removes them)."""
+        values = {f: changes.pop(f, getattr(self, f)) for f in FIELDS}
+        extra = dict(self.extra or {})
+        for key, value in changes.items():
+            if value is None:
+                extra.pop(key, None)
+            else:
+                extra[key] = value
+        return Track(**values, extra=extra)
+
+    # Read-only mapping protocol for code written against the old dicts
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in FIELDS:
+            value = getattr(self, key)
+            return default if value is None else value
+        return (self.extra or {}).get(key, default)
+
+    def __getitem__(self, key: str) -> Any:
+        if key in FIELDS:
+            return getattr(self, key)
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __contains__(self, key: object) -> bool:
+        return key in FIELDS or bool(self.extra and key in self.extra)
+
+    def keys(self) -> List[str]:
+        return list(FIELDS) + list(self.extra or ())
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, Track):
+            return self.encode() == other.encode()
+        if isinstance(other, dict):
+            return self == Track.decode(other)
+        return NotImplemented
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"Track(title={self.title!r}, uri={self.uri!r})"
+
+
+# What the queue stores accept for a track: a record or a legacy dict.
+TrackData = Union[Track, Dict[str, Any]]
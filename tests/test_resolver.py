@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+lavalink = pytest.importorskip("lavalink")
+
+from music import resolver  # noqa: E402
+
+
+def _audio_track(identifier: str, requester: int) -> "lavalink.AudioTrack":
+    data = {
+        "encoded": f"enc-{identifier}",
+        "info": {
+            "identifier": identifier,
+            "isSeekable": True,
+            "author": "artist",
+            "length": 180000,
+            "isStream": False,
+            "position": 0,
+            "title": f"title {identifier}",
+            "uri": f"https://www.youtube.com/watch?v={identifier}",
+            "sourceName": "youtube",
+            "artworkUrl": None,
+            "isrc": None,
+        },
+        "pluginInfo": {},
+        "userData": {},
+    }
+    return lavalink.AudioTrack(data, requester=requester)
+
+
+def test_clone_gets_its_own_requester():
+    cached = lavalink.LoadResult(lavalink.LoadType.SEARCH, [_audio_track("a", 1), _audio_track("b", 1)])
+    clone = resolver._clone(cached)
+    for track in clone.tracks:
+        track.requester = 2
+    assert [t.requester for t in cached.tracks] == [1, 1]
+    assert [t.requester for t in clone.tracks] == [2, 2]
+
+
+def test_search_cache_hit_leaves_cached_tracks_alone():
+    key = resolver.search_key("ytsearch:some song")
+    resolver.search_cache.put(key, lavalink.LoadResult(lavalink.LoadType.SEARCH, [_audio_track("a", 1)]))
+    try:
+        first = asyncio.run(resolver.get_tracks(None, "ytsearch:some song"))
+        first.tracks[0].requester = 2
+        second = asyncio.run(resolver.get_tracks(None, "ytsearch:  Some Song"))
+        assert second.tracks[0].requester == 1
+        assert resolver.search_cache.get(key).tracks[0].requester == 1
+    finally:
+        resolver.search_cache.pop(key)